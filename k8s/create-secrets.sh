@@ -17,4 +17,10 @@ kubectl create secret generic gateway-credentials \
   --namespace=$NAMESPACE \
   --dry-run=client -o yaml | kubectl apply -f -
 
+# Pod間のメンション転送用の共有シークレット
+kubectl create secret generic thread-forward-credentials \
+  --from-literal=secret="$(openssl rand -hex 32)" \
+  --namespace=$NAMESPACE \
+  --dry-run=client -o yaml | kubectl apply -f -
+
 echo "✓ Secrets created"
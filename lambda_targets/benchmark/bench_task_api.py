@@ -0,0 +1,238 @@
+"""
+Task API Lambda ベンチマーク
+
+ローカルのDynamoDB互換環境（既定: moto、--endpoint-url指定時: DynamoDB Local等）に対して
+task_api_simple / task_api_delete のハンドラを直接呼び出し、以下を計測する:
+
+- コールドスタート: 新しいプロセスでのモジュールimport + 初回呼び出し時間
+- ウォーム: create / list / delete のp50・p99レイテンシ
+- 1リクエストあたりのメモリ割り当て（tracemallocのピーク）
+
+※ moto使用時は子プロセスでboto3が先にimportされるため、import時間にboto3自体の
+  読み込みは含まれない。実際に近い値は --endpoint-url（DynamoDB Local）で計測する。
+
+使い方:
+    pip install -r lambda_targets/benchmark/requirements.txt
+    python lambda_targets/benchmark/bench_task_api.py --requests 200 --cold-runs 5
+    python lambda_targets/benchmark/bench_task_api.py --endpoint-url http://localhost:8000
+    python lambda_targets/benchmark/bench_task_api.py --max-p99-ms 20 --json  # CIでの退行検知
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+LAMBDA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIMPLE_PATH = os.path.join(LAMBDA_DIR, 'task_api_simple', 'lambda_function.py')
+DELETE_PATH = os.path.join(LAMBDA_DIR, 'task_api_delete', 'lambda_function.py')
+TABLE_NAME = 'agentcore-tasks-bench'
+
+
+def setup_env(endpoint_url):
+    """ベンチマーク用の環境変数（実AWSには接続しない）"""
+    os.environ['TABLE_NAME'] = TABLE_NAME
+    os.environ['LOG_SAMPLE_RATE'] = '0'
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+    if endpoint_url:
+        os.environ['DYNAMODB_ENDPOINT_URL'] = endpoint_url
+
+
+def create_table(endpoint_url):
+    """本番と同じキー・GSI構成のテーブルを作成"""
+    import boto3
+    client = boto3.client('dynamodb', endpoint_url=endpoint_url)
+    if TABLE_NAME in client.list_tables()['TableNames']:
+        client.delete_table(TableName=TABLE_NAME)
+    client.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[
+            {'AttributeName': name, 'AttributeType': 'S'}
+            for name in ('id', 'status', 'assignee', 'priority', 'due_date')
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                'IndexName': f'{attr}-due_date-index',
+                'KeySchema': [
+                    {'AttributeName': attr, 'KeyType': 'HASH'},
+                    {'AttributeName': 'due_date', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }
+            for attr in ('status', 'assignee', 'priority')
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+
+def load_module(name, path):
+    """Lambdaモジュールをファイルパスから読み込む"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_event(i):
+    return {'httpMethod': 'POST', 'body': json.dumps({
+        'title': f'bench task {i}',
+        'priority': ('high', 'medium', 'low')[i % 3],
+        'assignee': f'user{i % 5}',
+        'due_date': f'2026-11-{i % 28 + 1:02d}'
+    })}
+
+
+def list_event(i):
+    params = [{'limit': '20'}, {'status': 'todo', 'limit': '20'}, {'assignee': f'user{i % 5}', 'view': 'summary'}]
+    return {'httpMethod': 'GET', 'queryStringParameters': params[i % len(params)]}
+
+
+def delete_event(task_id):
+    return {'httpMethod': 'DELETE', 'pathParameters': {'id': task_id}}
+
+
+def cold_start_child(endpoint_url):
+    """子プロセス側: import + 初回呼び出し時間を計測して出力"""
+    setup_env(endpoint_url)
+    mock = None
+    if not endpoint_url:
+        from moto import mock_aws
+        mock = mock_aws()
+        mock.start()
+        create_table(None)
+
+    started = time.perf_counter()
+    module = load_module('task_api_simple', SIMPLE_PATH)
+    imported = time.perf_counter()
+    response = module.lambda_handler(create_event(0), None)
+    finished = time.perf_counter()
+    assert response['statusCode'] == 200, response
+
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'first_call_ms': (finished - imported) * 1000
+    }))
+    if mock:
+        mock.stop()
+
+
+def measure_cold_start(runs, endpoint_url):
+    """新しいプロセスでコールドスタートを計測"""
+    samples = []
+    for _ in range(runs):
+        args = [sys.executable, os.path.abspath(__file__), '--cold-child']
+        if endpoint_url:
+            args += ['--endpoint-url', endpoint_url]
+        output = subprocess.run(args, check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'import_ms_p50': statistics.median(s['import_ms'] for s in samples),
+        'first_call_ms_p50': statistics.median(s['first_call_ms'] for s in samples),
+        'total_ms_p50': statistics.median(s['import_ms'] + s['first_call_ms'] for s in samples)
+    }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def run_operation(name, handler, events):
+    """ウォーム状態でのレイテンシとメモリ割り当てを計測"""
+    latencies = []
+    responses = []
+    for event in events:
+        started = time.perf_counter()
+        response = handler(event, None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response['statusCode'] == 200, response
+        responses.append(response)
+
+    # メモリ割り当ては計測オーバーヘッドがあるため別パスで計測
+    peaks = []
+    tracemalloc.start()
+    for event in events[:min(len(events), 50)]:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        handler(event, None)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    tracemalloc.stop()
+
+    return responses, {
+        'operation': name,
+        'requests': len(events),
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'alloc_kib_per_request': statistics.mean(peaks) / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Task API Lambda benchmark')
+    parser.add_argument('--requests', type=int, default=200, help='warm requests per operation')
+    parser.add_argument('--cold-runs', type=int, default=5, help='cold start samples (0 to skip)')
+    parser.add_argument('--endpoint-url', help='DynamoDB Local endpoint (default: in-process moto)')
+    parser.add_argument('--max-p99-ms', type=float, help='fail if any warm p99 exceeds this value')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--cold-child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_child:
+        cold_start_child(args.endpoint_url)
+        return
+
+    setup_env(args.endpoint_url)
+    results = {}
+    if args.cold_runs:
+        results['cold_start'] = measure_cold_start(args.cold_runs, args.endpoint_url)
+
+    mock = None
+    if not args.endpoint_url:
+        from moto import mock_aws
+        mock = mock_aws()
+        mock.start()
+    try:
+        create_table(args.endpoint_url)
+        simple = load_module('task_api_simple', SIMPLE_PATH)
+        delete = load_module('task_api_delete', DELETE_PATH)
+
+        n = args.requests
+        created, create_stats = run_operation('create', simple.lambda_handler, [create_event(i) for i in range(n)])
+        _, list_stats = run_operation('list', simple.lambda_handler, [list_event(i) for i in range(n)])
+        task_ids = [json.loads(r['body'])['task']['id'] for r in created]
+        _, delete_stats = run_operation('delete', delete.lambda_handler, [delete_event(t) for t in task_ids])
+        results['warm'] = [create_stats, list_stats, delete_stats]
+    finally:
+        if mock:
+            mock.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        if 'cold_start' in results:
+            cold = results['cold_start']
+            print(f"cold start: import={cold['import_ms_p50']:.1f}ms "
+                  f"first_call={cold['first_call_ms_p50']:.1f}ms total={cold['total_ms_p50']:.1f}ms (p50)")
+        print(f"{'operation':<10}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}{'alloc KiB':>12}")
+        for stats in results['warm']:
+            print(f"{stats['operation']:<10}{stats['requests']:>10}{stats['p50_ms']:>10.2f}"
+                  f"{stats['p99_ms']:>10.2f}{stats['alloc_kib_per_request']:>12.1f}")
+
+    if args.max_p99_ms is not None:
+        slow = [s for s in results['warm'] if s['p99_ms'] > args.max_p99_ms]
+        if slow:
+            print(f"p99 regression: {[s['operation'] for s in slow]} exceeded {args.max_p99_ms}ms", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,172 @@
 DuckDuckGo Search - Lambda Target
 """
 import json
+import os
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from duckduckgo_search import DDGS
 
+# 件数の既定値と上限
+DEFAULT_MAX_RESULTS = int(os.environ.get('DEFAULT_MAX_RESULTS', '5'))
+MAX_RESULTS_CAP = int(os.environ.get('MAX_RESULTS_CAP', '10'))
+
+# 1件あたりのスニペット（body）の最大文字数
+SNIPPET_CHARS = int(os.environ.get('SNIPPET_CHARS', '300'))
+
+# バッチモードのクエリ数上限と同時実行数
+MAX_BATCH_QUERIES = int(os.environ.get('MAX_BATCH_QUERIES', '5'))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '3'))
+
+# キャッシュ（ウォームなLambda内のLRU + /tmpのディスク層、どちらもTTL付き）
+CACHE_TTL = float(os.environ.get('SEARCH_CACHE_TTL', '3600'))
+CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', '256'))
+CACHE_DIR = os.environ.get('SEARCH_CACHE_DIR', '/tmp/ddg-search-cache')
+
+# キャッシュキー → (有効期限, 結果)
+_memory_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# DDGSはスレッドセーフではないため、スレッド（バッチのワーカー）ごとにセッションを持つ
+_ddgs = threading.local()
+
+
+def get_ddgs():
+    """このスレッドのDDGSセッション（初回呼び出し時に作成し、ウォームなLambdaで再利用）"""
+    client = getattr(_ddgs, 'client', None)
+    if client is None:
+        client = _ddgs.client = DDGS()
+    return client
+
+
+def reset_ddgs():
+    """エラー後はこのスレッドのセッションを作り直す"""
+    _ddgs.client = None
+
+
+def normalize_query(query):
+    """キャッシュキー用にクエリを正規化（全角半角・大文字小文字・空白の揺れを吸収）"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', query)).strip().lower()
+
+
+def clamp_max_results(value):
+    """max_resultsを1〜MAX_RESULTS_CAPに丸める（不正値は既定値）"""
+    try:
+        return min(max(int(value), 1), MAX_RESULTS_CAP)
+    except (TypeError, ValueError):
+        return DEFAULT_MAX_RESULTS
+
+
+def compact(result):
+    """検索結果をタイトル・URL・短いスニペットのみに絞る"""
+    body = ' '.join((result.get('body') or '').split())
+    if len(body) > SNIPPET_CHARS:
+        body = body[:SNIPPET_CHARS].rstrip() + '…'
+    return {'title': result.get('title', ''), 'href': result.get('href', ''), 'body': body}
+
+
+def cache_path(key):
+    return os.path.join(CACHE_DIR, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def cache_get(key):
+    """メモリ → /tmp の順にキャッシュを参照"""
+    now = time.time()
+    with _cache_lock:
+        entry = _memory_cache.get(key)
+        if entry and entry[0] > now:
+            _memory_cache.move_to_end(key)
+            return entry[1]
+    
+    try:
+        with open(cache_path(key), encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get('expires_at', 0) <= now:
+        return None
+    remember(key, entry['expires_at'], entry['results'])
+    return entry['results']
+
+
+def cache_put(key, results):
+    """メモリと/tmpに保存（ディスク書き込みの失敗は無視）"""
+    expires_at = time.time() + CACHE_TTL
+    remember(key, expires_at, results)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # 書きかけのファイルを読まないよう一時ファイルから置き換える
+        path = cache_path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'expires_at': expires_at, 'results': results}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def remember(key, expires_at, results):
+    with _cache_lock:
+        _memory_cache[key] = (expires_at, results)
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > CACHE_MAX_ENTRIES:
+            _memory_cache.popitem(last=False)
+
+
+def search(query, max_results):
+    """
+    1クエリを検索（キャッシュ優先）
+    
+    Returns:
+        {"results": [...], "query": ..., "count": ..., "cached": bool}
+    """
+    key = f'{max_results}:{normalize_query(query)}'
+    results = cache_get(key)
+    cached = results is not None
+    if not cached:
+        try:
+            results = [compact(r) for r in get_ddgs().text(query, max_results=max_results)][:max_results]
+        except Exception:
+            reset_ddgs()
+            raise
+        cache_put(key, results)
+    
+    return {
+        'results': results,
+        'query': query,
+        'count': len(results),
+        'cached': cached
+    }
+
+
+def search_batch(queries, max_results):
+    """複数クエリを並列に検索（ワーカーごとのセッション、クエリごとに結果またはエラー）"""
+    def run(query):
+        if not isinstance(query, str) or not query.strip():
+            return {'query': query, 'error': 'query must be a non-empty string'}
+        try:
+            return search(query, max_results)
+        except Exception as e:
+            return {'query': query, 'error': str(e)}
+    
+    # 正規化後に同じクエリは1回だけ検索
+    def batch_key(query):
+        return normalize_query(query) if isinstance(query, str) else repr(query)
+    
+    first = {}
+    for query in queries:
+        first.setdefault(batch_key(query), query)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_CONCURRENCY, len(first)))) as executor:
+        by_key = dict(zip(first, executor.map(run, first.values())))
+    
+    return [{**by_key[batch_key(query)], 'query': query} for query in queries]
+
+
 def lambda_handler(event, context):
     """
     DuckDuckGo検索を実行
@@ -11,12 +175,25 @@ def lambda_handler(event, context):
     Args:
         event: {
             "query": "search query",
-            "max_results": 5
+            "queries": ["query 1", "query 2"],  # バッチモード（queryの代わり、最大5件）
+            "max_results": 5  # 1クエリあたり（最大10件）
         }
     """
     try:
         query = event.get('query')
-        max_results = event.get('max_results', 5)
+        queries = event.get('queries')
+        max_results = clamp_max_results(event.get('max_results', DEFAULT_MAX_RESULTS))
+        
+        if isinstance(queries, list) and queries:
+            if len(queries) > MAX_BATCH_QUERIES:
+                return {
+                    'error': f'at most {MAX_BATCH_QUERIES} queries per request'
+                }
+            batch = search_batch(queries, max_results)
+            return {
+                'batch': batch,
+                'count': len(batch)
+            }
         
         if not query:
             return {
@@ -24,15 +201,8 @@ def lambda_handler(event, context):
             }
         
         # 検索実行
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
-        
-        return {
-            'results': results,
-            'query': query,
-            'count': len(results)
-        }
-        
+        return search(query, max_results)
+    
     except Exception as e:
         return {
             'error': str(e)
@@ -3,21 +3,193 @@ Task API Delete - Lambda for API Gateway
 """
 import json
 import os
+import time
+import random
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
 TABLE_NAME = os.environ.get('TABLE_NAME', 'agentcore-tasks')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(TABLE_NAME)
+
+# ローカルのDynamoDB互換エンドポイント（ベンチマーク用、通常は未設定）
+DYNAMODB_ENDPOINT_URL = os.environ.get('DYNAMODB_ENDPOINT_URL')
+
+# 構造化ログのサンプリング率（エラーは常に出力）
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+
+_client = None
+
+
+def get_client():
+    """DynamoDBクライアント（resourceより軽量、初回呼び出し時に作成して再利用）"""
+    global _client
+    if _client is None:
+        _client = boto3.client(
+            'dynamodb',
+            endpoint_url=DYNAMODB_ENDPOINT_URL,
+            config=Config(connect_timeout=2, read_timeout=5, retries={'max_attempts': 3, 'mode': 'standard'})
+        )
+    return _client
+
+
+def log(level, message, **fields):
+    """1行JSONの構造化ログ"""
+    print(json.dumps({'level': level, 'message': message, **fields}, ensure_ascii=False, default=str))
+
+
+# テーブルのバージョン（task_api_simpleの一覧ETag/スナップショットが参照する）
+VERSION_ITEM_ID = '#version'
+
+
+def bump_table_version():
+    """削除後にバージョンを加算（削除は完了しているため、失敗は例外にせずログに残す）"""
+    try:
+        get_client().update_item(
+            TableName=TABLE_NAME,
+            Key={'id': {'S': VERSION_ITEM_ID}},
+            UpdateExpression='ADD #version :one',
+            ExpressionAttributeNames={'#version': 'version'},
+            ExpressionAttributeValues={':one': {'N': '1'}}
+        )
+    except ClientError as e:
+        error = e.response.get('Error', {})
+        log('ERROR', 'table version bump failed', error=error.get('Message'), error_code=error.get('Code'))
+        return False
+    return True
+
+
+# 一括削除の上限とBatchWriteItemの再試行設定
+MAX_BULK_ITEMS = int(os.environ.get('MAX_BULK_ITEMS', '100'))
+BATCH_SIZE = 25
+MAX_BATCH_RETRIES = 5
+
+
+def batch_write(requests):
+    """
+    BatchWriteItemで書き込み（UnprocessedItemsは指数バックオフで再試行）
+    
+    チャンク単位のエラー（ValidationException等）はそのチャンクの残りを失敗とし、
+    1件でも書き込めていればテーブルのバージョンを加算する（例外で中断した場合も含む）
+    
+    Returns:
+        書き込めなかった (リクエスト, エラー) のリスト
+    """
+    failed = []
+    written = 0
+    try:
+        for start in range(0, len(requests), BATCH_SIZE):
+            pending = requests[start:start + BATCH_SIZE]
+            try:
+                for attempt in range(MAX_BATCH_RETRIES + 1):
+                    response = get_client().batch_write_item(RequestItems={TABLE_NAME: pending})
+                    unprocessed = response.get('UnprocessedItems', {}).get(TABLE_NAME, [])
+                    written += len(pending) - len(unprocessed)
+                    pending = unprocessed
+                    if not pending:
+                        break
+                    if attempt < MAX_BATCH_RETRIES:
+                        time.sleep(min(0.05 * (2 ** attempt), 1.0))
+            except ClientError as e:
+                error = e.response.get('Error', {})
+                log('ERROR', 'batch write failed', error=error.get('Message'), error_code=error.get('Code'),
+                    items=len(pending))
+                failed.extend((request, error.get('Code') or 'batch write failed') for request in pending)
+                continue
+            failed.extend((request, 'unprocessed after retries') for request in pending)
+    finally:
+        if written:
+            bump_table_version()
+    return failed
+
+
+def delete_tasks(task_ids):
+    """
+    タスクを一括削除
+    
+    Returns:
+        入力と同じ順序の結果リスト（{"id": ..., "success": bool, "error": ...}）
+    """
+    # BatchWriteItemは同一キーの重複を受け付けないため、重複IDは1回だけ削除
+    unique_ids = list(dict.fromkeys(
+        task_id for task_id in task_ids if isinstance(task_id, str) and task_id and task_id != VERSION_ITEM_ID
+    ))
+    failed = {
+        request['DeleteRequest']['Key']['id']['S']: error
+        for request, error in batch_write([{'DeleteRequest': {'Key': {'id': {'S': task_id}}}} for task_id in unique_ids])
+    }
+    
+    results = []
+    for task_id in task_ids:
+        if not isinstance(task_id, str) or not task_id or task_id == VERSION_ITEM_ID:
+            results.append({'id': task_id, 'success': False, 'error': 'invalid task id'})
+        elif task_id in failed:
+            results.append({'id': task_id, 'success': False, 'error': failed[task_id]})
+        else:
+            results.append({'id': task_id, 'success': True})
+    return results
+
 
 def lambda_handler(event, context):
     """
     Delete a task from DynamoDB
     """
+    started = time.perf_counter()
+    response = handle_request(event)
+    
+    # リクエストログはサンプリング（エラーは常に出力）
+    if response['statusCode'] >= 500 or random.random() < LOG_SAMPLE_RATE:
+        log(
+            'ERROR' if response['statusCode'] >= 500 else 'INFO',
+            'request',
+            request_id=getattr(context, 'aws_request_id', None),
+            method=event.get('httpMethod', 'DELETE'),
+            status=response['statusCode'],
+            duration_ms=round((time.perf_counter() - started) * 1000, 2)
+        )
+    return response
+
+
+def handle_request(event):
+    """リクエスト処理本体"""
     try:
         # pathParametersからIDを取得
-        task_id = event.get('pathParameters', {}).get('id')
+        task_id = (event.get('pathParameters') or {}).get('id')
         
+        # 一括削除（{"ids": [...]}）
         if not task_id:
+            if 'body' in event and isinstance(event['body'], str):
+                data = json.loads(event['body'] or '{}')
+            else:
+                data = event
+            
+            if isinstance(data.get('ids'), list):
+                if len(data['ids']) > MAX_BULK_ITEMS:
+                    return {
+                        'statusCode': 400,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({'success': False, 'error': f'at most {MAX_BULK_ITEMS} ids per request'})
+                    }
+                
+                results = delete_tasks(data['ids'])
+                deleted = sum(1 for result in results if result['success'])
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'success': deleted == len(results),
+                        'deleted': deleted,
+                        'failed': len(results) - deleted,
+                        'results': results
+                    })
+                }
+        
+        if not task_id or task_id == VERSION_ITEM_ID:
             return {
                 'statusCode': 400,
                 'headers': {
@@ -28,7 +200,8 @@ def lambda_handler(event, context):
             }
         
         # DynamoDB削除
-        table.delete_item(Key={'id': task_id})
+        get_client().delete_item(TableName=TABLE_NAME, Key={'id': {'S': task_id}})
+        bump_table_version()
         
         return {
             'statusCode': 200,
@@ -38,9 +211,9 @@ def lambda_handler(event, context):
             },
             'body': json.dumps({'success': True, 'id': task_id})
         }
-        
+    
     except Exception as e:
-        print(f"Error: {e}")
+        log('ERROR', 'unhandled error', error=str(e), error_type=type(e).__name__)
         return {
             'statusCode': 500,
             'headers': {
@@ -0,0 +1,95 @@
+"""
+GSI導入前のタスクをGSIに載せるための移行スクリプト（デプロイ時に1回実行）
+
+GSI導入前に作成されたタスクは due_date が空文字列（または属性なし）のためGSIに載らず、
+status / assignee / priority で絞り込んだ一覧に現れない。
+テーブルをScanして、現行の書き込みと同じ形式（to_item）に揃える:
+
+- due_date が空文字列・属性なし → 番兵値（NO_DUE_DATE）を設定
+- assignee が空文字列 → 属性を削除（assigneeのGSIには載せない）
+
+何度実行しても結果は同じ（対象がなければ何もしない）。
+
+使い方:
+    TABLE_NAME=agentcore-tasks python lambda_targets/task_api_simple/backfill_index_keys.py --dry-run
+    TABLE_NAME=agentcore-tasks python lambda_targets/task_api_simple/backfill_index_keys.py
+"""
+import argparse
+
+from botocore.exceptions import ClientError
+
+from lambda_function import NO_DUE_DATE, TABLE_NAME, VERSION_ITEM_ID, bump_table_version, get_client, log
+
+# 移行対象（GSIのキー属性が空文字列または属性なし）
+LEGACY_FILTER = 'id <> :version AND (attribute_not_exists(due_date) OR due_date = :empty OR assignee = :empty)'
+
+
+def scan_legacy_items():
+    """移行対象のタスクを列挙"""
+    kwargs = {
+        'TableName': TABLE_NAME,
+        'FilterExpression': LEGACY_FILTER,
+        'ExpressionAttributeValues': {':version': {'S': VERSION_ITEM_ID}, ':empty': {'S': ''}},
+        'ProjectionExpression': 'id, due_date, assignee',
+    }
+    while True:
+        response = get_client().scan(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def backfill_item(item):
+    """1件をGSIに載る形式に更新（移行中に更新・削除されたタスクは対象外）"""
+    actions = []
+    conditions = ['attribute_exists(id)']
+    values = {}
+    due_date = item.get('due_date', {}).get('S')
+    if not due_date:
+        actions.append('SET due_date = :no_due_date')
+        conditions.append('(attribute_not_exists(due_date) OR due_date = :empty)')
+        values[':no_due_date'] = {'S': NO_DUE_DATE}
+        values[':empty'] = {'S': ''}
+    if item.get('assignee', {}).get('S') == '':
+        actions.append('REMOVE assignee')
+        conditions.append('assignee = :empty')
+        values[':empty'] = {'S': ''}
+    try:
+        get_client().update_item(
+            TableName=TABLE_NAME,
+            Key={'id': item['id']},
+            UpdateExpression=' '.join(actions),
+            ConditionExpression=' AND '.join(conditions),
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    return True
+
+
+def backfill(dry_run=False):
+    """移行を実行し、件数を返す"""
+    found = updated = 0
+    for item in scan_legacy_items():
+        found += 1
+        if not dry_run and backfill_item(item):
+            updated += 1
+    if updated:
+        # 一覧のスナップショット・ETagを無効化（移行したタスクを一覧に反映）
+        bump_table_version()
+    log('INFO', 'backfill index keys', table=TABLE_NAME, found=found, updated=updated, dry_run=dry_run)
+    return {'found': found, 'updated': updated}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill GSI key attributes of legacy tasks')
+    parser.add_argument('--dry-run', action='store_true', help='count legacy tasks without updating them')
+    args = parser.parse_args()
+    backfill(dry_run=args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,37 +3,488 @@ Task API Lambda (API Gateway用、Zip形式)
 """
 import json
 import os
+import time
 import uuid
+import base64
+import random
+import gzip
+import hashlib
+from collections import OrderedDict
 from datetime import datetime
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
 TABLE_NAME = os.environ.get('TABLE_NAME', 'agentcore-tasks')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(TABLE_NAME)
+
+# ローカルのDynamoDB互換エンドポイント（ベンチマーク用、通常は未設定）
+DYNAMODB_ENDPOINT_URL = os.environ.get('DYNAMODB_ENDPOINT_URL')
+
+# 構造化ログのサンプリング率（エラーは常に出力）
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+
+_client = None
+
+
+def get_client():
+    """DynamoDBクライアント（resourceより軽量、初回呼び出し時に作成して再利用）"""
+    global _client
+    if _client is None:
+        _client = boto3.client(
+            'dynamodb',
+            endpoint_url=DYNAMODB_ENDPOINT_URL,
+            config=Config(connect_timeout=2, read_timeout=5, retries={'max_attempts': 3, 'mode': 'standard'})
+        )
+    return _client
+
+
+def log(level, message, **fields):
+    """1行JSONの構造化ログ"""
+    print(json.dumps({'level': level, 'message': message, **fields}, ensure_ascii=False, default=str))
+
+
+# 一覧取得のページサイズ
+DEFAULT_LIMIT = int(os.environ.get('DEFAULT_LIMIT', '50'))
+MAX_LIMIT = int(os.environ.get('MAX_LIMIT', '100'))
+
+# フィルタ属性 → GSI（パーティションキー: 属性、ソートキー: due_date）
+# 優先度の高い順に、最初に指定された属性のGSIをQueryする
+INDEXES = [
+    ('status', os.environ.get('STATUS_INDEX', 'status-due_date-index')),
+    ('assignee', os.environ.get('ASSIGNEE_INDEX', 'assignee-due_date-index')),
+    ('priority', os.environ.get('PRIORITY_INDEX', 'priority-due_date-index')),
+]
+
+# GSIのキー属性は空文字列を書き込めないため、assigneeは空なら保存せず、
+# due_dateは空なら番兵値で保存する（期限なしのタスクもstatus等のGSIに載せるため）
+NO_DUE_DATE = '9999-12-31'
+LAST_DUE_DATE = '9999-12-30'
+
+# summaryモードで返すフィールド
+SUMMARY_FIELDS = ['id', 'title', 'status', 'priority', 'assignee', 'due_date']
+
+# 読み取り時に補完するデフォルト値
+TASK_DEFAULTS = {'description': '', 'assignee': '', 'due_date': ''}
+
+# テーブルのバージョン（作成・削除のたびに加算するカウンタ項目、一覧には含めない）
+VERSION_ITEM_ID = '#version'
+
+# バージョンを再確認するまでの秒数（この間はDynamoDBに問い合わせずスナップショットを返す）
+VERSION_CHECK_INTERVAL = float(os.environ.get('VERSION_CHECK_INTERVAL', '1.0'))
+
+# ウォームなLambda内に保持する一覧スナップショットの件数
+SNAPSHOT_MAX_ENTRIES = int(os.environ.get('SNAPSHOT_MAX_ENTRIES', '64'))
+
+# gzip圧縮するレスポンスの最小サイズ（0で無効）
+GZIP_MIN_BYTES = int(os.environ.get('GZIP_MIN_BYTES', '1024'))
+
+_version = None
+_version_checked_at = 0.0
+# 正規化したクエリ → (バージョン, ETag, レスポンスボディ)
+_snapshots = OrderedDict()
+
+
+def get_table_version():
+    """テーブルのバージョン（VERSION_CHECK_INTERVAL秒はキャッシュ）"""
+    global _version, _version_checked_at
+    now = time.monotonic()
+    if _version is None or now - _version_checked_at >= VERSION_CHECK_INTERVAL:
+        item = get_client().get_item(
+            TableName=TABLE_NAME,
+            Key={'id': {'S': VERSION_ITEM_ID}},
+            ProjectionExpression='#version',
+            ExpressionAttributeNames={'#version': 'version'}
+        ).get('Item')
+        _version = int(item['version']['N']) if item else 0
+        _version_checked_at = now
+    return _version
+
+
+def bump_table_version():
+    """書き込み後にバージョンを加算（このコンテナのキャッシュも更新）
+
+    書き込み自体は完了しているため、加算の失敗は例外にせずログに残す
+    （このコンテナのスナップショットは破棄し、他のコンテナは次の書き込みまで古い一覧を返しうる）。
+    """
+    global _version, _version_checked_at
+    try:
+        response = get_client().update_item(
+            TableName=TABLE_NAME,
+            Key={'id': {'S': VERSION_ITEM_ID}},
+            UpdateExpression='ADD #version :one',
+            ExpressionAttributeNames={'#version': 'version'},
+            ExpressionAttributeValues={':one': {'N': '1'}},
+            ReturnValues='UPDATED_NEW'
+        )
+    except ClientError as e:
+        error = e.response.get('Error', {})
+        log('ERROR', 'table version bump failed', error=error.get('Message'), error_code=error.get('Code'))
+        _snapshots.clear()
+        _version = None
+        return False
+    _version = int(response['Attributes']['version']['N'])
+    _version_checked_at = time.monotonic()
+    return True
+
+
+def encode_token(last_evaluated_key):
+    """LastEvaluatedKeyをnext_tokenに変換"""
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode('utf-8')).decode('ascii')
+
+
+class InvalidNextToken(ValueError):
+    """next_tokenが壊れている、または別のインデックス・フィルタのトークン"""
+
+
+def decode_token(token):
+    """next_tokenをExclusiveStartKeyに変換"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+    except ValueError:
+        raise InvalidNextToken(token)
+    if not isinstance(key, dict) or not key or not all(
+            isinstance(value, dict) and len(value) == 1 and set(value) <= {'S', 'N', 'B'} for value in key.values()):
+        raise InvalidNextToken(token)
+    return key
+
+
+def to_attribute(value):
+    """Python値をDynamoDB属性値に変換（タスクの属性は基本的に文字列）"""
+    if isinstance(value, str):
+        return {'S': value}
+    from boto3.dynamodb.types import TypeSerializer
+    return TypeSerializer().serialize(value)
+
+
+def from_attribute(value):
+    """DynamoDB属性値をPython値に変換"""
+    if 'S' in value:
+        return value['S']
+    from boto3.dynamodb.types import TypeDeserializer
+    return TypeDeserializer().deserialize(value)
+
+
+def to_item(task):
+    """タスクをDynamoDBアイテムに変換"""
+    item = {k: to_attribute(v) for k, v in task.items() if not (k == 'assignee' and v == '')}
+    if not task.get('due_date'):
+        item['due_date'] = {'S': NO_DUE_DATE}
+    return item
+
+
+def validate_index_keys(task):
+    """GSIのキー属性を検証（文字列以外はGSIに書き込めずValidationExceptionになる）"""
+    if not isinstance(task['priority'], str) or not task['priority']:
+        return 'priority must be a non-empty string'
+    if not isinstance(task['assignee'], str):
+        return 'assignee must be a string'
+    if task['due_date'] and not isinstance(task['due_date'], str):
+        return 'due_date must be a string'
+    return None
+
+
+def from_item(item, fields=None):
+    """DynamoDBアイテムをタスクに変換（fields指定時はその項目のみ補完）"""
+    defaults = {k: v for k, v in TASK_DEFAULTS.items() if fields is None or k in fields}
+    task = {**defaults, **{k: from_attribute(v) for k, v in item.items()}}
+    if task.get('due_date') == NO_DUE_DATE:
+        task['due_date'] = ''
+    return task
+
+
+def list_tasks(params):
+    """
+    タスク一覧取得（カーソルベースのページネーション）
+
+    Args:
+        params: {
+            "limit": 1ページの件数（既定: 50, 最大: 100）,
+            "next_token": 前ページのnext_token,
+            "status" / "assignee" / "priority": 完全一致フィルタ,
+            "due_date": 完全一致, "due_before" / "due_after": 期限の範囲（YYYY-MM-DD、両端を含む）,
+            "view": "summary" の場合は主要フィールドのみ返す
+        }
+    """
+    limit = min(max(int(params.get('limit') or DEFAULT_LIMIT), 1), MAX_LIMIT)
+    kwargs = {'TableName': TABLE_NAME, 'Limit': limit}
+    names = {}
+    values = {}
+    if params.get('next_token'):
+        kwargs['ExclusiveStartKey'] = decode_token(params['next_token'])
+    if params.get('view') == 'summary':
+        kwargs['ProjectionExpression'] = ', '.join(f'#{field}' for field in SUMMARY_FIELDS)
+        names.update({f'#{field}': field for field in SUMMARY_FIELDS})
+
+    # 期限の条件（GSIのソートキー）
+    due_condition = None
+    if params.get('due_date'):
+        due_condition = '#due_date = :due'
+        values[':due'] = {'S': params['due_date']}
+    elif params.get('due_after') and params.get('due_before'):
+        due_condition = '#due_date BETWEEN :due_from AND :due_to'
+        values.update({':due_from': {'S': params['due_after']}, ':due_to': {'S': params['due_before']}})
+    elif params.get('due_after'):
+        # 番兵値（期限なし）は含めない
+        due_condition = '#due_date BETWEEN :due_from AND :due_to'
+        values.update({':due_from': {'S': params['due_after']}, ':due_to': {'S': LAST_DUE_DATE}})
+    elif params.get('due_before'):
+        due_condition = '#due_date <= :due'
+        values[':due'] = {'S': params['due_before']}
+    if due_condition:
+        names['#due_date'] = 'due_date'
+
+    filters = {attr: params[attr] for attr, _ in INDEXES if params.get(attr)}
+
+    if filters:
+        # 最初のフィルタ属性のGSIをQueryし、残りはFilterExpressionで絞り込む
+        attr, index_name = next((a, i) for a, i in INDEXES if a in filters)
+        names[f'#{attr}'] = attr
+        values[f':{attr}'] = {'S': filters.pop(attr)}
+        key_condition = f'#{attr} = :{attr}'
+        if due_condition:
+            key_condition += f' AND {due_condition}'
+        kwargs['IndexName'] = index_name
+        kwargs['KeyConditionExpression'] = key_condition
+        if filters:
+            names.update({f'#{other_attr}': other_attr for other_attr in filters})
+            values.update({f':{other_attr}': {'S': value} for other_attr, value in filters.items()})
+            kwargs['FilterExpression'] = ' AND '.join(f'#{other_attr} = :{other_attr}' for other_attr in filters)
+        operation = get_client().query
+    else:
+        # 属性フィルタなし: 期限のみの指定はScan + FilterExpression
+        if due_condition:
+            kwargs['FilterExpression'] = due_condition
+        operation = get_client().scan
+
+    if names:
+        kwargs['ExpressionAttributeNames'] = names
+    if values:
+        kwargs['ExpressionAttributeValues'] = values
+    try:
+        response = operation(**kwargs)
+    except ClientError as e:
+        # 別のインデックス・フィルタのnext_tokenはキー構成が合わずValidationExceptionになる
+        if 'ExclusiveStartKey' in kwargs and e.response.get('Error', {}).get('Code') == 'ValidationException':
+            raise InvalidNextToken(params['next_token'])
+        raise
+    items = [item for item in response.get('Items', []) if item['id']['S'] != VERSION_ITEM_ID]
+    if len(items) < len(response.get('Items', [])) and response.get('LastEvaluatedKey'):
+        # バージョン項目（GSIには載らずScanにだけ現れる）がLimitを1件使ったため、続きの1件で埋める
+        response = operation(**{**kwargs, 'Limit': 1, 'ExclusiveStartKey': response['LastEvaluatedKey']})
+        items.extend(response.get('Items', []))
+
+    fields = SUMMARY_FIELDS if params.get('view') == 'summary' else None
+    tasks = [from_item(item, fields) for item in items]
+
+    return {
+        'success': True,
+        'tasks': tasks,
+        'count': len(tasks),
+        'next_token': encode_token(response.get('LastEvaluatedKey'))
+    }
+
+
+# 一括作成の上限とBatchWriteItemの再試行設定
+MAX_BULK_ITEMS = int(os.environ.get('MAX_BULK_ITEMS', '100'))
+BATCH_SIZE = 25
+MAX_BATCH_RETRIES = 5
+
+
+def batch_write(requests):
+    """
+    BatchWriteItemで書き込み（UnprocessedItemsは指数バックオフで再試行）
+    
+    チャンク単位のエラー（ValidationException等）はそのチャンクの残りを失敗とし、
+    1件でも書き込めていればテーブルのバージョンを加算する（例外で中断した場合も含む）
+    
+    Returns:
+        書き込めなかった (リクエスト, エラー) のリスト
+    """
+    failed = []
+    written = 0
+    try:
+        for start in range(0, len(requests), BATCH_SIZE):
+            pending = requests[start:start + BATCH_SIZE]
+            try:
+                for attempt in range(MAX_BATCH_RETRIES + 1):
+                    response = get_client().batch_write_item(RequestItems={TABLE_NAME: pending})
+                    unprocessed = response.get('UnprocessedItems', {}).get(TABLE_NAME, [])
+                    written += len(pending) - len(unprocessed)
+                    pending = unprocessed
+                    if not pending:
+                        break
+                    if attempt < MAX_BATCH_RETRIES:
+                        time.sleep(min(0.05 * (2 ** attempt), 1.0))
+            except ClientError as e:
+                error = e.response.get('Error', {})
+                log('ERROR', 'batch write failed', error=error.get('Message'), error_code=error.get('Code'),
+                    items=len(pending))
+                failed.extend((request, error.get('Code') or 'batch write failed') for request in pending)
+                continue
+            failed.extend((request, 'unprocessed after retries') for request in pending)
+    finally:
+        if written:
+            bump_table_version()
+    return failed
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-MatchがETagに一致するか"""
+    if_none_match = if_none_match or ''
+    return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+
+def get_task_list(params, if_none_match=None):
+    """
+    一覧のレスポンスボディとETagを取得
+    
+    バージョンが変わっていなければウォームなスナップショットを返し、DynamoDBは読まない。
+    ETagはバージョンとクエリだけで決まるため、If-None-Matchが一致すれば一覧を読まずに
+    (None, ETag) を返す（スナップショットのないコールドなコンテナでも304を返せる）
+    """
+    key = json.dumps(params, sort_keys=True)
+    version = get_table_version()
+    etag = f'"{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+    snapshot = _snapshots.get(key)
+    if snapshot and snapshot[0] == version:
+        _snapshots.move_to_end(key)
+        return snapshot[2], snapshot[1]
+    if etag_matches(if_none_match, etag):
+        return None, etag
+    
+    body = json.dumps(list_tasks(params))
+    _snapshots[key] = (version, etag, body)
+    _snapshots.move_to_end(key)
+    while len(_snapshots) > SNAPSHOT_MAX_ENTRIES:
+        _snapshots.popitem(last=False)
+    return body, etag
+
+
+def list_response(event, body, etag):
+    """一覧のレスポンス（If-None-Matchが一致すれば304、大きければgzip。bodyがNoneなら304）"""
+    request_headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'ETag',
+        'Cache-Control': 'no-cache',
+        'ETag': etag
+    }
+    
+    if body is None or etag_matches(request_headers.get('if-none-match'), etag):
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    
+    accept_encoding = request_headers.get('accept-encoding') or ''
+    if GZIP_MIN_BYTES and len(body) >= GZIP_MIN_BYTES and 'gzip' in accept_encoding.lower():
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': base64.b64encode(gzip.compress(body.encode('utf-8'), compresslevel=5)).decode('ascii'),
+            'isBase64Encoded': True
+        }
+    return {'statusCode': 200, 'headers': headers, 'body': body}
+
+
+def create_tasks(items):
+    """
+    タスクを一括作成
+    
+    Args:
+        items: [{"title": ..., "description": ..., "assignee": ..., "due_date": ..., "priority": ...}, ...]
+    
+    Returns:
+        入力と同じ順序の結果リスト（{"success": bool, "task" | "error": ...}）
+    """
+    now = datetime.utcnow().isoformat()
+    results = []
+    requests = []
+    for data in items:
+        if not isinstance(data, dict) or not data.get('title'):
+            results.append({'success': False, 'error': 'title is required'})
+            continue
+        task = {
+            'id': str(uuid.uuid4()),
+            'title': data['title'],
+            'description': data.get('description', ''),
+            'status': 'todo',
+            'priority': data.get('priority', 'medium'),
+            'assignee': data.get('assignee', ''),
+            'due_date': data.get('due_date', ''),
+            'created_at': now,
+            'updated_at': now
+        }
+        error = validate_index_keys(task)
+        if error:
+            results.append({'success': False, 'error': error})
+            continue
+        results.append({'success': True, 'task': task})
+        requests.append({'PutRequest': {'Item': to_item(task)}})
+    
+    failed = {request['PutRequest']['Item']['id']['S']: error for request, error in batch_write(requests)}
+    for result in results:
+        if result['success'] and result['task']['id'] in failed:
+            result.update({'success': False, 'error': failed[result['task']['id']]})
+    return results
+
 
 def lambda_handler(event, context):
     """
     API Gateway経由でタスクを作成・取得
     """
-    print(f"Event: {json.dumps(event)}")
+    started = time.perf_counter()
+    response = handle_request(event)
     
+    # リクエストログはサンプリング（エラーは常に出力）
+    if response['statusCode'] >= 500 or random.random() < LOG_SAMPLE_RATE:
+        log(
+            'ERROR' if response['statusCode'] >= 500 else 'INFO',
+            'request',
+            request_id=getattr(context, 'aws_request_id', None),
+            method=event.get('httpMethod', 'POST'),
+            status=response['statusCode'],
+            duration_ms=round((time.perf_counter() - started) * 1000, 2)
+        )
+    return response
+
+
+def handle_request(event):
+    """リクエスト処理本体"""
     try:
         # HTTPメソッド確認
         http_method = event.get('httpMethod', 'POST')
         
         # GETリクエスト - タスク一覧取得
         if http_method == 'GET':
-            response = table.scan()
-            tasks = response.get('Items', [])
+            params = event.get('queryStringParameters') or {}
+            if_none_match = next(
+                (v for k, v in (event.get('headers') or {}).items() if k.lower() == 'if-none-match'), None
+            )
+            try:
+                body, etag = get_task_list(params, if_none_match)
+            except InvalidNextToken:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({'success': False, 'error': 'invalid next_token'})
+                }
+            except (ValueError, TypeError):
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({'success': False, 'error': 'invalid limit or next_token'})
+                }
             
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'success': True, 'tasks': tasks})
-            }
+            return list_response(event, body, etag)
         
         # POSTリクエスト - タスク作成
         # API Gateway Payload Format 2.0
@@ -42,6 +493,34 @@ def lambda_handler(event, context):
         else:
             data = event
         
+        # 一括作成（{"tasks": [...]}）
+        if isinstance(data.get('tasks'), list):
+            if len(data['tasks']) > MAX_BULK_ITEMS:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({'success': False, 'error': f'at most {MAX_BULK_ITEMS} tasks per request'})
+                }
+            
+            results = create_tasks(data['tasks'])
+            created = sum(1 for result in results if result['success'])
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'success': created == len(results),
+                    'created': created,
+                    'failed': len(results) - created,
+                    'results': results
+                })
+            }
+        
         title = data.get('title')
         description = data.get('description', '')
         assignee = data.get('assignee', '')
@@ -59,6 +538,7 @@ def lambda_handler(event, context):
             }
         
         # タスク作成
+        now = datetime.utcnow().isoformat()
         task = {
             'id': str(uuid.uuid4()),
             'title': title,
@@ -67,12 +547,24 @@ def lambda_handler(event, context):
             'priority': priority,
             'assignee': assignee,
             'due_date': due_date,
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
+            'created_at': now,
+            'updated_at': now
         }
         
-        # DynamoDB書き込み
-        table.put_item(Item=task)
+        error = validate_index_keys(task)
+        if error:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'success': False, 'error': error})
+            }
+        
+        # DynamoDB書き込み（GSIキー属性を変換）
+        get_client().put_item(TableName=TABLE_NAME, Item=to_item(task))
+        bump_table_version()
         
         return {
             'statusCode': 200,
@@ -82,9 +574,9 @@ def lambda_handler(event, context):
             },
             'body': json.dumps({'success': True, 'task': task})
         }
-        
+    
     except Exception as e:
-        print(f"Error: {e}")
+        log('ERROR', 'unhandled error', error=str(e), error_type=type(e).__name__)
         return {
             'statusCode': 500,
             'headers': {
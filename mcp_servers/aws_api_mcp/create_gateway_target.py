@@ -86,3 +86,5 @@ sync_response = client.synchronize_gateway_targets(
 
 print(f"✓ Synchronization started")
 print("\nWait 1-2 minutes for synchronization to complete")
+print("Note: Slack Bot caches tools/list (GATEWAY_TOOLS_CACHE_TTL).")
+print("      Call invalidate_tool_catalog() or restart the pod to pick up the new tools immediately")
@@ -1,10 +1,13 @@
 """Slack Bot - Socket Mode"""
 import os
 import sys
+import time
 import asyncio
 import logging
-from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
+from typing import Optional
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_bolt.context.say.async_say import AsyncSay
 
 # ログ設定
 logging.basicConfig(
@@ -16,121 +19,270 @@ logger = logging.getLogger(__name__)
 # PYTHONPATHを設定
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from strands_agent.agent import TaskBotAgent
+from strands_agent.agent_pool import AgentPool
+from strands_agent.tools.gateway_tools import GatewayToolProvider, close_token_managers
+from strands_agent.tools.health_check import HealthCheckRunner, get_health_check_runner, is_shortcut
+from strands_agent.tools.http_client import close_http_client
+from strands_agent.hooks.memory_writer import close_memory_writer
+from slack_bot.dispatcher import AgentDispatcher, DispatcherFull
+from slack_bot.outbound import SlackOutbound, SlackApiError
+from slack_bot.dedup import EventDeduplicator
+from slack_bot.thread_lease import ThreadLeaseManager
+from slack_bot.forwarding import MAX_FORWARD_HOPS, ForwardServer, MentionForwarder
+from strands_agent.stream_events import TextDelta, ToolStart, FinalResult
+from strands_agent.tracing import tracer, setup_tracing, shutdown_tracing
+from opentelemetry import context as otel_context, trace
 
-# Slack App初期化
-app = App(token=os.environ["SLACK_BOT_TOKEN"])
+# Slack App初期化（単一の長寿命イベントループで動作）
+app = AsyncApp(token=os.environ["SLACK_BOT_TOKEN"])
+
+# スレッド単位のAgentプール（後続メッセージでウォームなAgentを再利用）
+agent_pool = AgentPool()
+
+# Agent実行ディスパッチャー（同時実行数制限 + スレッド単位の直列化）
+dispatcher = AgentDispatcher()
+
+# Slack送信（プール済み接続、レート制限対応）
+outbound = SlackOutbound()
+
+# 再送イベントの重複排除（スレッドの所有Podで判定するため、複数Podでもインメモリで足りる）
+deduplicator = EventDeduplicator()
+
+
+async def release_thread(thread_ts: str):
+    """スレッドの所有権を手放す前に、ウォームなAgentを破棄してMemoryに書き込む"""
+    await agent_pool.evict_thread(thread_ts)
+
+
+# スレッドの所有権（複数Pod時はリースを持つPodだけがスレッドを処理し、他のPodは転送する）
+leases = ThreadLeaseManager(on_release=release_thread)
+forwarder = MentionForwarder()
+
+# 転送イベントの再試行間隔（所有Podの停止後、リースが失効するまで待つ）
+FORWARD_RETRY_INTERVAL = 1.0
+
+_bot_user_id = None
+
+_health_check: Optional[HealthCheckRunner] = None
+
+
+async def get_bot_user_id(client) -> str:
+    """BotのユーザーIDを取得（初回のみauth.test）"""
+    global _bot_user_id
+    if _bot_user_id is None:
+        _bot_user_id = (await client.auth_test())["user_id"]
+    return _bot_user_id
 
 
 @app.event("app_mention")
-def handle_mention(event, say, client):
+async def handle_mention(event, say, client, body):
     """メンション処理"""
     logger.info(f"Received mention event: {event}")
-    
+
+    with tracer.start_as_current_span("slack.handle_mention", attributes={
+        "slack.event_id": body.get("event_id") or ""
+    }) as span:
+        thread_ts = event.get("thread_ts") or event["ts"]
+        mention_context = span.get_span_context()
+        # 所有Podが停止していればリースが失効するまで待って引き継ぐ
+        deadline = time.monotonic() + leases.ttl
+        while not await dispatch_mention(event, body, say, client, mention_context):
+            if time.monotonic() >= deadline:
+                logger.warning(f"No replica accepted the mention for thread {thread_ts}")
+                await say(
+                    text="今ちょっと混み合ってるみたい。少し待ってからもう一度話しかけてね！",
+                    thread_ts=thread_ts
+                )
+                return
+            await asyncio.sleep(FORWARD_RETRY_INTERVAL)
+
+
+async def handle_forwarded(payload) -> bool:
+    """他のPodから転送されたメンション"""
+    event = payload["event"]
+    with tracer.start_as_current_span("slack.handle_forwarded", attributes={
+        "slack.event_id": payload.get("body", {}).get("event_id") or "",
+        "slack.hops": payload.get("hops", 1)
+    }) as span:
+        say = AsyncSay(client=app.client, channel=event["channel"])
+        return await dispatch_mention(event, payload.get("body", {}), say, app.client,
+                                      span.get_span_context(), payload.get("hops", 1))
+
+
+async def dispatch_mention(event, body, say, client, mention_context=None, hops: int = 0) -> bool:
+    """スレッドを所有していればキューに積み、他のPodが所有していれば転送する
+
+    Returns:
+        受け付けた場合True（所有Podに転送できなかった場合はFalse）
+    """
+    thread_ts = event.get("thread_ts") or event["ts"]
+    span = trace.get_current_span()
+    try:
+        lease = await leases.claim(thread_ts)
+    except Exception as e:
+        # リースのバックエンド障害時はこのPodで処理を継続（重複排除と同じ方針）
+        logger.warning(f"Thread lease claim failed: {e}")
+        lease = None
+    if lease is not None:
+        span.set_attribute("slack.owner", lease.owner)
+        if hops >= MAX_FORWARD_HOPS:
+            return False
+        return await forwarder.forward(lease, {
+            "event": event, "body": {"event_id": body.get("event_id")}, "hops": hops + 1
+        })
+
+    # Slackの再送イベントはスキップ（バックエンド障害時は処理を継続）
+    try:
+        if await deduplicator.is_duplicate(body, event):
+            logger.info(f"Skipping duplicate event: {body.get('event_id')}")
+            span.set_attribute("slack.duplicate", True)
+            return True
+    except Exception as e:
+        logger.warning(f"Event dedup check failed: {e}")
+
+    async def run():
+        try:
+            await process_mention(event, say, client, mention_context)
+        finally:
+            leases.end(thread_ts)
+
+    leases.begin(thread_ts)
+    try:
+        # スレッド単位でキューに積み、ハンドラはすぐに返す
+        dispatcher.submit(thread_ts, run)
+    except DispatcherFull as e:
+        leases.end(thread_ts)
+        logger.warning(f"Rejecting mention: {e}")
+        await say(
+            text="今ちょっと混み合ってるみたい。少し待ってからもう一度話しかけてね！",
+            thread_ts=thread_ts
+        )
+    return True
+
+
+def get_health_check() -> HealthCheckRunner:
+    """ヘルスチェックのランナーを取得（初回のみ作成）"""
+    global _health_check
+    if _health_check is None:
+        _health_check = get_health_check_runner(GatewayToolProvider())
+    return _health_check
+
+
+async def process_mention(event, say, client, mention_context=None):
+    """メンションに対してAgentを実行"""
+    # キュー待ちの後に実行されるため、ターンは受信スパンにリンクした別トレースにする
+    links = [trace.Link(mention_context)] if mention_context is not None else None
+    with tracer.start_as_current_span("slack.turn", context=otel_context.Context(), links=links):
+        await _process_mention(event, say, client)
+
+
+async def _process_mention(event, say, client):
     try:
         # スレッド情報取得
         thread_ts = event.get("thread_ts") or event["ts"]
         channel_id = event["channel"]
         user_id = event["user"]
         text = event["text"]
-        
+
         logger.info(f"Processing: channel={channel_id}, user={user_id}, thread={thread_ts}")
-        
+
         # メンションを除去
-        bot_user_id = client.auth_test()["user_id"]
+        bot_user_id = await get_bot_user_id(client)
         message = text.replace(f"<@{bot_user_id}>", "").strip()
-        
+
         logger.info(f"Message after mention removal: {message}")
-        
-        # Agent実行
-        agent = TaskBotAgent(
-            actor_id=user_id,
-            session_id=thread_ts
-        )
-        
-        logger.info("Running agent with Slack notifications...")
-        
-        # Slack通知用コールバック
-        def post_to_slack(text: str):
+
+        logger.info("Running agent with streaming Slack updates...")
+
+        # 進捗と途中の応答は1つのメッセージにまとめてchat.updateで更新
+        messenger = outbound.turn(channel_id, thread_ts)
+
+        # ヘルスチェックのショートカットはモデルを介さず実行して定型の結果を返す
+        if is_shortcut(message):
+            messenger.progress("🩺 ヘルスチェックを実行中...")
             try:
-                client.chat_postMessage(
-                    channel=channel_id,
-                    thread_ts=thread_ts,
-                    text=text
-                )
+                report = await get_health_check().run()
             except Exception as e:
-                logger.error(f"Failed to post to Slack: {e}")
-        
-        # Agent実行（Slack通知Hook付き）
-        result = asyncio.run(agent.run(message, slack_callback=post_to_slack))
-        
+                # 進捗メッセージが残らないよう、エラー内容で置き換える
+                logger.error(f"Health check failed: {e}", exc_info=True)
+                await messenger.finish(f"❓ ヘルスチェックを実行できませんでした: {e}")
+                return
+            await messenger.finish(report.format_text())
+            return
+
+        # Agent実行（ストリーミング、プールから取得）
+        result = ""
+        try:
+            async with agent_pool.lease(user_id, thread_ts) as agent:
+                async for stream_event in agent.run_stream(message):
+                    if isinstance(stream_event, TextDelta):
+                        messenger.append_text(stream_event.text)
+                    elif isinstance(stream_event, ToolStart):
+                        messenger.commit_text()
+                        messenger.progress(f"🔧 {stream_event.name.split('___')[-1]} を実行中...")
+                    elif isinstance(stream_event, FinalResult):
+                        result = stream_event.text
+        except Exception:
+            # 会話状態が不整合の可能性があるため破棄
+            agent_pool.discard(user_id, thread_ts)
+            raise
+
         logger.info(f"Agent result: {result[:100]}...")
-        
-        # 最終応答
-        # 日本語の文字化けを防ぐため、直接Web APIを使用
+
+        # 最終応答（進捗メッセージを置き換え、長文は分割して投稿）
         result_text = result if isinstance(result, str) else str(result)
-        
-        # 初期メッセージを削除
         try:
-            client.chat_delete(
-                channel=channel_id,
-                ts=message_ts
-            )
-        except:
-            pass
-        
-        # 新しいメッセージを投稿（明示的にUTF-8エンコード）
-        import requests
-        import json as json_module
-        slack_token = os.environ["SLACK_BOT_TOKEN"]
-        
-        payload = {
-            "channel": channel_id,
-            "thread_ts": thread_ts,
-            "text": result_text
-        }
-        
-        # デバッグ: 送信するペイロードをログ出力
-        logger.info(f"Sending to Slack: {json_module.dumps(payload, ensure_ascii=False)[:200]}")
-        
-        response = requests.post(
-            "https://slack.com/api/chat.postMessage",
-            headers={
-                "Authorization": f"Bearer {slack_token}",
-                "Content-Type": "application/json; charset=utf-8"
-            },
-            data=json_module.dumps(payload, ensure_ascii=False).encode('utf-8')
-        )
-        
-        logger.info(f"Slack API response: {response.json()}")
-        
-        if not response.json().get("ok"):
-            logger.error(f"Slack API error: {response.json()}")
-            # フォールバック: Bolt SDKを使用
-            client.chat_postMessage(
-                channel=channel_id,
-                thread_ts=thread_ts,
-                text=result_text
-            )
-        
+            await messenger.finish(result_text)
+        except SlackApiError as e:
+            logger.error(f"Slack API error: {e.response}")
+            # フォールバック: 投稿できなかったチャンクだけをBolt SDKで投稿
+            for chunk in messenger.undelivered:
+                await client.chat_postMessage(
+                    channel=channel_id,
+                    thread_ts=thread_ts,
+                    text=chunk
+                )
+
         logger.info("Response updated successfully")
-        
+
     except Exception as e:
         logger.error(f"Error: {e}", exc_info=True)
-        say(
+        await say(
             text=f"エラーが発生しました: {str(e)}",
-            thread_ts=thread_ts
+            thread_ts=event.get("thread_ts") or event["ts"]
         )
 
 
 @app.event("message")
-def handle_message(event, logger):
+async def handle_message(event, logger):
     """全メッセージをログ出力（デバッグ用）"""
     logger.debug(f"Message event: {event}")
 
 
+async def main():
+    """Socket Mode起動"""
+    setup_tracing()
+    handler = AsyncSocketModeHandler(app, os.environ["SLACK_APP_TOKEN"])
+    # 複数Pod時は他のPodからの転送を受け付ける（THREAD_FORWARD_SECRET未設定なら起動しない）
+    forward_server = ForwardServer(handle_forwarded) if leases.shared else None
+    if forward_server is not None:
+        await forward_server.start()
+    logger.info(f"⚡️ Slack Bot is running! (replica={leases.owner})")
+    try:
+        await handler.start_async()
+    finally:
+        # 転送の受け付けを止め、実行中のAgentを待ってからリースを解放（他のPodがすぐ引き継げる）
+        if forward_server is not None:
+            await forward_server.stop()
+        await dispatcher.shutdown()
+        await agent_pool.shutdown()
+        await leases.shutdown()
+        await outbound.aclose()
+        await close_memory_writer()
+        await close_token_managers()
+        await close_http_client()
+        shutdown_tracing()
+
+
 if __name__ == "__main__":
-    # Socket Mode起動
-    handler = SocketModeHandler(app, os.environ["SLACK_APP_TOKEN"])
-    logger.info("⚡️ Slack Bot is running!")
-    handler.start()
+    asyncio.run(main())
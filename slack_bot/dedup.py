@@ -0,0 +1,91 @@
+"""Slackイベントの重複排除（再送イベントを一度だけ処理する）"""
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryDedupBackend:
+    """プロセス内のTTL付きキャッシュ（単一Pod向け、既定）"""
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    async def claim(self, key: str) -> bool:
+        """未処理ならキーを登録してTrue、処理済みならFalse"""
+        now = time.monotonic()
+        # 期限切れを古い順に削除
+        while self._seen and next(iter(self._seen.values())) < now:
+            self._seen.popitem(last=False)
+        if key in self._seen:
+            return False
+        self._seen[key] = now + self.ttl
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return True
+
+
+class RedisDedupBackend:
+    """Redis互換ストアによる共有キャッシュ（複数Pod向け、redisパッケージが必要）"""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "slack-dedup:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("redis package is required for EVENT_DEDUP_BACKEND=redis") from e
+        self._redis = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def claim(self, key: str) -> bool:
+        """SET NX EXでアトミックに登録"""
+        return bool(await self._redis.set(self.prefix + key, "1", nx=True, ex=max(int(self.ttl), 1)))
+
+
+def create_dedup_backend():
+    """環境変数からバックエンドを作成
+
+    - EVENT_DEDUP_BACKEND: memory（既定）または redis
+    - EVENT_DEDUP_REDIS_URL: Redis接続URL（redis://...）
+    - EVENT_DEDUP_TTL: 重複判定の保持秒数（既定: 600）
+    """
+    ttl = float(os.environ.get("EVENT_DEDUP_TTL", 600))
+    backend = os.environ.get("EVENT_DEDUP_BACKEND", "memory").lower()
+    if backend == "redis":
+        return RedisDedupBackend(os.environ["EVENT_DEDUP_REDIS_URL"], ttl)
+    return InMemoryDedupBackend(ttl)
+
+
+def event_keys(body: Optional[Dict[str, Any]], event: Dict[str, Any]) -> List[str]:
+    """重複判定に使うキー（event_id / client_msg_id / channel+ts）"""
+    keys = []
+    if body and body.get("event_id"):
+        keys.append(f"event:{body['event_id']}")
+    if event.get("client_msg_id"):
+        keys.append(f"msg:{event['client_msg_id']}")
+    if not keys:
+        keys.append(f"ts:{event.get('channel')}:{event.get('ts')}")
+    return keys
+
+
+class EventDeduplicator:
+    """Slackの再送（retry）イベントを検出する"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or create_dedup_backend()
+        self.duplicates = 0
+
+    async def is_duplicate(self, body: Optional[Dict[str, Any]], event: Dict[str, Any]) -> bool:
+        """いずれかのキーが処理済みなら重複とみなす"""
+        duplicate = False
+        for key in event_keys(body, event):
+            if not await self.backend.claim(key):
+                duplicate = True
+        if duplicate:
+            self.duplicates += 1
+        return duplicate
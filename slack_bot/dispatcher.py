@@ -0,0 +1,91 @@
+"""Agent実行ディスパッチャー（全体の同時実行数制限 + スレッド単位の直列化）"""
+import os
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class DispatcherFull(Exception):
+    """待ち行列が上限に達している"""
+
+
+class AgentDispatcher:
+    """長寿命イベントループ上でAgent実行をスケジュールする
+
+    - 全体の同時実行数は max_concurrency で制限
+    - 同じキー（Slackスレッド）のジョブは到着順に1件ずつ実行
+    - 実行待ちを含む総ジョブ数は max_pending で制限
+
+    環境変数:
+
+    - BOT_MAX_CONCURRENT_RUNS (既定: 8)
+    - BOT_MAX_PENDING_RUNS (既定: 100)
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_pending: Optional[int] = None):
+        self.max_concurrency = max_concurrency or int(os.environ.get("BOT_MAX_CONCURRENT_RUNS", 8))
+        self.max_pending = max_pending or int(os.environ.get("BOT_MAX_PENDING_RUNS", 100))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._queues: Dict[Hashable, Deque[Job]] = {}
+        self._runners: Dict[Hashable, asyncio.Task] = {}
+        self._pending = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def submit(self, key: Hashable, job: Job):
+        """ジョブを登録（イベントループ上から呼び出す）"""
+        if self._pending >= self.max_pending:
+            raise DispatcherFull(f"too many pending runs ({self._pending})")
+        self._pending += 1
+        self._queues.setdefault(key, deque()).append(job)
+        if key not in self._runners:
+            self._runners[key] = asyncio.get_running_loop().create_task(self._drain(key))
+
+    async def _drain(self, key: Hashable):
+        """キーごとのジョブを順番に実行"""
+        queue = self._queues[key]
+        try:
+            while queue:
+                job = queue.popleft()
+                try:
+                    async with self._get_semaphore():
+                        await job()
+                except Exception as e:
+                    logger.error(f"Run for {key} failed: {e}", exc_info=True)
+                finally:
+                    self._pending -= 1
+        finally:
+            # キャンセル時に残った未実行のジョブは破棄する
+            if queue:
+                logger.warning(f"Dropped {len(queue)} queued runs for {key}")
+                self._pending -= len(queue)
+                queue.clear()
+            del self._queues[key]
+            del self._runners[key]
+
+    def stats(self) -> Dict[str, int]:
+        """実行状況の統計"""
+        return {
+            "pending": self._pending,
+            "threads": len(self._runners),
+        }
+
+    async def shutdown(self, timeout: float = 30.0):
+        """実行中のジョブの完了を待つ（timeoutを過ぎたスレッドはキャンセルして終了を待つ）"""
+        runners = list(self._runners.values())
+        if not runners:
+            return
+        done, not_done = await asyncio.wait(runners, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            logger.warning(f"Cancelled {len(not_done)} threads still running after {timeout}s")
+            await asyncio.gather(*not_done, return_exceptions=True)
@@ -0,0 +1,103 @@
+"""スレッドを所有する別のPodへのメンションイベント転送
+
+Socket Modeではイベントは接続中のいずれかのPodに届くため、スレッドのリースを
+他のPodが持っている場合はそのPodの転送エンドポイントにイベントを渡す。
+
+- THREAD_FORWARD_PORT (既定: 8080)
+- THREAD_FORWARD_SECRET (必須。X-Forward-Secretヘッダーで照合し、未設定なら転送サーバーを起動しない)
+- THREAD_FORWARD_TIMEOUT (秒, 既定: 5)
+"""
+import os
+import hmac
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiohttp import web
+
+from strands_agent.tools.http_client import get_http_client
+from slack_bot.thread_lease import Lease
+
+logger = logging.getLogger(__name__)
+
+# 所有者の移動が続いた場合に転送を打ち切る回数
+MAX_FORWARD_HOPS = 2
+
+FORWARD_PATH = "/internal/mentions"
+
+# 転送イベントに必須の項目（ターンの実行者・投稿先）
+REQUIRED_EVENT_KEYS = ("channel", "user", "ts")
+
+Handler = Callable[[Dict[str, Any]], Awaitable[bool]]
+
+
+class MentionForwarder:
+    """リースの所有Podへイベントを送る"""
+
+    def __init__(self, secret: Optional[str] = None, timeout: Optional[float] = None):
+        self.secret = secret if secret is not None else os.environ.get("THREAD_FORWARD_SECRET", "")
+        self.timeout = timeout or float(os.environ.get("THREAD_FORWARD_TIMEOUT", 5))
+        self.forwarded = 0
+
+    async def forward(self, lease: Lease, payload: Dict[str, Any]) -> bool:
+        """所有Podが受け付けたらTrue（停止中・所有者でなくなった場合はFalse）"""
+        try:
+            response = await get_http_client().post(
+                lease.address + FORWARD_PATH,
+                json=payload,
+                headers={"X-Forward-Secret": self.secret},
+                timeout=self.timeout
+            )
+        except Exception as e:
+            logger.warning(f"Forwarding to {lease.owner} ({lease.address}) failed: {e}")
+            return False
+        if response.status_code != 202:
+            logger.info(f"{lease.owner} declined forwarded mention for {lease.key} ({response.status_code})")
+            return False
+        self.forwarded += 1
+        logger.info(f"Forwarded mention for {lease.key} to {lease.owner}")
+        return True
+
+
+class ForwardServer:
+    """他のPodから転送されたイベントを受け付けるHTTPサーバー（aiohttp）"""
+
+    def __init__(self, handler: Handler, port: Optional[int] = None, secret: Optional[str] = None):
+        self.handler = handler
+        self.port = port or int(os.environ.get("THREAD_FORWARD_PORT", 8080))
+        self.secret = secret if secret is not None else os.environ.get("THREAD_FORWARD_SECRET", "")
+        if not self.secret:
+            # 未認証の転送を受け付けると、任意のユーザーとしてAgentを実行できてしまう
+            raise RuntimeError("THREAD_FORWARD_SECRET is required to accept forwarded mentions")
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if not hmac.compare_digest(request.headers.get("X-Forward-Secret", ""), self.secret):
+            return web.Response(status=403)
+        try:
+            payload = await request.json()
+        except ValueError:
+            return web.Response(status=400, text="invalid json")
+        event = payload.get("event") if isinstance(payload, dict) else None
+        if not isinstance(event, dict) or not all(
+                isinstance(event.get(key), str) and event[key] for key in REQUIRED_EVENT_KEYS):
+            return web.Response(status=400, text="invalid event")
+        try:
+            accepted = await self.handler(payload)
+        except Exception as e:
+            logger.error(f"Forwarded mention failed: {e}", exc_info=True)
+            return web.Response(status=500)
+        return web.Response(status=202 if accepted else 409)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(FORWARD_PATH, self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "0.0.0.0", self.port).start()
+        logger.info(f"Accepting forwarded mentions on port {self.port}")
+
+    async def stop(self):
+        """受け付けを止める（以降の転送は送信側でリースの失効を待って引き継がれる）"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,232 @@
+"""Slack送信サブシステム（進捗メッセージの集約更新・レート制限対応）"""
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from strands_agent.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+SLACK_API_URL = "https://slack.com/api/"
+
+# 最終応答が空の場合に投稿するテキスト（Slackは空のtextを拒否する）
+EMPTY_MESSAGE_PLACEHOLDER = "（応答がありませんでした）"
+
+
+class SlackApiError(Exception):
+    """Slack APIがok=falseを返した"""
+
+    def __init__(self, method: str, response: Dict[str, Any]):
+        super().__init__(f"{method} failed: {response.get('error')}")
+        self.method = method
+        self.response = response
+
+
+def split_message(text: str, limit: int) -> List[str]:
+    """Slackのサイズ上限に収まるように分割（できるだけ改行位置で区切る）"""
+    if not text:
+        return [""]
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+class SlackOutbound:
+    """Slack Web APIクライアント（プール済み接続 + Retry-After対応）
+
+    環境変数:
+
+    - SLACK_OUTBOUND_MAX_RETRIES (既定: 3)
+    - SLACK_MESSAGE_CHUNK_CHARS (既定: 3500)
+    - SLACK_PROGRESS_COALESCE_SECONDS (既定: 1.0)
+    """
+
+    def __init__(self, token: Optional[str] = None):
+        self.token = token or os.environ["SLACK_BOT_TOKEN"]
+        self.max_retries = int(os.environ.get("SLACK_OUTBOUND_MAX_RETRIES", 3))
+        self.chunk_chars = int(os.environ.get("SLACK_MESSAGE_CHUNK_CHARS", 3500))
+        self.coalesce_seconds = float(os.environ.get("SLACK_PROGRESS_COALESCE_SECONDS", 1.0))
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=SLACK_API_URL,
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+        return self._client
+
+    async def call(self, method: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Web APIを呼び出す（429はRetry-Afterに従って再試行）"""
+        # 日本語の文字化けを防ぐため、明示的にUTF-8でエンコード
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        with tracer.start_as_current_span(
+            "slack.api", attributes={"slack.method": method, "payload.request_bytes": len(body)}
+        ) as span:
+            return await self._send(method, body, span)
+
+    async def _send(self, method: str, body: bytes, span) -> Dict[str, Any]:
+        """送信（失敗は通信エラー・HTTPエラーを含めて SlackApiError で送出する）"""
+        for attempt in range(self.max_retries + 1):
+            span.set_attribute("slack.retries", attempt)
+            try:
+                response = await self._get_client().post(
+                    method,
+                    headers={
+                        "Authorization": f"Bearer {self.token}",
+                        "Content-Type": "application/json; charset=utf-8"
+                    },
+                    content=body
+                )
+            except httpx.HTTPError as e:
+                raise SlackApiError(method, {"error": f"transport_error: {e}"}) from e
+            if response.status_code == 429 and attempt < self.max_retries:
+                retry_after = float(response.headers.get("Retry-After", 1))
+                logger.warning(f"Slack rate limited on {method}, retrying after {retry_after}s")
+                await asyncio.sleep(retry_after)
+                continue
+            if response.status_code == 429:
+                break
+            if response.is_error:
+                raise SlackApiError(method, {"error": f"http_{response.status_code}"})
+            data = response.json()
+            if not data.get("ok"):
+                raise SlackApiError(method, data)
+            return data
+        raise SlackApiError(method, {"error": "ratelimited"})
+
+    async def post_message(self, channel: str, thread_ts: str, text: str) -> Dict[str, Any]:
+        """chat.postMessage"""
+        return await self.call("chat.postMessage", {"channel": channel, "thread_ts": thread_ts, "text": text})
+
+    async def update_message(self, channel: str, ts: str, text: str) -> Dict[str, Any]:
+        """chat.update"""
+        return await self.call("chat.update", {"channel": channel, "ts": ts, "text": text})
+
+    def turn(self, channel: str, thread_ts: str) -> "TurnMessenger":
+        """1ターン分の送信を管理するメッセンジャーを作成"""
+        return TurnMessenger(self, channel, thread_ts)
+
+    async def aclose(self):
+        """クライアントをクローズ"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+
+class TurnMessenger:
+    """1ターンにつき進捗メッセージを1つだけ投稿し、chat.updateで書き換える
+
+    進捗は coalesce_seconds の間まとめてから送信し、最終応答は進捗メッセージを
+    置き換える形で投稿する（長い応答は分割）。ストリーミング中の応答テキストは
+    進捗の下に表示し、同じ間隔で更新する。
+    """
+
+    MAX_PROGRESS_LINES = 20
+
+    def __init__(self, outbound: SlackOutbound, channel: str, thread_ts: str):
+        self.outbound = outbound
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self._lines: List[str] = []
+        self._answer = ""
+        self._progress_ts: Optional[str] = None
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+        self.api_calls = 0
+        # finishで未投稿のチャンク（送信失敗時は呼び出し側が残りだけを再送する）
+        self.undelivered: List[str] = []
+
+    def progress(self, text: str):
+        """進捗を追加（イベントループ上から同期的に呼び出せる）"""
+        self._lines.append(text)
+        self._lines = self._lines[-self.MAX_PROGRESS_LINES:]
+        self._schedule_flush()
+
+    def append_text(self, delta: str):
+        """ストリーミング中の応答テキストを追記"""
+        self._answer += delta
+        self._schedule_flush()
+
+    def commit_text(self):
+        """ここまでの応答テキストを中間報告として進捗に移す（ツール呼び出し前など）"""
+        text = self._answer.strip()
+        self._answer = ""
+        if text:
+            self.progress(text)
+
+    def _schedule_flush(self):
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    def _render_progress(self) -> str:
+        """進捗行 + ストリーミング中の応答（長い場合は末尾のみ）"""
+        parts = ["\n".join(self._lines)] if self._lines else []
+        if self._answer.strip():
+            answer = self._answer
+            if len(answer) > self.outbound.chunk_chars:
+                answer = "…" + answer[-self.outbound.chunk_chars:]
+            parts.append(answer)
+        return "\n\n".join(parts) or "…"
+
+    async def _delayed_flush(self):
+        # 送信中に届いた進捗は次のウィンドウでまとめて送る
+        while self._dirty:
+            await asyncio.sleep(self.outbound.coalesce_seconds)
+            try:
+                # 送信中にfinishでキャンセルされても投稿自体は完了させる（ts取得のため）
+                await asyncio.shield(self._flush_progress())
+            except Exception as e:
+                logger.error(f"Failed to post progress to Slack: {e}")
+                return
+
+    async def _flush_progress(self):
+        async with self._send_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            text = self._render_progress()
+            self.api_calls += 1
+            if self._progress_ts is None:
+                response = await self.outbound.post_message(self.channel, self.thread_ts, text)
+                self._progress_ts = response["ts"]
+            else:
+                await self.outbound.update_message(self.channel, self._progress_ts, text)
+
+    async def finish(self, text: str):
+        """最終応答を投稿（進捗メッセージがあれば置き換える）
+
+        送信に失敗した場合は例外を送出し、投稿できなかったチャンクを undelivered に残す。
+        """
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._dirty = False
+
+        if not text.strip():
+            text = EMPTY_MESSAGE_PLACEHOLDER
+        self.undelivered = split_message(text, self.outbound.chunk_chars)
+        async with self._send_lock:
+            self.api_calls += 1
+            if self._progress_ts is not None:
+                await self.outbound.update_message(self.channel, self._progress_ts, self.undelivered[0])
+            else:
+                await self.outbound.post_message(self.channel, self.thread_ts, self.undelivered[0])
+            self.undelivered.pop(0)
+            while self.undelivered:
+                self.api_calls += 1
+                await self.outbound.post_message(self.channel, self.thread_ts, self.undelivered[0])
+                self.undelivered.pop(0)
+        logger.info(f"Delivered turn to Slack with {self.api_calls} API calls")
@@ -0,0 +1,388 @@
+"""Slackスレッドの所有権（リース）管理
+
+複数レプリカで動かす場合、スレッドごとに1つのPodだけがAgentを実行する
+（同じMemoryセッションへの書き込みとウォームなAgentの状態を1か所に保つ）。
+最初にイベントを受けたPodがリースを取得し、実行中・アイドル期間中は更新し続ける。
+Podが停止して更新が途絶えるとTTL後に失効し、次のイベントを受けたPodが引き継ぐ。
+
+環境変数:
+
+- THREAD_LEASE_BACKEND: memory（既定、単一Pod向け）/ redis / dynamodb
+- THREAD_LEASE_REDIS_URL: Redis接続URL（redis://...）
+- THREAD_LEASE_TABLE: DynamoDBテーブル名（パーティションキー lease_key、既定: agentcore-slack-thread-leases）
+- THREAD_LEASE_DYNAMODB_ENDPOINT: DynamoDBのエンドポイント（DynamoDB Localなどで試す場合）
+- THREAD_LEASE_TTL (秒, 既定: 30)
+- THREAD_LEASE_IDLE (最後の実行からリースを保持する秒数, 既定: 1800)
+- POD_NAME / POD_IP: リースの所有者名と転送先アドレス（Downward APIで設定）
+- THREAD_FORWARD_PORT (既定: 8080)
+"""
+import os
+import time
+import socket
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Lease:
+    """スレッドのリース（expires_atはUNIX時刻）"""
+    key: str
+    owner: str
+    address: str
+    expires_at: float
+
+
+class InMemoryLeaseBackend:
+    """プロセス内のリース表（単一Pod向け、既定）"""
+
+    shared = False
+
+    def __init__(self):
+        self._leases: Dict[str, Lease] = {}
+
+    async def acquire(self, key: str, owner: str, address: str, ttl: float) -> Lease:
+        """未所有・期限切れ・自分の所有ならリースを取得し、現在の所有者のリースを返す"""
+        now = time.time()
+        lease = self._leases.get(key)
+        if lease is None or lease.expires_at <= now or lease.owner == owner:
+            lease = Lease(key, owner, address, now + ttl)
+            self._leases[key] = lease
+        return lease
+
+    async def renew(self, keys: Iterable[str], owner: str, ttl: float) -> Set[str]:
+        """自分が所有しているリースを延長し、延長できたキーを返す"""
+        now = time.time()
+        renewed = set()
+        for key in keys:
+            lease = self._leases.get(key)
+            if lease is not None and lease.owner == owner and lease.expires_at > now:
+                lease.expires_at = now + ttl
+                renewed.add(key)
+        return renewed
+
+    async def release(self, key: str, owner: str):
+        lease = self._leases.get(key)
+        if lease is not None and lease.owner == owner:
+            del self._leases[key]
+
+
+class RedisLeaseBackend:
+    """Redis互換ストアによる共有リース（複数Pod向け、redisパッケージが必要）
+
+    キーはハッシュ（owner, address）で、有効期限はキーのTTLで管理する。
+    """
+
+    shared = True
+
+    _ACQUIRE = """
+local owner = redis.call('HGET', KEYS[1], 'owner')
+if owner and owner ~= ARGV[1] then
+  return {owner, redis.call('HGET', KEYS[1], 'address'), redis.call('PTTL', KEYS[1])}
+end
+redis.call('HSET', KEYS[1], 'owner', ARGV[1], 'address', ARGV[2])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return {ARGV[1], ARGV[2], tonumber(ARGV[3])}
+"""
+    _RENEW = """
+if redis.call('HGET', KEYS[1], 'owner') == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+    _RELEASE = """
+if redis.call('HGET', KEYS[1], 'owner') == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+    def __init__(self, url: str, prefix: str = "slack-thread-lease:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("redis package is required for THREAD_LEASE_BACKEND=redis") from e
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._acquire = self._redis.register_script(self._ACQUIRE)
+        self._renew = self._redis.register_script(self._RENEW)
+        self._release = self._redis.register_script(self._RELEASE)
+
+    async def acquire(self, key: str, owner: str, address: str, ttl: float) -> Lease:
+        holder, holder_address, ttl_ms = await self._acquire(
+            keys=[self.prefix + key], args=[owner, address, int(ttl * 1000)])
+        return Lease(key, holder, holder_address, time.time() + max(int(ttl_ms), 0) / 1000)
+
+    async def renew(self, keys: Iterable[str], owner: str, ttl: float) -> Set[str]:
+        keys = list(keys)
+        results = await asyncio.gather(*(
+            self._renew(keys=[self.prefix + key], args=[owner, int(ttl * 1000)]) for key in keys
+        ))
+        return {key for key, renewed in zip(keys, results) if renewed}
+
+    async def release(self, key: str, owner: str):
+        await self._release(keys=[self.prefix + key], args=[owner])
+
+
+class DynamoDBLeaseBackend:
+    """DynamoDBの条件付き書き込みによる共有リース（複数Pod向け）
+
+    テーブルはパーティションキー lease_key（文字列）のみ。expires_ttl をTTL属性に
+    設定しておくと、解放されなかったリースが後で削除される。
+    """
+
+    shared = True
+
+    def __init__(self, table: str, endpoint_url: Optional[str] = None, client=None):
+        import boto3
+        from botocore.exceptions import ClientError
+        self.table = table
+        self._client = client or boto3.client("dynamodb", endpoint_url=endpoint_url)
+        self._client_error = ClientError
+
+    def _is_condition_failure(self, e: Exception) -> bool:
+        return isinstance(e, self._client_error) and \
+            e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+    @staticmethod
+    def _lease(item: Dict[str, Dict[str, str]]) -> Lease:
+        return Lease(item["lease_key"]["S"], item["lease_owner"]["S"], item.get("owner_address", {}).get("S", ""),
+                     float(item["expires_at"]["N"]))
+
+    def _acquire(self, key: str, owner: str, address: str, ttl: float) -> Lease:
+        # 条件チェック失敗後に解放された場合は取得し直す
+        for _ in range(3):
+            now = time.time()
+            try:
+                self._client.put_item(
+                    TableName=self.table,
+                    Item={
+                        "lease_key": {"S": key},
+                        "lease_owner": {"S": owner},
+                        "owner_address": {"S": address},
+                        "expires_at": {"N": f"{now + ttl:.3f}"},
+                        "expires_ttl": {"N": str(int(now + ttl) + 3600)},
+                    },
+                    ConditionExpression="attribute_not_exists(lease_key) OR expires_at < :now OR lease_owner = :owner",
+                    ExpressionAttributeValues={":now": {"N": f"{now:.3f}"}, ":owner": {"S": owner}},
+                )
+                return Lease(key, owner, address, now + ttl)
+            except Exception as e:
+                if not self._is_condition_failure(e):
+                    raise
+            item = self._client.get_item(TableName=self.table, Key={"lease_key": {"S": key}},
+                                         ConsistentRead=True).get("Item")
+            if item is not None:
+                return self._lease(item)
+        raise RuntimeError(f"Lease for {key} kept changing while acquiring")
+
+    def _renew(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        try:
+            self._client.update_item(
+                TableName=self.table,
+                Key={"lease_key": {"S": key}},
+                UpdateExpression="SET expires_at = :expires, expires_ttl = :ttl",
+                ConditionExpression="lease_owner = :owner AND expires_at > :now",
+                ExpressionAttributeValues={
+                    ":expires": {"N": f"{now + ttl:.3f}"},
+                    ":ttl": {"N": str(int(now + ttl) + 3600)},
+                    ":owner": {"S": owner},
+                    ":now": {"N": f"{now:.3f}"},
+                },
+            )
+            return True
+        except Exception as e:
+            if self._is_condition_failure(e):
+                return False
+            raise
+
+    def _release(self, key: str, owner: str):
+        try:
+            self._client.delete_item(
+                TableName=self.table,
+                Key={"lease_key": {"S": key}},
+                ConditionExpression="lease_owner = :owner",
+                ExpressionAttributeValues={":owner": {"S": owner}},
+            )
+        except Exception as e:
+            if not self._is_condition_failure(e):
+                raise
+
+    async def acquire(self, key: str, owner: str, address: str, ttl: float) -> Lease:
+        return await asyncio.to_thread(self._acquire, key, owner, address, ttl)
+
+    async def renew(self, keys: Iterable[str], owner: str, ttl: float) -> Set[str]:
+        keys = list(keys)
+        results = await asyncio.gather(*(asyncio.to_thread(self._renew, key, owner, ttl) for key in keys))
+        return {key for key, renewed in zip(keys, results) if renewed}
+
+    async def release(self, key: str, owner: str):
+        await asyncio.to_thread(self._release, key, owner)
+
+
+def create_lease_backend():
+    """環境変数からバックエンドを作成"""
+    backend = os.environ.get("THREAD_LEASE_BACKEND", "memory").lower()
+    if backend == "redis":
+        return RedisLeaseBackend(os.environ["THREAD_LEASE_REDIS_URL"])
+    if backend == "dynamodb":
+        return DynamoDBLeaseBackend(os.environ.get("THREAD_LEASE_TABLE", "agentcore-slack-thread-leases"),
+                                    endpoint_url=os.environ.get("THREAD_LEASE_DYNAMODB_ENDPOINT"))
+    return InMemoryLeaseBackend()
+
+
+def default_owner() -> str:
+    return os.environ.get("POD_NAME") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def default_address() -> str:
+    """他のPodからの転送先（Pod IP + 転送ポート）"""
+    host = os.environ.get("POD_IP") or socket.gethostname()
+    return f"http://{host}:{int(os.environ.get('THREAD_FORWARD_PORT', 8080))}"
+
+
+class ThreadLeaseManager:
+    """このPodが所有するスレッドのリースを取得・更新・解放する
+
+    実行中（begin〜end）のスレッドと、最後の実行から idle 秒以内のスレッドのリースを
+    ttl/3 ごとに延長する。アイドルになったスレッドは on_release（ウォームなAgentの退避と
+    Memoryの書き込み）の後に解放し、他のPodが引き継げるようにする。
+    """
+
+    def __init__(self, backend=None, owner: Optional[str] = None, address: Optional[str] = None,
+                 ttl: Optional[float] = None, idle: Optional[float] = None,
+                 on_release: Optional[Callable[[str], Awaitable[None]]] = None):
+        self.backend = backend or create_lease_backend()
+        self.owner = owner or default_owner()
+        self.address = address or default_address()
+        self.ttl = ttl or float(os.environ.get("THREAD_LEASE_TTL", 30))
+        self.idle = idle or float(os.environ.get("THREAD_LEASE_IDLE", 1800))
+        self.on_release = on_release
+
+        # スレッド -> 最後に使った時刻（monotonic）
+        self._held: Dict[str, float] = {}
+        # スレッド -> 所有を確認できている期限（monotonic、更新が滞ったら取得し直す）
+        self._valid_until: Dict[str, float] = {}
+        self._busy: Dict[str, int] = {}
+        self._releasing: Dict[str, asyncio.Task] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    @property
+    def shared(self) -> bool:
+        """他のPodとリースを共有するバックエンドか"""
+        return self.backend.shared
+
+    async def claim(self, key: str) -> Optional[Lease]:
+        """スレッドの所有権を取得（自分が所有者ならNone、他のPodが所有していればそのリース）"""
+        releasing = self._releasing.get(key)
+        if releasing is not None:
+            # 解放中なら書き込みが終わってから取得し直す
+            await asyncio.shield(releasing)
+        now = time.monotonic()
+        if key in self._held and self._valid_until.get(key, 0) > now:
+            self._held[key] = now
+            return None
+
+        lease = await self.backend.acquire(key, self.owner, self.address, self.ttl)
+        if lease.owner != self.owner:
+            self._forget(key)
+            return lease
+        self._held[key] = now
+        self._valid_until[key] = now + self.ttl * 2 / 3
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._run_heartbeat())
+        return None
+
+    def begin(self, key: str):
+        """スレッドの実行（キュー待ちを含む）の開始（終了までは解放しない）"""
+        self._busy[key] = self._busy.get(key, 0) + 1
+        self._held[key] = time.monotonic()
+
+    def end(self, key: str):
+        count = self._busy.get(key, 0) - 1
+        if count > 0:
+            self._busy[key] = count
+        else:
+            self._busy.pop(key, None)
+        if key in self._held:
+            self._held[key] = time.monotonic()
+
+    async def _run_heartbeat(self):
+        while self._held:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self.heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 更新できないまま期限を過ぎたスレッドはclaimで取得し直す
+                logger.warning(f"Thread lease heartbeat failed: {e}")
+
+    async def heartbeat(self):
+        """アイドルのスレッドを解放し、残りのリースを延長"""
+        now = time.monotonic()
+        idle = [key for key, last_used in self._held.items()
+                if key not in self._busy and now - last_used > self.idle]
+        for key in idle:
+            await self._release(key)
+
+        keys = list(self._held)
+        if not keys:
+            return
+        renewed = await self.backend.renew(keys, self.owner, self.ttl)
+        now = time.monotonic()
+        for key in keys:
+            if key in renewed:
+                self._valid_until[key] = now + self.ttl * 2 / 3
+            elif key in self._held:
+                # 期限切れの間に他のPodが取得した（実行中なら重複実行になり得る）
+                logger.warning(f"Lost thread lease {key}{' while running' if key in self._busy else ''}")
+                self._forget(key)
+                await self._notify_release(key)
+
+    async def _release(self, key: str):
+        task = asyncio.create_task(self._release_now(key))
+        self._releasing[key] = task
+        try:
+            await asyncio.shield(task)
+        finally:
+            if self._releasing.get(key) is task:
+                del self._releasing[key]
+
+    async def _release_now(self, key: str):
+        self._forget(key)
+        # 次の所有者が完全な履歴を読めるよう、先に書き込んでから解放する
+        await self._notify_release(key)
+        await self.backend.release(key, self.owner)
+        logger.info(f"Released thread lease {key}")
+
+    async def _notify_release(self, key: str):
+        if self.on_release is None:
+            return
+        try:
+            await self.on_release(key)
+        except Exception as e:
+            logger.warning(f"Thread release hook failed for {key}: {e}")
+
+    def _forget(self, key: str):
+        self._held.pop(key, None)
+        self._valid_until.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"held": len(self._held), "busy": len(self._busy)}
+
+    async def shutdown(self):
+        """全リースを解放（停止時、他のPodがTTLを待たずに引き継げる）"""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        keys = list(self._held)
+        for key in keys:
+            try:
+                await self._release(key)
+            except Exception as e:
+                logger.warning(f"Failed to release thread lease {key}: {e}")
+        logger.info(f"Released {len(keys)} thread leases")
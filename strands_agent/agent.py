@@ -1,10 +1,32 @@
 """Strands Agent本体"""
 import os
+import time
 import asyncio
-from typing import Optional, Callable
+import logging
+from typing import Optional, Callable, Dict, Set, AsyncIterator
 from strands import Agent
+from strands.handlers.callback_handler import null_callback_handler
+from strands.tools.registry import ToolRegistry
 from strands_agent.hooks.memory_hook import create_memory_session_manager
-from strands_agent.tools.gateway_tools import GatewayToolProvider
+from strands_agent.hooks.memory_writer import close_memory_writer
+from strands_agent.tools.gateway_tools import GatewayToolProvider, close_token_managers
+from strands_agent.tools.http_client import close_http_client
+from strands_agent.tools.tool_catalog import get_tool_catalog
+from strands_agent.tools.health_check import get_health_check_runner
+from strands_agent.tools.tool_router import ToolFallbackHook, get_tool_router
+from strands_agent.context_window import RollingSummaryConversationManager
+from strands_agent.model_router import LARGE, ModelEscalationHook, get_model_router
+from strands_agent.stream_events import StreamEvent, TextDelta, ToolStart, ToolEnd, FinalResult
+from strands_agent.tracing import tracer, setup_tracing, shutdown_tracing
+from opentelemetry import context as otel_context, trace
+
+logger = logging.getLogger(__name__)
+
+
+# run_streamでバッファするイベント数（消費側が遅い場合は生成側が待つ）
+STREAM_QUEUE_SIZE = int(os.environ.get("AGENT_STREAM_QUEUE_SIZE", 64))
+
+_STREAM_END = object()
 
 
 class TaskBotAgent:
@@ -18,10 +40,10 @@ DevOpsタスクの管理とチーム支援を行うカジュアルなアシス
 **段階的な報告**: 複数のツールを使用する場合、各ツール実行後に中間結果を報告してください。
 
 例:
-ユーザー: 「タスクアプリの状態を確認して」
-あなた: （ツール実行後）「CloudFrontを確認したよ！正常に動作してる。次はS3を確認するね。」
-あなた: （ツール実行後）「S3も正常だった！次はLambda関数を確認するよ。」
-あなた: （最終）「全部確認完了！すべて正常に動作してるよ！」
+ユーザー: 「EKSクラスタの状態を確認してタスク化して」
+あなた: （ツール実行後）「クラスタを確認したよ！ACTIVEで動いてる。次はノードグループを確認するね。」
+あなた: （ツール実行後）「ノードグループも正常だった！確認タスクを作成するよ。」
+あなた: （最終）「タスクを作成したよ！すべて正常に動作してるよ！」
 
 ## 利用可能なツール
 
@@ -38,7 +60,9 @@ DevOpsタスクの管理とチーム支援を行うカジュアルなアシス
 
 ### タスク管理
 - createTask: 新しいタスクを作成
+- createTasks: 複数のタスクを一括作成（ヘルスチェック結果から複数タスクを作る場合など）
 - listTasks: タスク一覧を取得
+- deleteTasks: 複数のタスクを一括削除
 
 ### コードレビュー（DeepWiki MCP）
 - read_wiki_structure: GitHubリポジトリのドキュメント構造を取得
@@ -62,8 +86,9 @@ DevOpsタスクの管理とチーム支援を行うカジュアルなアシス
 - 「Lambda関数のセキュリティを確認して」→ path="lambda/task_api/lambda_function.py"でLambda関数を確認
 - 「React SPAのベストプラクティスを確認して」→ path="task_app/src/App.js"でフロントエンドを確認
 
-### インフラヘルスチェック（AWS CLI）
-AWS CLIコマンドを使用してタスクアプリのインフラ監視を実行できます。
+### インフラヘルスチェック
+- run_health_check: タスクアプリのインフラ（CloudFront, S3, API Gateway, Lambda, DynamoDB）をまとめて並列に確認し、判定済みの結果を返す
+- call_aws: AWS CLIコマンドを実行（個別リソースの詳細やログの調査）
 
 **監視対象リソース（正確なID）:**
 - CloudFront Distribution ID: {CLOUDFRONT_DISTRIBUTION_ID}
@@ -72,13 +97,12 @@ AWS CLIコマンドを使用してタスクアプリのインフラ監視を実
 - DynamoDBテーブル名: agentcore-tasks
 
 **ヘルスチェック方法:**
-1. AWS CLIコマンドを実行して状態確認
-2. CloudWatch Metricsでメトリクス取得
-3. CloudWatch Logsでログ確認
-4. 結果を解釈して自然言語で報告
+1. 全体の状態確認は run_health_check を1回だけ呼ぶ（call_awsでリソースを1つずつ確認しない）
+2. 結果の status（ok / warn / fail / error）と issues・facts をそのまま自然言語で報告
+3. warn / fail / error のリソースがあり、ユーザーが詳細を求めた場合のみ call_aws で CloudWatch Logs などを確認
 
 **例:**
-- 「タスクアプリの状態を確認して」→ 全リソースの状態確認
+- 「タスクアプリの状態を確認して」→ run_health_check で全リソースを一括確認
 - 「CloudFrontの状態を教えて」→ CloudFront Distribution確認
 - 「Lambdaの直近のエラーログを確認して」→ CloudWatch Logs確認
 
@@ -124,7 +148,7 @@ AWS CLIコマンドを使用してタスクアプリのインフラ監視を実
 
 ユーザー: 「タスクアプリの状態を確認して」
 あなた: 「タスクアプリの状態を確認するね！」
-→ AWS CLIコマンド実行（cloudfront, s3, apigateway, lambda, dynamodb）
+→ run_health_check実行（cloudfront, s3, apigateway, lambda, dynamodbを並列に確認）
 あなた: 「タスクアプリの状態を確認したよ！
 ✅ CloudFront: 正常稼働中
 ✅ S3バケット: 正常
@@ -147,100 +171,279 @@ AWS CLIコマンドを使用してタスクアプリのインフラ監視を実
         
         # Gateway Tools
         self.gateway_provider = GatewayToolProvider()
+        self.tool_catalog = get_tool_catalog(self.gateway_provider)
+        
+        # タスクアプリ全体のヘルスチェック（call_awsを並列実行し、判定済みの要約だけをモデルに渡す）
+        self.health_check = get_health_check_runner(self.gateway_provider)
+        
+        # メッセージに関連するツールだけをAgentに渡す（前ターンのグループは引き継ぐ）
+        self.tool_router = get_tool_router()
+        self._all_tools: Optional[list] = None
+        self._tool_groups: Set[str] = set()
+        
+        # ウォームなAgent（スレッド内の後続メッセージで再利用）
+        self._agent: Optional[Agent] = None
+        self._agent_tools: Optional[list] = None
+        
+        # 直近ターン + ローリング要約（要約はターン間にバックグラウンドで作成）
+        self.conversation_manager = RollingSummaryConversationManager(self.SYSTEM_PROMPT)
+        self._compaction: Optional[asyncio.Task] = None
+        
+        # ターンごとのモデル選択（単純な依頼は速いモデル、ツール失敗時は大きいモデルに切り替え）
+        self.model_router = get_model_router()
+        self.turn_tier = LARGE
+        self._turn_started = time.perf_counter()
+        self._escalated = False
+        
+        # 直近ターンのトークン使用量（キャッシュ読み書きを含む）
+        self.last_usage: Dict[str, int] = {}
+    
+    def _create_agent(self) -> Agent:
+        """Agent作成（セッションマネージャーが会話履歴をロードする）"""
+        return Agent(
+            model=self.model_router.model(LARGE),
+            system_prompt=self.SYSTEM_PROMPT,
+            session_manager=self.session_manager,
+            conversation_manager=self.conversation_manager,
+            tools=[],
+            hooks=[
+                ToolFallbackHook(lambda: self._all_tools, self._on_widen),
+                ModelEscalationHook(self.model_router, self._on_escalate)
+            ],
+            callback_handler=None
+        )
+    
+    async def _load_agent(self) -> Agent:
+        """ウォームなAgentを取得（初回のみ別スレッドで履歴ロード）"""
+        if self._agent is None:
+            self._agent = await asyncio.to_thread(self._create_agent)
+        return self._agent
+    
+    def _set_tools(self, agent: Agent, tools: list):
+        """Agentにツールを登録（カタログが変わった場合のみ差し替え）"""
+        if self._agent_tools is tools:
+            return
+        # セッションマネージャーは1セッション1Agentのため、Agentは作り直さずレジストリを差し替える
+        registry = ToolRegistry()
+        registry.process_tools(tools)
+        agent.tool_registry = registry
+        self._agent_tools = tools
+    
+    async def _bootstrap(self, callback_handler=None, message: Optional[str] = None) -> Agent:
+        """トークン取得・ツールカタログ取得・会話履歴ロードを並列実行"""
+        timings: Dict[str, float] = {}
+        self._turn_started = time.perf_counter()
+        self._cancel_compaction()
+        
+        async def timed(stage: str, awaitable):
+            started = time.perf_counter()
+            try:
+                with tracer.start_as_current_span(f"agent.bootstrap.{stage}"):
+                    return await awaitable
+            finally:
+                timings[stage] = (time.perf_counter() - started) * 1000
+        
+        started = time.perf_counter()
+        _, tools, agent = await asyncio.gather(
+            timed("token", self.gateway_provider.token_manager.get_token()),
+            timed("tools", self._get_gateway_tools()),
+            timed("memory", self._load_agent())
+        )
+        self._all_tools = tools
+        selected, groups = self.tool_router.select(message, tools, sticky=self._tool_groups)
+        self._tool_groups.clear()
+        self._tool_groups.update(groups)
+        self._set_tools(agent, selected)
+        self.turn_tier, reason = self.model_router.classify(message, groups, self.tool_router.enabled)
+        self._escalated = False
+        agent.model = self.model_router.model(self.turn_tier)
+        agent.callback_handler = callback_handler or null_callback_handler
+        trace.get_current_span().set_attributes({
+            "tool.selected": len(selected), "tool.available": len(tools), "model.tier": self.turn_tier
+        })
+        logger.info(f"Model tier: {self.turn_tier} ({reason})")
+        
+        total = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"Bootstrap finished in {total:.0f}ms "
+            f"(token={timings['token']:.0f}ms, tools={timings['tools']:.0f}ms, memory={timings['memory']:.0f}ms)"
+        )
+        return agent
     
     async def run(self, message: str, slack_callback: Optional[Callable[[str], None]] = None) -> str:
         """メッセージ処理"""
-        # Gateway Tools取得
-        tools = await self._get_gateway_tools()
-        
         # CallbackHandler設定
         callback_handler = None
         if slack_callback:
             from strands_agent.handlers.slack_callback_handler import SlackCallbackHandler
             callback_handler = SlackCallbackHandler(slack_callback)
         
-        # Agent作成
-        agent = Agent(
-            model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-            system_prompt=self.SYSTEM_PROMPT,
-            session_manager=self.session_manager,
-            tools=tools,
-            callback_handler=callback_handler
-        )
-        
-        # メッセージ処理
-        response = agent(message)
+        with tracer.start_as_current_span("agent.run", attributes=self._span_attributes(message)) as span:
+            # トークン・ツール・会話履歴を並列に準備（プール再利用時は履歴ロード済み）
+            agent = await self._bootstrap(callback_handler, message)
+            
+            # メッセージ処理（呼び出し元のイベントループ上で実行）
+            response = await agent.invoke_async(message)
+            self._report_usage(agent)
+            self._schedule_compaction(agent)
+            span.set_attributes({f"tokens.{key}": value for key, value in self.last_usage.items()})
         # responseはdictなので、textを抽出
         if isinstance(response, dict):
             return response.get('content', [{}])[0].get('text', str(response))
         return str(response)
     
-    async def run_stream(self, message: str):
-        """ストリーミング処理"""
-        # Gateway Tools取得
-        tools = await self._get_gateway_tools()
+    async def run_stream(self, message: str, max_buffered: Optional[int] = None) -> AsyncIterator[StreamEvent]:
+        """ストリーミング処理（TextDelta / ToolStart / ToolEnd / FinalResult を順に返す）
         
-        agent = Agent(
-            model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-            system_prompt=self.SYSTEM_PROMPT,
-            session_manager=self.session_manager,
-            tools=tools
-        )
+        生成側は別タスクで動き、上限付きキューが満杯なら消費側に追いつかれるまで待つ。
+        途中で反復をやめた場合は生成側をキャンセルする（会話状態は不整合になり得る）。
+        """
+        # yieldをまたぐためスパンは手動で管理し、各タスク内でのみカレントにする
+        span = tracer.start_span("agent.run_stream", attributes=self._span_attributes(message))
+        with trace.use_span(span):
+            agent = await self._bootstrap(message=message)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered or STREAM_QUEUE_SIZE)
         
-        # ストリーミング実行
-        for chunk in agent.stream(message):
-            yield chunk
-    
-    async def _get_gateway_tools(self):
-        """Gateway経由でツール取得してStrands Toolに変換"""
-        from strands import tool
-        import logging
-        
-        logger = logging.getLogger(__name__)
+        async def produce():
+            try:
+                with trace.use_span(span):
+                    async for event in self._typed_events(agent, message):
+                        await queue.put(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await queue.put(e)
+            else:
+                await queue.put(_STREAM_END)
         
-        # Gateway MCPからツール一覧取得
-        logger.info("Fetching tools from Gateway...")
-        tools_response = await self.gateway_provider.list_tools()
-        tools_list = tools_response.get('result', {}).get('tools', [])
-        logger.info(f"Found {len(tools_list)} tools: {[t['name'] for t in tools_list]}")
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+            span.set_attributes({f"tokens.{key}": value for key, value in self.last_usage.items()})
+            span.end()
+    
+    async def _typed_events(self, agent: Agent, message: str) -> AsyncIterator[StreamEvent]:
+        """Strandsのstream_asyncのイベントを型付きイベントに変換"""
+        tool_names: Dict[str, str] = {}
+        result = None
+        async for event in agent.stream_async(message):
+            if event.get("data"):
+                yield TextDelta(event["data"])
+            elif "current_tool_use" in event:
+                tool_use = event["current_tool_use"] or {}
+                tool_use_id = tool_use.get("toolUseId")
+                # ツール入力のストリーミング中は同じtoolUseIdが繰り返し届く
+                if tool_use_id and tool_use.get("name") and tool_use_id not in tool_names:
+                    tool_names[tool_use_id] = tool_use["name"]
+                    yield ToolStart(tool_use_id, tool_use["name"])
+            elif "message" in event and event["message"].get("role") == "user":
+                for block in event["message"].get("content", []):
+                    tool_result = block.get("toolResult")
+                    if tool_result:
+                        tool_use_id = tool_result.get("toolUseId", "")
+                        yield ToolEnd(tool_use_id, tool_names.get(tool_use_id, ""), tool_result.get("status", "success"))
+            elif "result" in event:
+                result = event["result"]
         
-        strands_tools = []
-        for tool_def in tools_list:
-            tool_name = tool_def['name']
-            tool_description = tool_def.get('description', '')
-            tool_schema = tool_def.get('inputSchema', {})
-            
-            # クロージャで各ツールの関数を作成
-            def make_tool(name: str, description: str, schema: dict):
-                @tool(name=name, description=description)
-                async def gateway_tool(**kwargs):
-                    logger.info(f"Calling Gateway tool: {name} with args: {kwargs}")
+        self._report_usage(agent)
+        self._schedule_compaction(agent)
+        yield FinalResult(str(result).strip() if result is not None else "", dict(self.last_usage))
+    
+    def _on_widen(self, group: str):
+        """ルーターが外したツールが必要だった場合は、分類も誤りとみなして大きいモデルに切り替える"""
+        self._tool_groups.add(group)
+        # ToolFallbackHookが登録したツールでレジストリが変わったため、次のターンは作り直す
+        self._agent_tools = None
+        if self._agent is not None and self.model_router.escalate(self._agent):
+            self._on_escalate(f"tool group {group} widened")
+    
+    def _on_escalate(self, reason: str):
+        logger.info(f"Escalated to the large model: {reason}")
+        self._escalated = True
+    
+    def _schedule_compaction(self, agent: Agent):
+        """古いターンの要約を次のメッセージまでの空き時間に実行"""
+        if self.conversation_manager.needs_compaction(agent):
+            self._compaction = asyncio.create_task(self._compact(agent))
+    
+    def _cancel_compaction(self):
+        """新しいターンを待たせないよう、終わっていない要約は中止（次のターン後にやり直す）"""
+        if self._compaction is not None and not self._compaction.done():
+            logger.info("Cancelling context compaction for the new turn")
+            self._compaction.cancel()
+        self._compaction = None
+    
+    async def aclose(self):
+        """バックグラウンドの要約を止めてから未書き込みのMemoryイベントを書き込む（プールから破棄する前）"""
+        if self._compaction is not None and not self._compaction.done():
+            self._compaction.cancel()
+            try:
+                await self._compaction
+            except asyncio.CancelledError:
+                pass
+        self._compaction = None
+        await asyncio.to_thread(self.session_manager.close)
+    
+    async def _compact(self, agent: Agent):
+        # ターンのトレースは終了済みのため、別のトレースとして記録する
+        with tracer.start_as_current_span("agent.compact", context=otel_context.Context()) as span:
+            try:
+                if await self.conversation_manager.compact(agent):
+                    # 要約と畳み込み済みの件数をセッションに保存（キャンセルされても保存の完了は待つ）
+                    sync = asyncio.ensure_future(asyncio.to_thread(self.session_manager.sync_agent, agent))
                     try:
-                        # kwargsキーでラップされている場合は展開
-                        if 'kwargs' in kwargs and len(kwargs) == 1:
-                            import json
-                            kwargs_value = kwargs['kwargs']
-                            # 空文字列または空の場合は空のdictとして扱う
-                            if not kwargs_value or kwargs_value == '':
-                                actual_args = {}
-                            elif isinstance(kwargs_value, str):
-                                actual_args = json.loads(kwargs_value)
-                            else:
-                                actual_args = kwargs_value
-                        else:
-                            actual_args = kwargs
-                        
-                        result = await self.gateway_provider.call_tool(name, actual_args)
-                        logger.info(f"Gateway tool {name} result: {result}")
-                        return result.get('result', {}).get('content', [{}])[0].get('text', str(result))
-                    except Exception as e:
-                        logger.error(f"Gateway tool {name} error: {e}", exc_info=True)
+                        await asyncio.shield(sync)
+                    except asyncio.CancelledError:
+                        await sync
                         raise
-                return gateway_tool
-            
-            strands_tools.append(make_tool(tool_name, tool_description, tool_schema))
-        
-        return strands_tools
+                    span.set_attribute("tokens.context", self.conversation_manager.estimate_input_tokens(agent))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Context compaction failed: {e}")
+    
+    def _span_attributes(self, message: str) -> Dict[str, object]:
+        return {
+            "agent.actor_id": self.actor_id,
+            "agent.session_id": self.session_id,
+            "payload.message_chars": len(message)
+        }
+    
+    def _report_usage(self, agent: Agent):
+        """直近ターンの入出力・キャッシュ読み書きトークン数を記録"""
+        invocation = agent.event_loop_metrics.latest_agent_invocation
+        usage = invocation.usage if invocation else {}
+        self.last_usage = {
+            "input": usage.get("inputTokens", 0),
+            "output": usage.get("outputTokens", 0),
+            "cache_read": usage.get("cacheReadInputTokens", 0),
+            "cache_write": usage.get("cacheWriteInputTokens", 0),
+        }
+        latency = (time.perf_counter() - self._turn_started) * 1000
+        self.model_router.record(self.turn_tier, latency, self.last_usage, self._escalated)
+        trace.get_current_span().set_attribute("model.escalated", self._escalated)
+        logger.info(
+            f"Turn usage: tier={self.turn_tier}{' (escalated)' if self._escalated else ''} latency={latency:.0f}ms "
+            f"input={self.last_usage['input']} output={self.last_usage['output']} "
+            f"cache_read={self.last_usage['cache_read']} cache_write={self.last_usage['cache_write']}"
+        )
+    
+    async def _get_gateway_tools(self):
+        """Gateway経由でツール取得してStrands Toolに変換（プロセス共有キャッシュ、ヘルスチェックツールを追加）"""
+        return self.health_check.extend_tools(await self.tool_catalog.get_tools())
 
 
 async def main():
@@ -257,9 +460,16 @@ async def main():
     actor_id = "cli_user"
     session_id = "cli_session_001"
     
+    setup_tracing()
     agent = RestaurantAgent(actor_id=actor_id, session_id=session_id)
-    response = await agent.run(message)
-    print(response)
+    try:
+        response = await agent.run(message)
+        print(response)
+    finally:
+        await close_memory_writer()
+        await close_token_managers()
+        await close_http_client()
+        shutdown_tracing()
 
 
 if __name__ == "__main__":
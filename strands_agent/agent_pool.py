@@ -0,0 +1,185 @@
+"""Slackスレッド単位のTaskBotAgentプール"""
+import os
+import json
+import time
+import asyncio
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from strands_agent.agent import TaskBotAgent
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PooledAgent:
+    """プール内のエントリ"""
+    agent: TaskBotAgent
+    last_used: float = field(default_factory=time.monotonic)
+    size_bytes: int = 0
+    in_use: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # 使用中にプールから外された（解放時にクローズする）
+    detached: bool = False
+
+
+def estimate_agent_bytes(agent: TaskBotAgent) -> int:
+    """ウォームなAgentが保持する会話履歴のおおよそのサイズ"""
+    strands_agent = agent._agent
+    if strands_agent is None:
+        return 0
+    try:
+        return len(json.dumps(strands_agent.messages, ensure_ascii=False, default=str).encode("utf-8"))
+    except Exception:
+        return 0
+
+
+class AgentPool:
+    """(actor_id, thread_ts) をキーにTaskBotAgentを保持するプール
+
+    スレッドの後続メッセージではメモリの再ロードやAgentの再構築を省略する。
+    LRU・アイドルTTL・メモリ上限で退避し、退避したAgentはバックグラウンドでクローズする
+    （要約を止め、未書き込みのMemoryイベントを書き込む）:
+
+    - AGENT_POOL_MAX_AGENTS (既定: 200)
+    - AGENT_POOL_IDLE_TTL (秒, 既定: 1800)
+    - AGENT_POOL_MAX_BYTES (既定: 256MB)
+    """
+
+    def __init__(self, max_agents: Optional[int] = None, idle_ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.max_agents = max_agents or int(os.environ.get("AGENT_POOL_MAX_AGENTS", 200))
+        self.idle_ttl = idle_ttl or float(os.environ.get("AGENT_POOL_IDLE_TTL", 1800))
+        self.max_bytes = max_bytes or int(os.environ.get("AGENT_POOL_MAX_BYTES", 256 * 1024 * 1024))
+        self._entries: "OrderedDict[Tuple[str, str], PooledAgent]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._closing: Set[asyncio.Task] = set()
+
+    async def _acquire(self, actor_id: str, thread_ts: str) -> PooledAgent:
+        key = (actor_id, thread_ts)
+        with self._lock:
+            evicted = self._evict()
+            entry = self._entries.get(key)
+            if entry is not None:
+                logger.info(f"Reusing warm agent for actor={actor_id}, thread={thread_ts}")
+                self._entries.move_to_end(key)
+                entry.in_use += 1
+        self._close_later(evicted)
+        if entry is not None:
+            return entry
+
+        # セッションマネージャー作成はロック外・別スレッドで行う
+        logger.info(f"Creating agent for actor={actor_id}, thread={thread_ts}")
+        agent = await asyncio.to_thread(TaskBotAgent, actor_id=actor_id, session_id=thread_ts)
+        created = PooledAgent(agent=agent)
+        with self._lock:
+            # 作成中に別のリクエストが登録していればそちらを使う
+            entry = self._entries.setdefault(key, created)
+            self._entries.move_to_end(key)
+            entry.in_use += 1
+        if entry is not created:
+            self._close_later([created])
+        return entry
+
+    def _release(self, entry: PooledAgent):
+        size = estimate_agent_bytes(entry.agent)
+        with self._lock:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            entry.size_bytes = size
+            evicted = self._evict()
+            if entry.detached and not entry.in_use:
+                evicted.append(entry)
+        self._close_later(evicted)
+
+    @asynccontextmanager
+    async def lease(self, actor_id: str, thread_ts: str) -> AsyncIterator[TaskBotAgent]:
+        """スレッドのAgentを借りる（同一スレッドの実行は直列化）"""
+        entry = await self._acquire(actor_id, thread_ts)
+        try:
+            async with entry.lock:
+                yield entry.agent
+        finally:
+            self._release(entry)
+
+    def _evict(self) -> List[PooledAgent]:
+        """アイドルTTL超過・件数上限・メモリ上限に応じて退避（使用中は対象外、ロック内で呼ぶ）
+
+        Returns:
+            退避したエントリ（ロック外で _close_later に渡す）
+        """
+        evicted = []
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if not entry.in_use and now - entry.last_used > self.idle_ttl:
+                evicted.append(self._entries.pop(key))
+
+        total = sum(entry.size_bytes for entry in self._entries.values())
+        for key, entry in list(self._entries.items()):
+            if len(self._entries) <= self.max_agents and total <= self.max_bytes:
+                break
+            if entry.in_use:
+                continue
+            evicted.append(self._entries.pop(key))
+            total -= entry.size_bytes
+        return evicted
+
+    def _detach(self, key: Tuple[str, str]) -> Optional[PooledAgent]:
+        """エントリをプールから外す（使用中なら解放時にクローズし、Noneを返す。ロック内で呼ぶ）"""
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry.in_use:
+            entry.detached = True
+            return None
+        return entry
+
+    def _close_later(self, entries: List[PooledAgent]):
+        """退避したAgentをバックグラウンドでクローズ"""
+        for entry in entries:
+            task = asyncio.get_running_loop().create_task(self._close(entry))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(entry: PooledAgent):
+        agent = entry.agent
+        try:
+            await agent.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close agent for thread={agent.session_id}: {e}")
+
+    def discard(self, actor_id: str, thread_ts: str):
+        """エントリを破棄（エラー後など）"""
+        with self._lock:
+            entry = self._detach((actor_id, thread_ts))
+        self._close_later([entry] if entry is not None else [])
+
+    async def evict_thread(self, thread_ts: str):
+        """スレッドのエントリを破棄し、未書き込みのMemoryイベントを書き込む（所有権を他のPodに渡す前）"""
+        with self._lock:
+            keys = [key for key in self._entries if key[1] == thread_ts]
+            # 実行中のターンのAgentは解放時にクローズする
+            entries = [entry for entry in map(self._detach, keys) if entry is not None]
+        await asyncio.gather(*(self._close(entry) for entry in entries))
+        if keys:
+            logger.info(f"Evicted {len(keys)} agents for thread={thread_ts}")
+
+    async def shutdown(self):
+        """全エントリをクローズし、バックグラウンドのクローズを待つ（停止時）"""
+        with self._lock:
+            entries = [entry for entry in map(self._detach, list(self._entries)) if entry is not None]
+        await asyncio.gather(*(self._close(entry) for entry in entries))
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        """プールの統計"""
+        with self._lock:
+            return {
+                "agents": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry.in_use),
+                "bytes": sum(entry.size_bytes for entry in self._entries.values()),
+            }
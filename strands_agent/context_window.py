@@ -0,0 +1,252 @@
+"""長いSlackスレッド向けの会話コンテキスト管理（直近ターン + ローリング要約）
+
+直近 keep_turns ターンはそのまま残し、それより古いターンは要約に畳み込む。
+要約は会話マネージャーの状態としてセッション（AgentCore Memory）に保存され、
+システムプロンプトのキャッシュポイントより後ろに置く（静的部分のキャッシュは維持）。
+
+- ターン後: 古いターンが fold_every を超えて溜まったら、次のターンまでの空き時間に
+  モデルで要約する（TaskBotAgentがバックグラウンドで compact を呼ぶ）
+- モデル呼び出し前: 前ターンまでの大きなツール結果を切り詰め、それでも max_tokens を
+  超える場合は古いターンから抽出的な要約に畳み込む（モデル呼び出しなし）
+
+環境変数:
+
+- CONTEXT_KEEP_TURNS (既定: 6)
+- CONTEXT_FOLD_EVERY (既定: 4)
+- CONTEXT_MAX_TOKENS (1回のモデル呼び出しの入力上限の概算, 既定: 50000)
+- CONTEXT_TOOL_RESULT_CHARS (前ターンまでのツール結果の最大文字数, 既定: 2000)
+- CONTEXT_SUMMARY_MAX_CHARS (既定: 4000)
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from strands.agent.conversation_manager import ConversationManager
+from strands.hooks import BeforeModelCallEvent, HookRegistry
+from strands.types.exceptions import ContextWindowOverflowException
+
+from strands_agent.tools.output_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = """あなたはSlackスレッドの会話履歴を要約するアシスタントです。
+以前の要約と新しいやり取りを統合し、後続の会話に必要な情報だけを日本語の箇条書きで残してください。
+- ユーザーの依頼内容と未完了の事項
+- 作成・削除したタスク、確認したリソース名・ID・状態などの事実
+- ツールの結果は結論と重要な値だけ（生の出力は含めない）
+前置きや締めの文は書かないでください。"""
+
+# 要約用のトランスクリプトに含める1ブロックあたりの最大文字数
+TRANSCRIPT_TEXT_CHARS = 1500
+TRANSCRIPT_TOOL_CHARS = 300
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else f"{text[:limit]}…"
+
+
+def _tool_result_text(tool_result: Dict[str, Any]) -> str:
+    parts = []
+    for content in tool_result.get("content", []):
+        if "text" in content:
+            parts.append(content["text"])
+        elif "json" in content:
+            parts.append(json.dumps(content["json"], ensure_ascii=False))
+    return "\n".join(parts)
+
+
+def turn_starts(messages: List[Dict[str, Any]]) -> List[int]:
+    """ターンの開始位置（ツール結果ではないユーザーメッセージ）"""
+    return [
+        i for i, message in enumerate(messages)
+        if message.get("role") == "user"
+        and not any("toolResult" in block for block in message.get("content", []))
+    ]
+
+
+def render_transcript(messages: List[Dict[str, Any]], text_chars: int = TRANSCRIPT_TEXT_CHARS,
+                      tool_chars: int = TRANSCRIPT_TOOL_CHARS) -> str:
+    """要約用にメッセージをテキスト化（ツールの入出力は短く切り詰める）"""
+    lines = []
+    for message in messages:
+        speaker = "ユーザー" if message.get("role") == "user" else "アシスタント"
+        for block in message.get("content", []):
+            if "text" in block:
+                lines.append(f"{speaker}: {_clip(block['text'], text_chars)}")
+            elif "toolUse" in block:
+                tool_use = block["toolUse"]
+                tool_input = json.dumps(tool_use.get("input", {}), ensure_ascii=False)
+                lines.append(f"[ツール呼び出し {tool_use.get('name', '')} {_clip(tool_input, tool_chars)}]")
+            elif "toolResult" in block:
+                tool_result = block["toolResult"]
+                lines.append(f"[ツール結果 {tool_result.get('status', 'success')}: "
+                             f"{_clip(_tool_result_text(tool_result), tool_chars)}]")
+    return "\n".join(lines)
+
+
+class RollingSummaryConversationManager(ConversationManager):
+    """直近Nターンを残し、古いターンをローリング要約に畳み込む会話マネージャー"""
+
+    def __init__(self, system_prompt: str, keep_turns: Optional[int] = None, fold_every: Optional[int] = None,
+                 max_tokens: Optional[int] = None, tool_result_chars: Optional[int] = None,
+                 summary_max_chars: Optional[int] = None):
+        super().__init__()
+        self.system_prompt = system_prompt
+        self.keep_turns = max(1, keep_turns or int(os.environ.get("CONTEXT_KEEP_TURNS", 6)))
+        self.fold_every = fold_every or int(os.environ.get("CONTEXT_FOLD_EVERY", 4))
+        self.max_tokens = max_tokens or int(os.environ.get("CONTEXT_MAX_TOKENS", 50000))
+        self.tool_result_chars = tool_result_chars or int(os.environ.get("CONTEXT_TOOL_RESULT_CHARS", 2000))
+        self.summary_max_chars = summary_max_chars or int(os.environ.get("CONTEXT_SUMMARY_MAX_CHARS", 4000))
+        self.summary = ""
+        self._applied: Optional[Tuple[str, bool]] = None
+
+    def restore_from_session(self, state: Dict[str, Any]) -> Optional[list]:
+        """保存済みの要約と畳み込み済みメッセージ数を復元"""
+        if state.get("__name__") != self.__class__.__name__:
+            # 以前の会話マネージャー（SlidingWindow）の状態は削除済み件数だけ引き継ぐ
+            self.removed_message_count = state.get("removed_message_count", 0)
+            return None
+        super().restore_from_session(state)
+        self.summary = state.get("summary") or ""
+        return None
+
+    def get_state(self) -> Dict[str, Any]:
+        return {**super().get_state(), "summary": self.summary}
+
+    def register_hooks(self, registry: HookRegistry, **kwargs):
+        super().register_hooks(registry, **kwargs)
+        registry.add_callback(BeforeModelCallEvent, self._before_model_call)
+
+    def apply_management(self, agent, **kwargs):
+        """ターン終了時: 大きなツール結果を切り詰める（要約はcompactで非同期に行う）"""
+        self._trim_tool_results(agent.messages, self._current_turn_start(agent.messages))
+
+    def reduce_context(self, agent, e: Optional[Exception] = None, **kwargs):
+        """コンテキスト超過時: 最も古いターンを抽出的な要約に畳み込む"""
+        starts = turn_starts(agent.messages)
+        if len(starts) < 2:
+            if self._trim_tool_results(agent.messages, len(agent.messages)):
+                return
+            raise ContextWindowOverflowException("Cannot reduce context: only the current turn remains") from e
+        self._fold(agent, starts[1], self._extract(agent.messages[:starts[1]]))
+
+    def _before_model_call(self, event: BeforeModelCallEvent):
+        """モデル呼び出しごとに入力トークンの上限を守り、要約をシステムプロンプトに反映"""
+        agent = event.agent
+        self._trim_tool_results(agent.messages, self._current_turn_start(agent.messages))
+        tokens = self.estimate_input_tokens(agent)
+        if tokens > self.max_tokens:
+            starts = turn_starts(agent.messages)
+            # 現在のターンだけになるまで古いターンから畳み込む
+            folded = 0
+            while len(starts) - folded > 1 and tokens > self.max_tokens:
+                folded += 1
+                tokens -= estimate_tokens(json.dumps(
+                    agent.messages[starts[folded - 1]:starts[folded]], ensure_ascii=False, default=str))
+            if folded:
+                self._fold(agent, starts[folded], self._extract(agent.messages[:starts[folded]]))
+            if tokens > self.max_tokens:
+                self._trim_tool_results(agent.messages, len(agent.messages))
+            logger.info(f"Context over budget: folded {folded} turns "
+                        f"(~{self.estimate_input_tokens(agent)}/{self.max_tokens} tokens)")
+        self._apply_system_prompt(agent)
+
+    def estimate_input_tokens(self, agent) -> int:
+        """システムプロンプト・ツール定義・メッセージの入力トークン数の概算"""
+        tool_specs = agent.tool_registry.get_all_tool_specs()
+        return estimate_tokens(
+            self.system_prompt + self.summary
+            + json.dumps(tool_specs, ensure_ascii=False, default=str)
+            + json.dumps(agent.messages, ensure_ascii=False, default=str)
+        )
+
+    def needs_compaction(self, agent) -> bool:
+        return len(turn_starts(agent.messages)) > self.keep_turns + self.fold_every
+
+    async def compact(self, agent) -> bool:
+        """直近 keep_turns より古いターンをモデルで要約して畳み込む（ターン間に実行）
+
+        Returns:
+            畳み込んだ場合True
+        """
+        if not self.needs_compaction(agent):
+            return False
+        snapshot = list(agent.messages)
+        split = turn_starts(snapshot)[-self.keep_turns]
+        summary = await self._summarize(agent.model, snapshot[:split])
+        # 要約中に会話が進んでいたら破棄（次のターン後にやり直す）
+        if len(agent.messages) < split or any(a is not b for a, b in zip(agent.messages[:split], snapshot)):
+            return False
+        self._fold(agent, split, summary, replace=True)
+        logger.info(f"Compacted {split} messages into a {len(self.summary)}-char summary "
+                    f"(~{self.estimate_input_tokens(agent)} tokens remain)")
+        return True
+
+    async def _summarize(self, model, messages: List[Dict[str, Any]]) -> str:
+        prompt = (
+            f"<previous_summary>\n{self.summary or '(なし)'}\n</previous_summary>\n\n"
+            f"<new_messages>\n{render_transcript(messages)}\n</new_messages>"
+        )
+        chunks = []
+        async for event in model.stream([{"role": "user", "content": [{"text": prompt}]}],
+                                        tool_specs=None, system_prompt=SUMMARY_SYSTEM_PROMPT):
+            delta = event.get("contentBlockDelta", {}).get("delta", {})
+            if delta.get("text"):
+                chunks.append(delta["text"])
+        summary = "".join(chunks).strip()
+        if not summary:
+            raise RuntimeError("Summarization returned no text")
+        return summary
+
+    def _extract(self, messages: List[Dict[str, Any]]) -> str:
+        """モデルを使わない抽出的な要約（発言の冒頭とツール名）"""
+        return render_transcript(messages, text_chars=200, tool_chars=80)
+
+    def _fold(self, agent, split: int, summary: str, replace: bool = False):
+        """先頭splitメッセージを削除して要約に反映（削除数はセッション復元時のオフセットになる）"""
+        del agent.messages[:split]
+        self.removed_message_count += split
+        merged = summary if replace or not self.summary else f"{self.summary}\n{summary}"
+        if len(merged) > self.summary_max_chars:
+            # 古い側から切り捨てる
+            merged = "…" + merged[len(merged) - self.summary_max_chars:]
+        self.summary = merged
+
+    def _current_turn_start(self, messages: List[Dict[str, Any]]) -> int:
+        starts = turn_starts(messages)
+        return starts[-1] if starts else 0
+
+    def _trim_tool_results(self, messages: List[Dict[str, Any]], end: int) -> int:
+        """messages[:end] の大きなツール結果を先頭だけに切り詰める（切り詰めた件数を返す）"""
+        trimmed = 0
+        for message in messages[:end]:
+            for block in message.get("content", []):
+                tool_result = block.get("toolResult")
+                if not tool_result:
+                    continue
+                text = _tool_result_text(tool_result)
+                if len(text) <= self.tool_result_chars:
+                    continue
+                tool_result["content"] = [{
+                    "text": f"{text[:self.tool_result_chars]}\n... [{len(text) - self.tool_result_chars} chars "
+                            f"omitted from an earlier tool result]"
+                }]
+                trimmed += 1
+        return trimmed
+
+    def _apply_system_prompt(self, agent):
+        """要約またはモデルのキャッシュ設定が変わった場合のみシステムプロンプトを組み直す"""
+        cache = bool(agent.model.get_config().get("cache_config"))
+        if (self.summary, cache) == self._applied:
+            return
+        blocks: List[Dict[str, Any]] = [{"text": self.system_prompt}]
+        if self.summary:
+            # キャッシュ対象のモデルでは静的部分の直後にキャッシュポイントを置く
+            if cache:
+                blocks.append({"cachePoint": {"type": "default"}})
+            blocks.append({"text": f"<conversation_summary>\nこのスレッドの以前のやり取りの要約:\n"
+                                   f"{self.summary}\n</conversation_summary>"})
+        agent.system_prompt = blocks
+        self._applied = (self.summary, cache)
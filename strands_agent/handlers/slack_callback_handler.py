@@ -0,0 +1,37 @@
+"""Slack進捗通知用CallbackHandler"""
+import logging
+from typing import Any, Callable, Set
+
+logger = logging.getLogger(__name__)
+
+
+class SlackCallbackHandler:
+    """Agentの実行イベントを進捗テキストに変換してコールバックへ渡す
+
+    - ツール呼び出し開始時: 「🔧 <ツール名> を実行中...」
+    - ツール呼び出しを含むアシスタントメッセージ: その中間報告テキスト
+    最終応答は呼び出し元が別途投稿するため、ここでは通知しない。
+    """
+
+    def __init__(self, callback: Callable[[str], None]):
+        self.callback = callback
+        self._seen_tool_use_ids: Set[str] = set()
+
+    def __call__(self, **kwargs: Any):
+        try:
+            tool_use = kwargs.get("current_tool_use")
+            if tool_use and tool_use.get("name"):
+                tool_use_id = tool_use.get("toolUseId")
+                if tool_use_id not in self._seen_tool_use_ids:
+                    self._seen_tool_use_ids.add(tool_use_id)
+                    self.callback(f"🔧 {tool_use['name'].split('___')[-1]} を実行中...")
+
+            message = kwargs.get("message")
+            if message and message.get("role") == "assistant":
+                content = message.get("content", [])
+                if any("toolUse" in block for block in content):
+                    text = "".join(block.get("text", "") for block in content).strip()
+                    if text:
+                        self.callback(text)
+        except Exception as e:
+            logger.error(f"Slack callback failed: {e}")
@@ -1,7 +1,46 @@
 """Memory統合 - AgentCoreMemorySessionManager使用"""
 import os
+import logging
+import threading
+from functools import lru_cache
+from typing import Optional
+from bedrock_agentcore.memory.integrations.strands import session_manager as agentcore_session_manager
 from bedrock_agentcore.memory.integrations.strands.session_manager import AgentCoreMemorySessionManager
 from bedrock_agentcore.memory.integrations.strands.config import AgentCoreMemoryConfig
+from strands_agent.hooks.memory_writer import MemoryWriter, get_memory_writer
+from strands_agent.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# バッファがこの件数に達したらターンの途中でも書き込む（ライブラリの上限は100）
+MEMORY_BATCH_SIZE = min(max(int(os.environ.get("MEMORY_BATCH_SIZE", 20)), 2), 100)
+MEMORY_WRITE_BEHIND = os.environ.get("MEMORY_WRITE_BEHIND", "true").lower() == "true"
+
+# ライトビハインドが上書き・利用するAgentCoreMemorySessionManagerの内部（bedrock-agentcore 1.24.1 で確認）
+# ライブラリの更新で変わった場合は、永続化を壊さないよう同期書き込みに戻す
+WRITE_BEHIND_METHODS = (
+    "_flush_messages_only", "_flush_agent_states_only", "_flush_messages",
+    "pending_message_count", "pending_agent_state_count", "_stop_flush_timer",
+    "create_message", "create_agent", "read_agent", "list_messages",
+)
+WRITE_BEHIND_ATTRIBUTES = ("_message_buffer", "_message_lock", "_agent_state_buffer", "_agent_state_lock")
+
+
+class WriteBehindUnsupported(RuntimeError):
+    """インストールされたbedrock-agentcoreがライトビハインドの前提を満たさない"""
+
+
+@lru_cache(maxsize=None)
+def write_behind_supported() -> bool:
+    """ライトビハインドが依存するライブラリ内部のメソッドがあるか（初回のみ確認し、なければ警告）"""
+    missing = [name for name in WRITE_BEHIND_METHODS if not callable(getattr(AgentCoreMemorySessionManager, name, None))]
+    buffered = getattr(agentcore_session_manager, "BufferedMessage", None)
+    if "timestamp" not in getattr(buffered, "_fields", ()):
+        missing.append("BufferedMessage.timestamp")
+    if missing:
+        logger.warning(f"bedrock-agentcore does not provide {', '.join(missing)}; "
+                       f"falling back to synchronous memory writes")
+    return not missing
 
 
 def sanitize_for_memory(value: str) -> str:
@@ -9,7 +48,115 @@ def sanitize_for_memory(value: str) -> str:
     return value.replace(".", "-")
 
 
-def create_memory_session_manager(memory_id: str, actor_id: str, session_id: str) -> AgentCoreMemorySessionManager:
+class TracedMemorySessionManager(AgentCoreMemorySessionManager):
+    """Memory APIの呼び出し（履歴ロード・メッセージ追加・状態同期）をスパンで計測"""
+    
+    def initialize(self, agent, **kwargs):
+        with tracer.start_as_current_span("memory.load") as span:
+            super().initialize(agent, **kwargs)
+            span.set_attribute("memory.messages", len(agent.messages))
+    
+    def append_message(self, message, agent, **kwargs):
+        with tracer.start_as_current_span("memory.append", attributes={"memory.role": message.get("role", "")}):
+            super().append_message(message, agent, **kwargs)
+    
+    def sync_agent(self, agent, **kwargs):
+        with tracer.start_as_current_span("memory.sync"):
+            super().sync_agent(agent, **kwargs)
+
+
+class WriteBehindMemorySessionManager(TracedMemorySessionManager):
+    """メッセージとエージェント状態をバッファに積み、書き込みはMemoryWriterに任せる
+    
+    ライブラリのバッチモード（batch_size > 1）のバッファをそのまま使い、
+    件数到達・ターン終了時の書き込みをバックグラウンドに回す。読み込み前には
+    同じセッションの未書き込み分を同期的に書き込む（プール退避後の再作成でも履歴が揃う）。
+    """
+    
+    def __init__(self, *args, writer: Optional[MemoryWriter] = None, **kwargs):
+        config = kwargs.get("agentcore_memory_config") or args[0]
+        self.session_key = (config.memory_id, config.actor_id, config.session_id)
+        self.writer = writer or get_memory_writer()
+        self._write_lock = threading.Lock()
+        # 親の初期化でセッションを読み込むため、先に同じセッションの未書き込み分を書き込む
+        self.writer.flush_session(self.session_key)
+        super().__init__(*args, **kwargs)
+        missing = [name for name in WRITE_BEHIND_ATTRIBUTES if not hasattr(self, name)]
+        if missing:
+            raise WriteBehindUnsupported(f"AgentCoreMemorySessionManager has no {', '.join(missing)}")
+    
+    def create_message(self, session_id, agent_id, session_message, **kwargs):
+        result = super().create_message(session_id, agent_id, session_message, **kwargs)
+        if self.pending_message_count():
+            self.writer.schedule(self)
+        return result
+    
+    def create_agent(self, session_id, session_agent, **kwargs):
+        super().create_agent(session_id, session_agent, **kwargs)
+        if self.pending_agent_state_count():
+            self.writer.schedule(self)
+    
+    def read_agent(self, session_id, agent_id, **kwargs):
+        self.writer.flush_session(self.session_key)
+        return super().read_agent(session_id, agent_id, **kwargs)
+    
+    def list_messages(self, session_id, agent_id, limit=None, offset=0, **kwargs):
+        self.writer.flush_session(self.session_key)
+        return super().list_messages(session_id, agent_id, limit=limit, offset=offset, **kwargs)
+    
+    # ライブラリが同期的に呼ぶ書き込み（件数到達・ターン終了・タイマー）はバックグラウンドに回す
+    def _flush_messages_only(self):
+        self.writer.schedule(self, immediate=True)
+        return []
+    
+    def _flush_agent_states_only(self):
+        self.writer.schedule(self, immediate=True)
+        return []
+    
+    def _flush_messages(self):
+        self.writer.schedule(self, immediate=True)
+        return []
+    
+    def has_pending(self) -> bool:
+        return bool(self.pending_message_count() or self.pending_agent_state_count())
+    
+    def write_pending(self) -> bool:
+        """バッファを順序どおりに書き込む（MemoryWriterのスレッドから呼ばれる）"""
+        with self._write_lock:
+            if not self.has_pending():
+                return True
+            with tracer.start_as_current_span("memory.flush", attributes={
+                "memory.messages": self.pending_message_count(),
+                "memory.agent_states": self.pending_agent_state_count()
+            }):
+                try:
+                    AgentCoreMemorySessionManager._flush_messages_only(self)
+                    self._coalesce_agent_states()
+                    AgentCoreMemorySessionManager._flush_agent_states_only(self)
+                    return True
+                except Exception as e:
+                    logger.warning(f"Memory flush failed for session {self.session_id}: {e}")
+                    # 失敗分はバッファ末尾に戻されるため、後から積まれた分と順序を揃え直す
+                    with self._message_lock:
+                        self._message_buffer.sort(key=lambda buffered: buffered.timestamp)
+                    self._coalesce_agent_states()
+                    return False
+    
+    def _coalesce_agent_states(self):
+        """エージェント状態はエージェントごとに最新の1件だけ書き込む"""
+        with self._agent_state_lock:
+            latest = {}
+            for session_id, session_agent in sorted(self._agent_state_buffer, key=lambda e: e[1].updated_at):
+                latest[session_agent.agent_id] = (session_id, session_agent)
+            self._agent_state_buffer[:] = list(latest.values())
+    
+    def close(self):
+        """残りを同期的に書き込む"""
+        self._stop_flush_timer()
+        self.writer.flush(self)
+
+
+def create_memory_session_manager(memory_id: str, actor_id: str, session_id: str) -> TracedMemorySessionManager:
     """AgentCoreMemorySessionManagerを作成
     
     Args:
@@ -18,15 +165,30 @@ def create_memory_session_manager(memory_id: str, actor_id: str, session_id: str
         session_id: Session ID (Slackスレッド)
     
     Returns:
-        AgentCoreMemorySessionManager: セッションマネージャー
+        TracedMemorySessionManager: セッションマネージャー（既定はライトビハインド。ライブラリが前提を
+            満たさない場合は同期書き込み）
     """
+    if MEMORY_WRITE_BEHIND and write_behind_supported():
+        config = AgentCoreMemoryConfig(
+            memory_id=memory_id,
+            actor_id=actor_id,
+            session_id=sanitize_for_memory(session_id),
+            batch_size=MEMORY_BATCH_SIZE
+        )
+        try:
+            return WriteBehindMemorySessionManager(
+                agentcore_memory_config=config,
+                region_name=os.environ.get("AWS_REGION", "ap-northeast-1")
+            )
+        except WriteBehindUnsupported as e:
+            logger.warning(f"{e}; falling back to synchronous memory writes")
+    
     config = AgentCoreMemoryConfig(
         memory_id=memory_id,
         actor_id=actor_id,
         session_id=sanitize_for_memory(session_id)
     )
-    
-    return AgentCoreMemorySessionManager(
+    return TracedMemorySessionManager(
         agentcore_memory_config=config,
         region_name=os.environ.get("AWS_REGION", "ap-northeast-1")
     )
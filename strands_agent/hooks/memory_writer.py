@@ -0,0 +1,214 @@
+"""AgentCore Memoryへの書き込みをターンの外で行うライトビハインド・ライター
+
+セッションマネージャーはメッセージとエージェント状態をバッファに積むだけにし、
+実際のcreate_eventはこのライターのスレッドで行う。書き込みのタイミング:
+
+- 件数: バッファが MEMORY_BATCH_SIZE に達したとき（すぐに書き込む）
+- 時間: 最初の未書き込みから MEMORY_FLUSH_INTERVAL 秒後
+- ターン終了時（すぐに書き込む）
+- 同じセッションの読み込み前（同期的に書き込んでから読む）
+- シャットダウン時（同期的に書き込む）
+
+失敗時はバッファに戻し、指数バックオフで再試行する。
+
+- MEMORY_FLUSH_INTERVAL (秒, 既定: 2)
+- MEMORY_FLUSH_RETRIES (既定: 5、超えたら次の書き込み要求まで保留)
+- MEMORY_FLUSH_BACKOFF / MEMORY_FLUSH_BACKOFF_MAX (秒, 既定: 0.5 / 30)
+- MEMORY_WRITER_CONCURRENCY (既定: 4)
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Optional, Protocol, Set
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter(Protocol):
+    """ライターに登録するセッションマネージャーのインターフェース"""
+
+    session_key: Hashable
+
+    def write_pending(self) -> bool:
+        """バッファを書き込む（成功ならTrue）"""
+        ...
+
+    def has_pending(self) -> bool:
+        """未書き込みのデータがあるか"""
+        ...
+
+
+class MemoryWriter:
+    """未書き込みのセッションを期限順に書き込むバックグラウンドライター（プロセス共有）"""
+
+    def __init__(self, flush_interval: Optional[float] = None, max_retries: Optional[int] = None,
+                 backoff: Optional[float] = None, backoff_max: Optional[float] = None,
+                 concurrency: Optional[int] = None):
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.environ.get("MEMORY_FLUSH_INTERVAL", 2))
+        self.max_retries = max_retries if max_retries is not None else int(
+            os.environ.get("MEMORY_FLUSH_RETRIES", 5))
+        self.backoff = backoff if backoff is not None else float(os.environ.get("MEMORY_FLUSH_BACKOFF", 0.5))
+        self.backoff_max = backoff_max if backoff_max is not None else float(
+            os.environ.get("MEMORY_FLUSH_BACKOFF_MAX", 30))
+        self.concurrency = concurrency or int(os.environ.get("MEMORY_WRITER_CONCURRENCY", 4))
+
+        self._cond = threading.Condition()
+        # 未書き込みのデータを持つセッションマネージャー
+        self._pending: Set[BufferedWriter] = set()
+        # セッションマネージャー -> 次に書き込む時刻（monotonic）
+        self._deadlines: Dict[BufferedWriter, float] = {}
+        self._running: Set[BufferedWriter] = set()
+        self._failures: Dict[BufferedWriter, int] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def schedule(self, writer: BufferedWriter, immediate: bool = False):
+        """書き込みを予約（既に早い予約があればそちらを優先）"""
+        deadline = time.monotonic() + (0 if immediate else self.flush_interval)
+        with self._cond:
+            self._pending.add(writer)
+            if self._closed:
+                # シャットダウン後はclose()側で同期的に書き込む
+                return
+            current = self._deadlines.get(writer)
+            if current is None or deadline < current:
+                self._deadlines[writer] = deadline
+                self._cond.notify()
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                    thread_name_prefix="memory-writer")
+                self._thread = threading.Thread(target=self._run, name="memory-writer-scheduler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    waiting = {w: d for w, d in self._deadlines.items() if w not in self._running}
+                    due = [w for w, d in waiting.items() if d <= now]
+                    if due:
+                        break
+                    self._cond.wait(timeout=min(waiting.values()) - now if waiting else None)
+                for writer in due:
+                    del self._deadlines[writer]
+                    self._running.add(writer)
+            for writer in due:
+                try:
+                    self._executor.submit(self._write, writer)
+                except RuntimeError:
+                    # インタープリター終了中（shutdown()が呼ばれなかった場合）
+                    logger.warning(f"Memory writer stopped before writing {writer.session_key}")
+                    return
+
+    def _write(self, writer: BufferedWriter):
+        ok = False
+        try:
+            ok = writer.write_pending()
+        except Exception as e:
+            logger.warning(f"Memory write failed for {writer.session_key}: {e}")
+        with self._cond:
+            self._running.discard(writer)
+            if ok:
+                self._failures.pop(writer, None)
+                if not writer.has_pending() and writer not in self._deadlines:
+                    self._pending.discard(writer)
+            else:
+                self._retry_later(writer)
+            self._cond.notify()
+
+    def _retry_later(self, writer: BufferedWriter):
+        """失敗したセッションをバックオフ後に再予約（_cond保持中に呼ぶ）"""
+        failures = self._failures.get(writer, 0) + 1
+        if failures > self.max_retries:
+            # データはバッファに残し、次の書き込み要求・シャットダウン時に再試行する
+            self._failures.pop(writer, None)
+            logger.error(f"Memory write for {writer.session_key} failed {failures - 1} times; "
+                         f"keeping buffered events until the next write")
+            return
+        self._failures[writer] = failures
+        delay = min(self.backoff_max, self.backoff * 2 ** (failures - 1)) * random.uniform(0.5, 1.0)
+        logger.warning(f"Retrying memory write for {writer.session_key} in {delay:.1f}s (attempt {failures})")
+        # 新しい書き込み要求があってもバックオフより早くは再試行しない
+        self._deadlines[writer] = max(self._deadlines.get(writer, 0), time.monotonic() + delay)
+
+    def flush(self, writer: BufferedWriter) -> bool:
+        """呼び出し元のスレッドで同期的に書き込む"""
+        ok = writer.write_pending()
+        with self._cond:
+            if ok and not writer.has_pending():
+                self._pending.discard(writer)
+                self._deadlines.pop(writer, None)
+                self._failures.pop(writer, None)
+        return ok
+
+    def flush_session(self, session_key: Hashable) -> bool:
+        """同じセッションの未書き込みデータを書き込む（読み込み前の整合性のため）"""
+        with self._cond:
+            writers = [w for w in self._pending if w.session_key == session_key]
+        return all([self.flush(writer) for writer in writers])
+
+    def pending_count(self) -> int:
+        """未書き込みのデータを持つセッション数"""
+        with self._cond:
+            return len(self._pending)
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """スケジューラーを止め、残りを同期的に書き込む（失敗時はバックオフしつつtimeoutまで再試行）"""
+        timeout = timeout if timeout is not None else float(os.environ.get("MEMORY_SHUTDOWN_TIMEOUT", 10))
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread, executor = self._thread, self._executor
+        if thread is not None:
+            thread.join()
+            executor.shutdown(wait=True)
+
+        with self._cond:
+            writers = list(self._pending)
+        for writer in writers:
+            attempt = 0
+            while True:
+                try:
+                    if self.flush(writer):
+                        break
+                except Exception as e:
+                    logger.warning(f"Memory write failed for {writer.session_key}: {e}")
+                delay = min(self.backoff_max, self.backoff * 2 ** attempt)
+                attempt += 1
+                if attempt > self.max_retries or time.monotonic() + delay > deadline:
+                    logger.error(f"Dropping unwritten memory events for {writer.session_key} on shutdown")
+                    break
+                time.sleep(delay)
+        logger.info(f"Memory writer stopped ({len(writers)} sessions flushed)")
+
+
+_memory_writer: Optional[MemoryWriter] = None
+_memory_writer_lock = threading.Lock()
+
+
+def get_memory_writer() -> MemoryWriter:
+    """プロセス共有のMemoryライターを取得"""
+    global _memory_writer
+    with _memory_writer_lock:
+        if _memory_writer is None:
+            _memory_writer = MemoryWriter()
+        return _memory_writer
+
+
+async def close_memory_writer():
+    """未書き込みのMemoryイベントを書き込んでライターを停止"""
+    global _memory_writer
+    with _memory_writer_lock:
+        writer, _memory_writer = _memory_writer, None
+    if writer is not None:
+        await asyncio.to_thread(writer.shutdown)
@@ -0,0 +1,185 @@
+"""ターンごとに応答モデルを選ぶローカルの段階的モデルルーター
+
+単純な依頼（1つのツールグループで済む短い依頼・雑談）は速いモデル、複数ステップの
+調査・レビュー・ヘルスチェックは大きいモデルに振り分ける。速いモデルで実行中に
+ツールが失敗した場合は、同じターンの残りを大きいモデルに切り替える。
+
+環境変数:
+
+- MODEL_ROUTER_ENABLED (既定: true)
+- BEDROCK_MODEL_ID (大きいモデル, 既定: Claude 3.5 Sonnet)
+- BEDROCK_FAST_MODEL_ID (速いモデル, 既定: Claude 3 Haiku)
+- MODEL_ROUTER_FAST_MAX_CHARS (速いモデルに回すメッセージの最大文字数, 既定: 120)
+- MODEL_ROUTER_COMPLEX_KEYWORDS (カンマ区切り、大きいモデルに回すキーワードの追加)
+- FAST_MODEL_PROMPT_CACHE (速いモデルでもプロンプトキャッシュを使う, 既定: false)
+- MODEL_ROUTER_STATS_INTERVAL (段階ごとの統計をログに出すターン間隔, 0で無効, 既定: 50)
+"""
+import os
+import re
+import json
+import threading
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from strands.hooks import AfterToolCallEvent, HookProvider, HookRegistry
+from strands.models import BedrockModel
+from strands.models.model import CacheConfig
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+LARGE = "large"
+
+LARGE_MODEL_ID = os.environ.get("BEDROCK_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
+FAST_MODEL_ID = os.environ.get("BEDROCK_FAST_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+
+# 複数ステップの推論が要る依頼（大きいモデル）
+DEFAULT_COMPLEX_KEYWORDS = [
+    "レビュー", "ヘルスチェック", "状態", "調査", "分析", "原因", "比較", "設計", "改善", "なぜ",
+    "セキュリティ", "ベストプラクティス",
+    "review", "health", "investigate", "analyze", "compare", "why",
+]
+
+# 1つの依頼に複数の作業が含まれていることを示す表現
+_multi_step = re.compile(r"(それから|その後|あと[、,]|ついでに|して[、,].+して|and then|\n.*\n)")
+
+# ターンごとのレイテンシを保持する件数（中央値の計算用）
+LATENCY_SAMPLES = 500
+
+
+class ModelRouter:
+    """メッセージとツールルーターの選択結果からモデルの段階（fast / large）を決める"""
+
+    def __init__(self, enabled: Optional[bool] = None, fast_max_chars: Optional[int] = None,
+                 complex_keywords: Optional[Iterable[str]] = None, prompt_cache: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else (
+            os.environ.get("MODEL_ROUTER_ENABLED", "true").lower() == "true")
+        self.fast_max_chars = fast_max_chars or int(os.environ.get("MODEL_ROUTER_FAST_MAX_CHARS", 120))
+        keywords = list(DEFAULT_COMPLEX_KEYWORDS) if complex_keywords is None else list(complex_keywords)
+        keywords.extend(
+            word.strip() for word in os.environ.get("MODEL_ROUTER_COMPLEX_KEYWORDS", "").split(",") if word.strip()
+        )
+        self.complex_keywords = [word.lower() for word in keywords]
+        self.prompt_cache = prompt_cache if prompt_cache is not None else (
+            os.environ.get("PROMPT_CACHE_ENABLED", "true").lower() == "true")
+        self.fast_prompt_cache = self.prompt_cache and (
+            os.environ.get("FAST_MODEL_PROMPT_CACHE", "false").lower() == "true")
+        self.stats_interval = int(os.environ.get("MODEL_ROUTER_STATS_INTERVAL", 50))
+
+        self._models: Dict[str, BedrockModel] = {}
+        self._lock = threading.Lock()
+        # 段階 -> {"turns", "escalated", "input", "output", "cache_read"} とレイテンシ（ms）
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._turns = 0
+
+    def model(self, tier: str) -> BedrockModel:
+        """段階のモデル（プロセス共有、システムプロンプトとツール定義の末尾にキャッシュポイント）"""
+        with self._lock:
+            model = self._models.get(tier)
+            if model is None:
+                cache = self.fast_prompt_cache if tier == FAST else self.prompt_cache
+                model = BedrockModel(
+                    model_id=FAST_MODEL_ID if tier == FAST else LARGE_MODEL_ID,
+                    cache_config=CacheConfig(system_prompt_ttl=True, tools_ttl=True) if cache else None
+                )
+                self._models[tier] = model
+            return model
+
+    def tier_of(self, model) -> str:
+        return FAST if model is self._models.get(FAST) else LARGE
+
+    def classify(self, message: Optional[str], groups: Iterable[str], tools_routed: bool = True) -> Tuple[str, str]:
+        """ローカルのヒューリスティックで段階と理由を返す
+
+        Args:
+            message: ユーザーのメッセージ
+            groups: ツールルーターが選んだツールグループ（空なら該当ツールなし）
+            tools_routed: ツールルーターが有効か（無効ならグループから必要なツール数を判断できない）
+        """
+        if not self.enabled:
+            return LARGE, "router disabled"
+        if not tools_routed:
+            return LARGE, "tools not routed"
+        text = (message or "").lower()
+        keyword = next((word for word in self.complex_keywords if word in text), None)
+        if keyword:
+            return LARGE, f"keyword {keyword}"
+        if len(text) > self.fast_max_chars:
+            return LARGE, f"{len(text)} chars"
+        groups = list(groups)
+        if len(groups) > 1:
+            return LARGE, f"{len(groups)} tool groups"
+        if _multi_step.search(text):
+            return LARGE, "multi-step request"
+        return FAST, f"{len(groups)} tool group" if groups else "no tools"
+
+    def escalate(self, agent) -> bool:
+        """速いモデルで実行中なら大きいモデルに切り替える（以降のモデル呼び出しから有効）"""
+        if self.tier_of(agent.model) != FAST:
+            return False
+        agent.model = self.model(LARGE)
+        return True
+
+    def record(self, tier: str, latency_ms: float, usage: Dict[str, int], escalated: bool):
+        """ターンの段階・レイテンシ・トークン数を記録（エスカレーションは開始時の段階に数える）
+
+        stats_interval ターンごとに段階ごとの統計をログに出す（速いモデルへの振り分けの効果を確認する）。
+        """
+        with self._lock:
+            stats = self._stats.setdefault(
+                tier, {"turns": 0, "escalated": 0, "input": 0, "output": 0, "cache_read": 0})
+            stats["turns"] += 1
+            stats["escalated"] += int(escalated)
+            for key in ("input", "output", "cache_read"):
+                stats[key] += usage.get(key, 0)
+            self._latencies.setdefault(tier, deque(maxlen=LATENCY_SAMPLES)).append(latency_ms)
+            self._turns += 1
+            turns = self._turns
+        if self.stats_interval > 0 and turns % self.stats_interval == 0:
+            logger.info(f"Model router stats after {turns} turns: {json.dumps(self.stats())}")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """段階ごとのターン数・エスカレーション数・トークン数・レイテンシ（中央値/p90）"""
+        with self._lock:
+            result = {}
+            for tier, stats in self._stats.items():
+                latencies = sorted(self._latencies.get(tier, ()))
+                result[tier] = {
+                    **stats,
+                    "p50_ms": latencies[len(latencies) // 2] if latencies else 0,
+                    "p90_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))] if latencies else 0,
+                }
+            return result
+
+
+class ModelEscalationHook(HookProvider):
+    """速いモデルでのツール失敗時に、同じターンの残りを大きいモデルで続ける"""
+
+    def __init__(self, router: ModelRouter, on_escalate: Optional[Callable[[str], None]] = None):
+        self.router = router
+        self.on_escalate = on_escalate
+
+    def register_hooks(self, registry: HookRegistry, **kwargs):
+        registry.add_callback(AfterToolCallEvent, self.after_tool_call)
+
+    def after_tool_call(self, event: AfterToolCallEvent):
+        if event.result.get("status") != "error":
+            return
+        name = event.tool_use["name"]
+        if self.router.escalate(event.agent):
+            logger.info(f"Escalating to the large model after tool error: {name}")
+            if self.on_escalate:
+                self.on_escalate(f"tool error {name}")
+
+
+_model_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """プロセス共有のモデルルーターを取得"""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter()
+    return _model_router
@@ -0,0 +1,34 @@
+"""TaskBotAgent.run_stream が返すストリーミングイベント"""
+from dataclasses import dataclass, field
+from typing import Dict, Union
+
+
+@dataclass
+class TextDelta:
+    """モデルが生成したテキストの差分"""
+    text: str
+
+
+@dataclass
+class ToolStart:
+    """ツール呼び出しの開始（toolUseIdごとに1回）"""
+    tool_use_id: str
+    name: str
+
+
+@dataclass
+class ToolEnd:
+    """ツール呼び出しの完了"""
+    tool_use_id: str
+    name: str
+    status: str = "success"
+
+
+@dataclass
+class FinalResult:
+    """ターンの最終応答とトークン使用量"""
+    text: str
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+StreamEvent = Union[TextDelta, ToolStart, ToolEnd, FinalResult]
@@ -1,89 +1,300 @@
 """Gateway MCP統合ツール"""
 import os
-import httpx
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+import asyncio
+import itertools
+import logging
+import random
+import time
+from typing import Optional, Dict, Any, List, Tuple, Union
+from strands_agent.tools.http_client import get_http_client
+from strands_agent.tools.result_cache import ToolResultCache, get_result_cache
+from strands_agent.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPCリクエストID（プロセス内で一意）
+_request_ids = itertools.count(1)
 
 
 class GatewayTokenManager:
-    """OAuth2トークン管理"""
+    """OAuth2トークン管理
     
-    def __init__(self, client_id: str, client_secret: str, token_endpoint: str):
+    - リフレッシュはシングルフライト（同時に期限切れになっても取得は1回）
+    - 期限の refresh_margin 秒前にバックグラウンドで先行リフレッシュ
+    - リフレッシュ失敗時はジッター付き指数バックオフで再試行
+    """
+    
+    def __init__(self, client_id: str, client_secret: str, token_endpoint: str,
+                 refresh_margin: float = 300.0, expiry_margin: float = 30.0):
         self.client_id = client_id
         self.client_secret = client_secret
         self.token_endpoint = token_endpoint
+        self.refresh_margin = refresh_margin
+        self.expiry_margin = expiry_margin
         self._token: Optional[str] = None
-        self._expires_at: Optional[datetime] = None
+        self._expires_at: float = 0.0
+        self._refresh_at: float = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresher: Optional[asyncio.Task] = None
+    
+    def _bind_loop(self):
+        """ロックとバックグラウンドタスクを現在のイベントループに紐付け"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._refresher = None
+        if self._refresher is None or self._refresher.done():
+            if self._token:
+                self._refresher = loop.create_task(self._refresh_loop())
     
     async def get_token(self) -> str:
         """トークン取得（自動リフレッシュ）"""
-        if self._token and self._expires_at and self._expires_at > datetime.now():
+        self._bind_loop()
+        if self._token and time.monotonic() < self._expires_at:
             return self._token
         
-        # トークン取得
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                self.token_endpoint,
-                data={
-                    'grant_type': 'client_credentials',
-                    'client_id': self.client_id,
-                    'client_secret': self.client_secret
-                },
-                headers={'Content-Type': 'application/x-www-form-urlencoded'}
-            )
-            response.raise_for_status()
+        token = await self._refresh(proactive=False)
+        self._bind_loop()
+        return token
+    
+    async def _refresh(self, proactive: bool) -> str:
+        """シングルフライトでトークンを再取得"""
+        async with self._lock:
+            # ロック待ちの間に他のコルーチンが更新済みならそれを使う
+            deadline = self._refresh_at if proactive else self._expires_at
+            if self._token and time.monotonic() < deadline:
+                return self._token
+            
+            # トークン取得（共有クライアントで接続を再利用）
+            with tracer.start_as_current_span("gateway.token.refresh", attributes={"token.proactive": proactive}):
+                client = get_http_client()
+                response = await client.post(
+                    self.token_endpoint,
+                    data={
+                        'grant_type': 'client_credentials',
+                        'client_id': self.client_id,
+                        'client_secret': self.client_secret
+                    },
+                    headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                    timeout=30.0
+                )
+                response.raise_for_status()
             data = response.json()
+            expires_in = data.get('expires_in', 3600)
+            now = time.monotonic()
             self._token = data['access_token']
-            expires_in = data.get('expires_in', 3600) - 300  # 5分前にリフレッシュ
-            self._expires_at = datetime.now() + timedelta(seconds=expires_in)
+            self._expires_at = now + max(expires_in - self.expiry_margin, 0)
+            self._refresh_at = now + max(expires_in - self.refresh_margin, expires_in / 2)
             return self._token
+    
+    @staticmethod
+    def _backoff(failures: int, base: float = 1.0, cap: float = 60.0) -> float:
+        """ジッター付き指数バックオフ（full jitter）"""
+        return random.uniform(0, min(cap, base * (2 ** failures)))
+    
+    async def _refresh_loop(self):
+        """期限前にトークンを先行リフレッシュするバックグラウンドタスク"""
+        failures = 0
+        while True:
+            if failures:
+                delay = self._backoff(failures)
+            else:
+                delay = max(self._refresh_at - time.monotonic(), 0)
+            await asyncio.sleep(delay)
+            try:
+                await self._refresh(proactive=True)
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Token refresh failed (attempt {failures}): {e}")
+    
+    async def close(self):
+        """バックグラウンドリフレッシュを停止"""
+        refresher, self._refresher = self._refresher, None
+        if refresher is not None and not refresher.done():
+            refresher.cancel()
+            try:
+                await refresher
+            except (asyncio.CancelledError, RuntimeError):
+                pass
+
+
+_token_managers: Dict[Tuple[str, str], GatewayTokenManager] = {}
+
+
+def get_token_manager(client_id: str, client_secret: str, token_endpoint: str) -> GatewayTokenManager:
+    """プロセス共有のトークンマネージャーを取得"""
+    key = (token_endpoint, client_id)
+    manager = _token_managers.get(key)
+    if manager is None:
+        manager = GatewayTokenManager(client_id, client_secret, token_endpoint)
+        _token_managers[key] = manager
+    return manager
+
+
+async def close_token_managers():
+    """全トークンマネージャーのバックグラウンドリフレッシュを停止"""
+    for manager in _token_managers.values():
+        await manager.close()
 
 
 class GatewayToolProvider:
     """Gateway MCP統合"""
     
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None, result_cache: Optional[ToolResultCache] = None):
         self.gateway_url = os.environ["GATEWAY_URL"]
-        self.token_manager = GatewayTokenManager(
+        self.token_manager = get_token_manager(
             client_id=os.environ["GATEWAY_CLIENT_ID"],
             client_secret=os.environ["GATEWAY_CLIENT_SECRET"],
             token_endpoint=os.environ["GATEWAY_TOKEN_ENDPOINT"]
         )
+        self.max_concurrency = max_concurrency or int(os.environ.get("GATEWAY_MAX_CONCURRENCY", 8))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.result_cache = result_cache or get_result_cache()
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """同時実行数制限用セマフォ（イベントループ単位）"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+    
+    @staticmethod
+    def _request(method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """JSON-RPCリクエストを作成（IDはプロセス内で一意）"""
+        request = {
+            "jsonrpc": "2.0",
+            "id": next(_request_ids),
+            "method": method
+        }
+        if params is not None:
+            request["params"] = params
+        return request
+    
+    async def _post(self, payload: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Any:
+        """GatewayへJSON-RPCリクエスト（単発またはバッチ配列）を送信"""
+        method = payload["method"] if isinstance(payload, dict) else "batch"
+        with tracer.start_as_current_span("gateway.post", attributes={"rpc.method": method}) as span:
+            token = await self.token_manager.get_token()
+            
+            client = get_http_client()
+            async with self._get_semaphore():
+                response = await client.post(
+                    self.gateway_url,
+                    headers={"Authorization": f"Bearer {token}"},
+                    json=payload
+                )
+            span.set_attributes({
+                "rpc.batch_size": len(payload) if isinstance(payload, list) else 1,
+                "payload.request_bytes": len(response.request.content),
+                "payload.response_bytes": len(response.content),
+                "http.status_code": response.status_code
+            })
+            response.raise_for_status()
+            return response.json()
     
     async def list_tools(self) -> Dict[str, Any]:
         """利用可能なツール一覧を取得"""
-        token = await self.token_manager.get_token()
+        return await self._post(self._request("tools/list"))
+    
+    async def _call(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """tools/callリクエストを実行（結果キャッシュ経由）"""
+        tool_name = request["params"]["name"]
+        arguments = request["params"]["arguments"]
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                self.gateway_url,
-                headers={"Authorization": f"Bearer {token}"},
-                json={
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "tools/list"
-                }
-            )
-            response.raise_for_status()
-            return response.json()
+        with tracer.start_as_current_span("gateway.tool_call", attributes={"tool.name": tool_name}) as span:
+            cached = self.result_cache.get(tool_name, arguments)
+            span.set_attribute("cache.hit", cached is not None)
+            if cached is not None:
+                logger.info(f"Gateway tool {tool_name} served from cache")
+                return {**cached, "id": request["id"]}
+            
+            generation = self.result_cache.generation(tool_name)
+            try:
+                response = await self._post(request)
+            finally:
+                self.result_cache.on_write(tool_name)
+            self.result_cache.put(tool_name, arguments, response, generation)
+            return response
     
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """ツール実行"""
-        token = await self.token_manager.get_token()
+        return await self._call(self._request("tools/call", {
+            "name": tool_name,
+            "arguments": arguments
+        }))
+    
+    async def call_tools(self, calls: List[Tuple[str, Dict[str, Any]]], batch: bool = False) -> List[Dict[str, Any]]:
+        """複数ツールを並列実行
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                self.gateway_url,
-                headers={"Authorization": f"Bearer {token}"},
-                json={
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "tools/call",
-                    "params": {
-                        "name": tool_name,
-                        "arguments": arguments
-                    }
-                }
-            )
-            response.raise_for_status()
-            return response.json()
+        Args:
+            calls: (ツール名, 引数) のリスト
+            batch: Trueの場合は1回のPOSTでJSON-RPCバッチ配列として送信
+        
+        Returns:
+            callsと同じ順序のJSON-RPCレスポンスのリスト
+            （個別の失敗は "error" キーを持つレスポンスとして返す）
+        """
+        requests = [
+            self._request("tools/call", {"name": name, "arguments": arguments})
+            for name, arguments in calls
+        ]
+        
+        if batch:
+            # キャッシュヒット分は送信せず、残りを1回のバッチで送信
+            responses = []
+            pending = []
+            for request in requests:
+                cached = self.result_cache.get(request["params"]["name"], request["params"]["arguments"])
+                if cached is not None:
+                    responses.append({**cached, "id": request["id"]})
+                else:
+                    pending.append(request)
+            if pending:
+                generations = [self.result_cache.generation(request["params"]["name"]) for request in pending]
+                try:
+                    sent = await self._post(pending)
+                except Exception as e:
+                    # バッチ全体の失敗は並列実行時と同じく、リクエストごとのエラーとして返す
+                    logger.error(f"Gateway batch call error: {e}")
+                    sent = [
+                        {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32603, "message": str(e)}}
+                        for request in pending
+                    ]
+                finally:
+                    for request in pending:
+                        self.result_cache.on_write(request["params"]["name"])
+                if isinstance(sent, dict):
+                    sent = [sent]
+                sent_by_id = {response.get("id"): response for response in sent if isinstance(response, dict)}
+                for request, generation in zip(pending, generations):
+                    if request["id"] in sent_by_id:
+                        self.result_cache.put(request["params"]["name"], request["params"]["arguments"],
+                                              sent_by_id[request["id"]], generation)
+                responses.extend(sent)
+        else:
+            async def send(request):
+                try:
+                    return await self._call(request)
+                except Exception as e:
+                    logger.error(f"Gateway tool {request['params']['name']} error: {e}")
+                    return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32603, "message": str(e)}}
+            
+            responses = await asyncio.gather(*(send(request) for request in requests))
+        
+        # IDでレスポンスを突き合わせ
+        by_id = {response.get("id"): response for response in responses if isinstance(response, dict)}
+        return [
+            by_id.get(request["id"], {
+                "jsonrpc": "2.0",
+                "id": request["id"],
+                "error": {"code": -32603, "message": "no response for request id"}
+            })
+            for request in requests
+        ]
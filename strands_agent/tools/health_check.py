@@ -0,0 +1,378 @@
+"""タスクアプリのインフラを並列に確認する宣言的ヘルスチェック
+
+チェック（AWS CLIコマンド + 判定ルール）の一覧を、AWS API MCPターゲットの call_aws で
+まとめて並列実行し、判定はローカルで行う。モデルには判定済みの短い要約だけを渡す
+（モデルの往復はツール呼び出し1回分）。Slackのショートカットからはモデルを介さずに実行する。
+
+環境変数:
+
+- HEALTH_CHECK_CLOUDFRONT_ID / HEALTH_CHECK_S3_BUCKET (未設定ならそのチェックは行わない)
+- HEALTH_CHECK_REST_API_ID (未設定なら HEALTH_CHECK_REST_API_NAME を名前に含むREST APIの有無を確認, 既定: task)
+- HEALTH_CHECK_LAMBDA_FUNCTIONS (カンマ区切り, 既定: task-api-simple,task-api-delete)
+- HEALTH_CHECK_DYNAMODB_TABLE (既定: agentcore-tasks)
+- HEALTH_CHECK_METRIC_MINUTES (Lambdaエラー数を集計する直近の分数, 既定: 60)
+- HEALTH_CHECK_SPEC_FILE (JSONのチェック一覧で既定のチェックを置き換える。ランナーごとに初回の実行時に
+  1度だけ読み込み、コマンド中の ${start_time} / ${end_time} は実行時に置換)
+- HEALTH_CHECK_BATCH (true で1回のPOSTにまとめて送信, 既定: false)
+- HEALTH_CHECK_SHORTCUTS (Slackでモデルを介さず実行するメッセージ, カンマ区切り, 既定: ヘルスチェック,healthcheck)
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from string import Template
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from strands import tool
+
+from strands_agent.tools.gateway_tools import GatewayToolProvider
+from strands_agent.tools.result_cache import base_tool_name, is_error_response
+from strands_agent.tools.tool_catalog import GatewayToolCatalog, get_tool_catalog
+from strands_agent.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+CALL_AWS = "call_aws"
+HEALTH_CHECK_TOOL = "run_health_check"
+
+OK = "ok"
+WARN = "warn"
+FAIL = "fail"
+ERROR = "error"
+
+# 全体の状態は最も悪いチェックの状態
+_SEVERITY = {OK: 0, WARN: 1, FAIL: 2, ERROR: 3}
+_ICONS = {OK: "✅", WARN: "⚠️", FAIL: "❌", ERROR: "❓"}
+
+# 判定ルールの演算子（actual, expected）
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda actual, expected: actual == expected,
+    "ne": lambda actual, expected: actual != expected,
+    "in": lambda actual, expected: actual in expected,
+    "lte": lambda actual, expected: actual is not None and actual <= expected,
+    "gte": lambda actual, expected: actual is not None and actual >= expected,
+    "exists": lambda actual, expected: actual is not None,
+    "nonempty": lambda actual, expected: bool(actual),
+    "all_eq": lambda actual, expected: all(item == expected for item in actual or []),
+}
+
+
+@dataclass
+class Rule:
+    """コマンド出力の1項目に対する判定（pathは "." 区切り、空なら出力全体）"""
+    path: str
+    op: str
+    value: Any = None
+    severity: str = FAIL
+
+    def evaluate(self, output: Any) -> Optional[str]:
+        """満たさなければ理由を返す"""
+        actual = lookup(output, self.path)
+        try:
+            passed = OPERATORS[self.op](actual, self.value)
+        except TypeError:
+            passed = False
+        if passed:
+            return None
+        expected = "" if self.op in ("exists", "nonempty") else f" {json.dumps(self.value, ensure_ascii=False)}"
+        return f"{self.path or 'output'}={json.dumps(actual, ensure_ascii=False, default=str)} " \
+               f"(expected {self.op}{expected})"
+
+
+@dataclass
+class HealthCheck:
+    """1つのリソースに対するチェック（AWS CLIコマンド1回）"""
+    name: str
+    resource: str
+    command: str
+    rules: List[Rule] = field(default_factory=list)
+    # 要約に含める値（ラベル -> path）
+    facts: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HealthCheck":
+        return cls(
+            name=data["name"],
+            resource=data.get("resource", data["name"]),
+            command=data["command"],
+            rules=[Rule(**rule) for rule in data.get("rules", [])],
+            facts=dict(data.get("facts", {})),
+        )
+
+
+@dataclass
+class CheckResult:
+    """チェック1件の判定結果"""
+    name: str
+    resource: str
+    status: str
+    issues: List[str] = field(default_factory=list)
+    facts: Dict[str, Any] = field(default_factory=dict)
+
+    def to_summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {"name": self.name, "resource": self.resource, "status": self.status}
+        if self.issues:
+            summary["issues"] = self.issues
+        if self.facts:
+            summary["facts"] = self.facts
+        return summary
+
+
+@dataclass
+class HealthReport:
+    """ヘルスチェック全体の結果"""
+    results: List[CheckResult]
+    elapsed_ms: float
+
+    @property
+    def status(self) -> str:
+        return max((result.status for result in self.results), key=_SEVERITY.get, default=OK)
+
+    def to_summary(self) -> Dict[str, Any]:
+        """モデルに渡す判定済みの要約"""
+        return {
+            "status": self.status,
+            "elapsed_ms": round(self.elapsed_ms),
+            "checks": [result.to_summary() for result in self.results],
+        }
+
+    def format_text(self) -> str:
+        """Slack向けの定型メッセージ（ショートカット用）"""
+        lines = [f"{_ICONS[self.status]} タスクアプリのヘルスチェック: {self.status.upper()} "
+                 f"({len(self.results)}件, {self.elapsed_ms / 1000:.1f}秒)"]
+        for result in self.results:
+            facts = ", ".join(
+                f"{key}: {', '.join(map(str, value)) if isinstance(value, list) else value}"
+                for key, value in result.facts.items()
+            )
+            lines.append(f"{_ICONS[result.status]} {result.resource}" + (f"（{facts}）" if facts else ""))
+            lines.extend(f"    - {issue}" for issue in result.issues)
+        return "\n".join(lines)
+
+
+def lookup(output: Any, path: str) -> Any:
+    """"." 区切りのpathで値を取り出す（リストは数値インデックス、見つからなければNone）"""
+    value = output
+    for key in filter(None, path.split(".")):
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, list) and key.lstrip("-").isdigit() and -len(value) <= int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return None
+    return value
+
+
+def default_checks() -> List[HealthCheck]:
+    """環境変数のリソースIDから既定のチェック一覧を作成（出力は --query で必要な項目だけにする）"""
+    minutes = int(os.environ.get("HEALTH_CHECK_METRIC_MINUTES", 60))
+    checks = []
+
+    distribution_id = os.environ.get("HEALTH_CHECK_CLOUDFRONT_ID")
+    if distribution_id:
+        checks.append(HealthCheck(
+            name="cloudfront", resource=f"CloudFront {distribution_id}",
+            command=f"aws cloudfront get-distribution --id {distribution_id} "
+                    f"--query \"Distribution.{{Status:Status,Enabled:DistributionConfig.Enabled,"
+                    f"DomainName:DomainName}}\"",
+            rules=[Rule("Status", "eq", "Deployed"), Rule("Enabled", "eq", True)],
+            facts={"status": "Status"},
+        ))
+
+    bucket = os.environ.get("HEALTH_CHECK_S3_BUCKET")
+    if bucket:
+        # head-bucketは成功時に出力がないため、コマンドの成否で判定する
+        checks.append(HealthCheck(name="s3", resource=f"S3 {bucket}", command=f"aws s3api head-bucket --bucket {bucket}"))
+
+    rest_api_id = os.environ.get("HEALTH_CHECK_REST_API_ID")
+    if rest_api_id:
+        checks.append(HealthCheck(
+            name="apigateway", resource=f"API Gateway {rest_api_id}",
+            command=f"aws apigateway get-stages --rest-api-id {rest_api_id} --query \"item[].stageName\"",
+            rules=[Rule("", "nonempty")],
+            facts={"stages": ""},
+        ))
+    else:
+        name = os.environ.get("HEALTH_CHECK_REST_API_NAME", "task")
+        checks.append(HealthCheck(
+            name="apigateway", resource=f"API Gateway *{name}*",
+            command=f"aws apigateway get-rest-apis --query \"items[?contains(name, '{name}')].name\"",
+            rules=[Rule("", "nonempty")],
+            facts={"apis": ""},
+        ))
+
+    for function in filter(None, (f.strip() for f in os.environ.get(
+            "HEALTH_CHECK_LAMBDA_FUNCTIONS", "task-api-simple,task-api-delete").split(","))):
+        checks.append(HealthCheck(
+            name=f"lambda:{function}", resource=f"Lambda {function}",
+            command=f"aws lambda get-function-configuration --function-name {function} "
+                    f"--query \"{{State:State,LastUpdateStatus:LastUpdateStatus}}\"",
+            rules=[Rule("State", "eq", "Active"), Rule("LastUpdateStatus", "eq", "Successful")],
+        ))
+        checks.append(HealthCheck(
+            name=f"lambda-errors:{function}", resource=f"Lambda {function} エラー数（直近{minutes}分）",
+            command=f"aws cloudwatch get-metric-statistics --namespace AWS/Lambda --metric-name Errors "
+                    f"--dimensions Name=FunctionName,Value={function} "
+                    f"--start-time ${{start_time}} --end-time ${{end_time}} --period {minutes * 60} "
+                    f"--statistics Sum --query \"sum(Datapoints[].Sum)\"",
+            rules=[Rule("", "lte", 0, severity=WARN)],
+            facts={"errors": ""},
+        ))
+
+    table = os.environ.get("HEALTH_CHECK_DYNAMODB_TABLE", "agentcore-tasks")
+    checks.append(HealthCheck(
+        name="dynamodb", resource=f"DynamoDB {table}",
+        command=f"aws dynamodb describe-table --table-name {table} "
+                f"--query \"Table.{{TableStatus:TableStatus,ItemCount:ItemCount,"
+                f"IndexStatus:GlobalSecondaryIndexes[].IndexStatus}}\"",
+        rules=[Rule("TableStatus", "eq", "ACTIVE"), Rule("IndexStatus", "all_eq", "ACTIVE")],
+        facts={"items": "ItemCount"},
+    ))
+    return checks
+
+
+def load_checks() -> List[HealthCheck]:
+    """HEALTH_CHECK_SPEC_FILE があればそのチェック一覧、なければ既定のチェック一覧"""
+    path = os.environ.get("HEALTH_CHECK_SPEC_FILE")
+    if not path:
+        return default_checks()
+    with open(path, encoding="utf-8") as f:
+        return [HealthCheck.from_dict(check) for check in json.load(f)]
+
+
+def parse_call_aws(response: Dict[str, Any]) -> Tuple[bool, Any, Optional[str]]:
+    """call_awsのJSON-RPCレスポンスを (成功, コマンド出力, エラー) に変換"""
+    if "error" in response:
+        return False, None, str(response["error"].get("message", response["error"]))
+    content = response.get("result", {}).get("content", [{}])
+    text = content[0].get("text", "") if content else ""
+    if is_error_response(response):
+        return False, None, text or "tool error"
+    try:
+        output = json.loads(text) if text else None
+    except ValueError:
+        return True, text, None
+    # AWS API MCPサーバーはCLIの出力を {"response": {"json": "...", "error": ...}} で包んで返す
+    if isinstance(output, dict) and isinstance(output.get("response"), dict):
+        inner = output["response"]
+        if inner.get("error"):
+            return False, None, str(inner["error"])
+        output = inner.get("json")
+        if isinstance(output, str):
+            try:
+                output = json.loads(output) if output else None
+            except ValueError:
+                pass
+    return True, output, None
+
+
+def evaluate(check: HealthCheck, response: Dict[str, Any]) -> CheckResult:
+    """レスポンスにルールを適用して判定"""
+    ok, output, error = parse_call_aws(response)
+    if not ok:
+        return CheckResult(check.name, check.resource, ERROR, [error[:300]])
+    issues = []
+    status = OK
+    for rule in check.rules:
+        issue = rule.evaluate(output)
+        if issue:
+            issues.append(issue)
+            status = max(status, rule.severity, key=_SEVERITY.get)
+    facts = {label: lookup(output, path) for label, path in check.facts.items()}
+    return CheckResult(check.name, check.resource, status, issues,
+                       {label: value for label, value in facts.items() if value is not None})
+
+
+class HealthCheckRunner:
+    """チェック一覧をcall_awsで並列実行してローカルで判定する（Gateway URL単位で共有）"""
+
+    def __init__(self, provider: GatewayToolProvider, catalog: Optional[GatewayToolCatalog] = None,
+                 batch: Optional[bool] = None):
+        self.provider = provider
+        self.catalog = catalog or get_tool_catalog(provider)
+        self.batch = batch if batch is not None else (
+            os.environ.get("HEALTH_CHECK_BATCH", "false").lower() == "true")
+        self._base_tools: Optional[list] = None
+        self._tools: Optional[list] = None
+        self._checks: Optional[List[HealthCheck]] = None
+        self._tool = self._build_tool()
+
+    @staticmethod
+    def call_aws_name(tools: list) -> Optional[str]:
+        """ターゲット接頭辞付きのcall_awsのツール名"""
+        return next((t.tool_name for t in tools if base_tool_name(t.tool_name) == CALL_AWS), None)
+
+    def extend_tools(self, tools: list) -> list:
+        """Gatewayのツール一覧にヘルスチェックツールを追加（同じ一覧なら同じオブジェクトを返す）"""
+        if tools is not self._base_tools:
+            self._tools = tools + [self._tool] if self.call_aws_name(tools) else tools
+            self._base_tools = tools
+        return self._tools
+
+    async def run(self, checks: Optional[List[HealthCheck]] = None) -> HealthReport:
+        """全チェックを1回の並列呼び出しで実行"""
+        if checks is None:
+            if self._checks is None:
+                # チェック一覧のファイル読み込みはイベントループを止めないよう別スレッドで1度だけ行う
+                self._checks = await asyncio.to_thread(load_checks)
+            checks = self._checks
+        with tracer.start_as_current_span("health_check.run", attributes={"health.checks": len(checks)}) as span:
+            started = time.perf_counter()
+            name = self.call_aws_name(await self.catalog.get_tools())
+            if name is None:
+                raise RuntimeError(f"{CALL_AWS} is not available on the Gateway")
+
+            end = datetime.now(timezone.utc).replace(microsecond=0)
+            minutes = int(os.environ.get("HEALTH_CHECK_METRIC_MINUTES", 60))
+            times = {"start_time": (end - timedelta(minutes=minutes)).isoformat(), "end_time": end.isoformat()}
+            calls = [(name, {"cli_command": Template(check.command).safe_substitute(times)}) for check in checks]
+            try:
+                responses = await self.provider.call_tools(calls, batch=self.batch)
+            except Exception as e:
+                # バッチ送信の失敗は全チェックのエラーとして返す
+                logger.error(f"Health check request failed: {e}")
+                responses = [{"error": {"message": str(e)}}] * len(checks)
+
+            report = HealthReport([evaluate(check, response) for check, response in zip(checks, responses)],
+                                  (time.perf_counter() - started) * 1000)
+            span.set_attribute("health.status", report.status)
+            logger.info(f"Health check finished: {report.status} ({len(checks)} checks, {report.elapsed_ms:.0f}ms)")
+            return report
+
+    def _build_tool(self):
+        runner = self
+
+        @tool(name=HEALTH_CHECK_TOOL)
+        async def run_health_check() -> str:
+            """タスクアプリのインフラ（CloudFront, S3, API Gateway, Lambda, DynamoDB）をまとめて並列に確認し、
+            判定済みの結果をJSONで返す。statusは ok / warn / fail / error。
+            全体の状態確認にはcall_awsを個別に呼ばず、このツールを1回だけ呼ぶこと。
+            """
+            report = await runner.run()
+            return json.dumps(report.to_summary(), ensure_ascii=False, separators=(",", ":"), default=str)
+
+        return run_health_check
+
+
+_runners: Dict[str, HealthCheckRunner] = {}
+
+
+def get_health_check_runner(provider: GatewayToolProvider) -> HealthCheckRunner:
+    """Gateway URLごとの共有ランナーを取得"""
+    runner = _runners.get(provider.gateway_url)
+    if runner is None:
+        runner = HealthCheckRunner(provider)
+        _runners[provider.gateway_url] = runner
+    return runner
+
+
+def is_shortcut(message: str) -> bool:
+    """Slackでモデルを介さず実行するメッセージか"""
+    shortcuts = {
+        word.strip().lower()
+        for word in os.environ.get("HEALTH_CHECK_SHORTCUTS", "ヘルスチェック,healthcheck").split(",") if word.strip()
+    }
+    return (message or "").strip().lower() in shortcuts
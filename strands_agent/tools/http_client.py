@@ -0,0 +1,97 @@
+"""プロセス共有HTTPクライアント（コネクションプール + HTTP/2）"""
+import os
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+class SharedHttpClient:
+    """プロセス全体で共有する httpx.AsyncClient
+
+    Gateway と Cognito への接続をキープアライブで再利用し、
+    ツール呼び出しごとの TCP+TLS ハンドシェイクをなくす。
+    プール上限などは環境変数で調整できる:
+
+    - GATEWAY_HTTP_MAX_CONNECTIONS (既定: 100)
+    - GATEWAY_HTTP_MAX_KEEPALIVE (既定: 20)
+    - GATEWAY_HTTP_KEEPALIVE_EXPIRY (秒, 既定: 60)
+    - GATEWAY_HTTP_TIMEOUT (秒, 既定: 60)
+    - GATEWAY_HTTP2 (既定: true)
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _build(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=_env_int("GATEWAY_HTTP_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=_env_int("GATEWAY_HTTP_MAX_KEEPALIVE", 20),
+            keepalive_expiry=_env_float("GATEWAY_HTTP_KEEPALIVE_EXPIRY", 60.0),
+        )
+        http2 = os.environ.get("GATEWAY_HTTP2", "true").lower() == "true"
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 is not installed, falling back to HTTP/1.1")
+                http2 = False
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=limits,
+            timeout=httpx.Timeout(_env_float("GATEWAY_HTTP_TIMEOUT", 60.0), connect=10.0),
+        )
+
+    def get(self) -> httpx.AsyncClient:
+        """現在のイベントループに紐づくクライアントを取得"""
+        loop = asyncio.get_running_loop()
+        # httpxのコネクションはイベントループに紐づくため、
+        # ループが変わった場合（asyncio.run毎回呼び出し等）は作り直す
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            if self._client is not None and not self._client.is_closed:
+                self._discard(self._client, self._loop)
+            self._client = self._build()
+            self._loop = loop
+        return self._client
+
+    @staticmethod
+    def _discard(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]):
+        """以前のループのクライアントを、そのループ上でクローズする（ループが終了済みならクローズできない）"""
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            logger.info("Event loop changed, closing the previous HTTP client on its loop")
+        else:
+            # コネクションは元のループに紐づくため、ここではクローズせずGCに任せる
+            logger.warning("Event loop changed, dropping the previous HTTP client without closing it "
+                           "(call close_http_client() before the loop ends)")
+
+    async def aclose(self):
+        """クライアントをクローズ（シャットダウン時）"""
+        client, self._client, self._loop = self._client, None, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+
+_shared_client = SharedHttpClient()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """共有HTTPクライアントを取得"""
+    return _shared_client.get()
+
+
+async def close_http_client():
+    """共有HTTPクライアントをクローズ"""
+    await _shared_client.aclose()
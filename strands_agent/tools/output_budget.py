@@ -0,0 +1,224 @@
+"""Gatewayツール出力の縮約（ツールごとのトークン予算）"""
+import os
+import re
+import json
+import threading
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from strands_agent.tools.result_cache import base_tool_name
+
+logger = logging.getLogger(__name__)
+
+# トークン数の概算に使う1トークンあたりの文字数
+CHARS_PER_TOKEN = 4
+
+# 常に削除するフィールド（AWS CLI出力のメタデータなど）
+DEFAULT_PRUNE_KEYS = {"ResponseMetadata"}
+
+# JSON縮約の段階（配列の最大要素数, 文字列の最大長）: 予算に収まるまで順に強める
+JSON_LEVELS = [(50, 2000), (20, 1000), (10, 400), (5, 200), (3, 100)]
+
+# 縮約処理: (テキスト, 予算文字数) -> テキスト
+Reducer = Callable[[str, int], str]
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _prune(value: Any, prune_keys: Iterable[str]) -> Any:
+    """null・空の値と不要なフィールドを削除
+
+    文字列に埋め込まれたJSON（AWS API MCPのresponseなど）は展開してから処理する
+    """
+    if isinstance(value, str):
+        nested = _parse_json(value)
+        return value if nested is None else _prune(nested, prune_keys)
+    if isinstance(value, dict):
+        pruned = {k: _prune(v, prune_keys) for k, v in value.items() if k not in prune_keys}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_prune(v, prune_keys) for v in value]
+    return value
+
+
+def _shrink(value: Any, max_items: int, max_chars: int) -> Any:
+    """配列を先頭max_items件に切り詰め（件数を残す）、長い文字列を短縮"""
+    if isinstance(value, dict):
+        return {k: _shrink(v, max_items, max_chars) for k, v in value.items()}
+    if isinstance(value, list):
+        items = [_shrink(v, max_items, max_chars) for v in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"... {len(value) - max_items} more items (total {len(value)})")
+        return items
+    if isinstance(value, str) and len(value) > max_chars:
+        return f"{value[:max_chars]}... ({len(value)} chars)"
+    return value
+
+
+def _parse_json(text: str) -> Any:
+    stripped = text.strip()
+    if not stripped or stripped[0] not in "{[":
+        return None
+    try:
+        return json.loads(stripped)
+    except ValueError:
+        return None
+
+
+class JsonReducer:
+    """JSON出力をフィールド削除・配列切り詰め・コンパクト化で縮約"""
+
+    def __init__(self, prune_keys: Optional[Iterable[str]] = None):
+        self.prune_keys = set(prune_keys) if prune_keys is not None else set(DEFAULT_PRUNE_KEYS)
+
+    def __call__(self, text: str, budget: int) -> str:
+        value = _parse_json(text)
+        if value is None:
+            return text
+        value = _prune(value, self.prune_keys)
+        reduced = _dumps(value)
+        for max_items, max_chars in JSON_LEVELS:
+            if len(reduced) <= budget:
+                break
+            reduced = _dumps(_shrink(value, max_items, max_chars))
+        return reduced
+
+
+class LogDedupReducer:
+    """ログ形式の出力で、数値やIDだけが異なる連続行をまとめる"""
+
+    _variable = re.compile(r"[0-9a-fA-F]{8,}|\d+")
+
+    def __init__(self, min_lines: int = 20):
+        self.min_lines = min_lines
+
+    def __call__(self, text: str, budget: int) -> str:
+        lines = text.splitlines()
+        if len(lines) < self.min_lines:
+            return text
+        output: List[str] = []
+        previous_key = None
+        repeats = 0
+        for line in lines:
+            key = self._variable.sub("#", line.strip())
+            if key == previous_key:
+                repeats += 1
+                continue
+            if repeats:
+                output.append(f"    [... {repeats} similar lines]")
+            output.append(line)
+            previous_key = key
+            repeats = 0
+        if repeats:
+            output.append(f"    [... {repeats} similar lines]")
+        return "\n".join(output)
+
+
+class HeadTailReducer:
+    """先頭と末尾を残して中間を省略（最後の手段）"""
+
+    def __init__(self, head_ratio: float = 0.7):
+        self.head_ratio = head_ratio
+
+    def __call__(self, text: str, budget: int) -> str:
+        if len(text) <= budget:
+            return text
+        head = int(budget * self.head_ratio)
+        tail = max(budget - head, 0)
+        omitted = len(text) - head - tail
+        return f"{text[:head]}\n... [{omitted} chars omitted] ...\n{text[len(text) - tail:] if tail else ''}"
+
+
+class OutputBudgetManager:
+    """ツール出力を予算内に縮約し、削減量を記録する
+
+    予算を超えた出力だけを対象に、reducers を順に適用して収まった時点で止める。
+    環境変数で調整できる:
+
+    - TOOL_OUTPUT_BUDGET_ENABLED (既定: true)
+    - TOOL_OUTPUT_BUDGET_TOKENS (既定: 4000)
+    - TOOL_OUTPUT_BUDGETS (JSON, 例: {"call_aws": 6000, "search": 1500})
+    - TOOL_OUTPUT_PRUNE_KEYS (カンマ区切り、既定のResponseMetadataに追加)
+    """
+
+    def __init__(self, default_budget: Optional[int] = None,
+                 budgets: Optional[Dict[str, int]] = None,
+                 reducers: Optional[List[Reducer]] = None,
+                 enabled: Optional[bool] = None):
+        self.default_budget = default_budget or int(os.environ.get("TOOL_OUTPUT_BUDGET_TOKENS", 4000))
+        self.budgets = json.loads(os.environ.get("TOOL_OUTPUT_BUDGETS", "{}"))
+        if budgets:
+            self.budgets.update(budgets)
+        if reducers is None:
+            prune_keys = DEFAULT_PRUNE_KEYS | {
+                key.strip() for key in os.environ.get("TOOL_OUTPUT_PRUNE_KEYS", "").split(",") if key.strip()
+            }
+            reducers = [JsonReducer(prune_keys), LogDedupReducer(), HeadTailReducer()]
+        self.reducers = reducers
+        self.enabled = enabled if enabled is not None else (
+            os.environ.get("TOOL_OUTPUT_BUDGET_ENABLED", "true").lower() == "true")
+
+        self._lock = threading.Lock()
+        # ツール名 -> {"calls", "reduced", "bytes_in", "bytes_out"}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def budget_for(self, tool_name: str) -> int:
+        """ツールの予算（トークン）"""
+        return int(self.budgets.get(tool_name, self.budgets.get(base_tool_name(tool_name), self.default_budget)))
+
+    def reduce(self, tool_name: str, text: str) -> str:
+        """出力を予算内に縮約"""
+        if not self.enabled or not isinstance(text, str):
+            return text
+        budget = self.budget_for(tool_name) * CHARS_PER_TOKEN
+        reduced = text
+        for reducer in self.reducers:
+            if len(reduced) <= budget:
+                break
+            try:
+                reduced = reducer(reduced, budget)
+            except Exception as e:
+                logger.warning(f"Output reducer {type(reducer).__name__} failed for {tool_name}: {e}")
+
+        bytes_in = len(text.encode("utf-8"))
+        bytes_out = len(reduced.encode("utf-8")) if reduced is not text else bytes_in
+        self._record(base_tool_name(tool_name), bytes_in, bytes_out)
+        if bytes_out < bytes_in:
+            logger.info(f"Reduced {tool_name} output: {bytes_in} -> {bytes_out} bytes "
+                        f"(~{estimate_tokens(reduced)} tokens)")
+        return reduced
+
+    def _record(self, tool_name: str, bytes_in: int, bytes_out: int):
+        with self._lock:
+            stats = self._stats.setdefault(tool_name, {"calls": 0, "reduced": 0, "bytes_in": 0, "bytes_out": 0})
+            stats["calls"] += 1
+            stats["reduced"] += int(bytes_out < bytes_in)
+            stats["bytes_in"] += bytes_in
+            stats["bytes_out"] += bytes_out
+
+    def stats(self) -> Dict[str, Any]:
+        """ツールごとの呼び出し数・縮約数・削減バイト数"""
+        with self._lock:
+            per_tool = {name: {**s, "bytes_saved": s["bytes_in"] - s["bytes_out"]} for name, s in self._stats.items()}
+        return {
+            "bytes_saved": sum(s["bytes_saved"] for s in per_tool.values()),
+            "tools": per_tool,
+        }
+
+
+_output_budget: Optional[OutputBudgetManager] = None
+
+
+def get_output_budget() -> OutputBudgetManager:
+    """プロセス共有の出力予算マネージャーを取得"""
+    global _output_budget
+    if _output_budget is None:
+        _output_budget = OutputBudgetManager()
+    return _output_budget
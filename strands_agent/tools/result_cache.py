@@ -0,0 +1,184 @@
+"""冪等なGatewayツールの結果キャッシュ"""
+import os
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# キャッシュ対象ツールとTTL（秒）
+DEFAULT_TTLS: Dict[str, float] = {
+    "search": 600,
+    "listTasks": 30,
+    "list_clusters": 300,
+    "describe_cluster": 120,
+    "list_nodegroups": 120,
+    "read_wiki_structure": 1800,
+    "read_wiki_contents": 1800,
+}
+
+# 書き込み系ツール → 無効化するツール
+DEFAULT_INVALIDATIONS: Dict[str, List[str]] = {
+    "createTask": ["listTasks"],
+    "createTasks": ["listTasks"],
+    "deleteTask": ["listTasks"],
+    "deleteTasks": ["listTasks"],
+}
+
+
+def base_tool_name(name: str) -> str:
+    """Gatewayのターゲット接頭辞（target___tool）を除いたツール名"""
+    return name.split("___")[-1]
+
+
+def canonical_key(tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    """(ツール名, 正規化した引数) のキャッシュキー"""
+    return (tool_name, json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False))
+
+
+def is_error_response(response: Dict[str, Any]) -> bool:
+    """JSON-RPCエラーまたはツールエラーのレスポンスか"""
+    return "error" in response or bool(response.get("result", {}).get("isError"))
+
+
+class ToolResultCache:
+    """ツール結果のLRUキャッシュ（件数とバイト数で上限）
+
+    環境変数で調整できる:
+
+    - GATEWAY_RESULT_CACHE_ENABLED (既定: true)
+    - GATEWAY_RESULT_CACHE_MAX_ENTRIES (既定: 1000)
+    - GATEWAY_RESULT_CACHE_MAX_BYTES (既定: 16MB)
+    - GATEWAY_RESULT_CACHE_TTLS (JSON, 例: {"search": 300})
+    - GATEWAY_RESULT_CACHE_DENY (カンマ区切りのツール名)
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None,
+                 invalidations: Optional[Dict[str, List[str]]] = None,
+                 deny: Optional[Iterable[str]] = None,
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(json.loads(os.environ.get("GATEWAY_RESULT_CACHE_TTLS", "{}")))
+        if ttls:
+            self.ttls.update(ttls)
+        self.invalidations = invalidations if invalidations is not None else dict(DEFAULT_INVALIDATIONS)
+        self.deny = set(deny) if deny is not None else {
+            name.strip() for name in os.environ.get("GATEWAY_RESULT_CACHE_DENY", "").split(",") if name.strip()
+        }
+        self.max_entries = max_entries or int(os.environ.get("GATEWAY_RESULT_CACHE_MAX_ENTRIES", 1000))
+        self.max_bytes = max_bytes or int(os.environ.get("GATEWAY_RESULT_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+        self.enabled = enabled if enabled is not None else (
+            os.environ.get("GATEWAY_RESULT_CACHE_ENABLED", "true").lower() == "true")
+
+        # key -> (expires_at, size, response)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        # 無効化のたびに加算する世代（ツール名ごと + 全件無効化）。実行中に無効化された結果は保存しない
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, tool_name: str) -> Optional[float]:
+        """キャッシュ可能ならTTLを返す（対象外はNone）"""
+        name = base_tool_name(tool_name)
+        if not self.enabled or name in self.deny or tool_name in self.deny:
+            return None
+        return self.ttls.get(tool_name, self.ttls.get(name))
+
+    def get(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みレスポンスを取得"""
+        if self.ttl_for(tool_name) is None:
+            return None
+        key = canonical_key(tool_name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def generation(self, tool_name: str) -> int:
+        """ツールの現在の世代（呼び出し前に取得してputに渡す）"""
+        with self._lock:
+            return self._epoch + self._generations.get(base_tool_name(tool_name), 0)
+
+    def put(self, tool_name: str, arguments: Dict[str, Any], response: Dict[str, Any],
+            generation: Optional[int] = None):
+        """レスポンスを保存（エラーは保存しない）
+
+        generation を渡した場合、呼び出し中に書き込み系ツールで無効化されていれば保存しない
+        （無効化前の古い一覧を無効化後に保存しないため）。
+        """
+        ttl = self.ttl_for(tool_name)
+        if ttl is None or is_error_response(response):
+            return
+        size = len(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        key = canonical_key(tool_name, arguments)
+        with self._lock:
+            if generation is not None and generation != self._epoch + self._generations.get(
+                    base_tool_name(tool_name), 0):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, response)
+            self._bytes += size
+            # LRU退避
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def on_write(self, tool_name: str):
+        """書き込み系ツール実行後に関連エントリを無効化"""
+        targets = self.invalidations.get(base_tool_name(tool_name))
+        if targets:
+            self.invalidate(targets)
+
+    def invalidate(self, tool_names: Optional[Iterable[str]] = None):
+        """指定ツール（省略時は全件）のエントリを削除"""
+        with self._lock:
+            if tool_names is None:
+                self._entries.clear()
+                self._bytes = 0
+                self._epoch += 1
+                return
+            names = set(tool_names)
+            for name in {base_tool_name(name) for name in names}:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            for key in [k for k in self._entries if base_tool_name(k[0]) in names or k[0] in names]:
+                self._remove(key)
+
+    def _remove(self, key: Tuple[str, str]):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット・ミス数などの統計"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+_result_cache: Optional[ToolResultCache] = None
+
+
+def get_result_cache() -> ToolResultCache:
+    """プロセス共有の結果キャッシュを取得"""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ToolResultCache()
+    return _result_cache
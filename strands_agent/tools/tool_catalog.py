@@ -0,0 +1,159 @@
+"""Gateway tools/list カタログキャッシュ"""
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List
+
+from strands import tool
+from strands_agent.tools.gateway_tools import GatewayToolProvider
+from strands_agent.tools.output_budget import OutputBudgetManager, get_output_budget
+
+logger = logging.getLogger(__name__)
+
+
+def build_gateway_tools(provider: GatewayToolProvider, tools_list: List[Dict[str, Any]],
+                        output_budget: Optional[OutputBudgetManager] = None) -> list:
+    """tools/list の結果をStrands Toolに変換（出力は予算内に縮約）"""
+    output_budget = output_budget or get_output_budget()
+    strands_tools = []
+    for tool_def in tools_list:
+        tool_name = tool_def['name']
+        tool_description = tool_def.get('description', '')
+        tool_schema = tool_def.get('inputSchema', {})
+
+        # クロージャで各ツールの関数を作成
+        def make_tool(name: str, description: str, schema: dict):
+            @tool(name=name, description=description)
+            async def gateway_tool(**kwargs):
+                logger.info(f"Calling Gateway tool: {name} with args: {kwargs}")
+                try:
+                    # kwargsキーでラップされている場合は展開
+                    if 'kwargs' in kwargs and len(kwargs) == 1:
+                        kwargs_value = kwargs['kwargs']
+                        # 空文字列または空の場合は空のdictとして扱う
+                        if not kwargs_value or kwargs_value == '':
+                            actual_args = {}
+                        elif isinstance(kwargs_value, str):
+                            actual_args = json.loads(kwargs_value)
+                        else:
+                            actual_args = kwargs_value
+                    else:
+                        actual_args = kwargs
+
+                    result = await provider.call_tool(name, actual_args)
+                    logger.info(f"Gateway tool {name} result: {result}")
+                    text = result.get('result', {}).get('content', [{}])[0].get('text', str(result))
+                    return output_budget.reduce(name, text)
+                except Exception as e:
+                    logger.error(f"Gateway tool {name} error: {e}", exc_info=True)
+                    raise
+            return gateway_tool
+
+        strands_tools.append(make_tool(tool_name, tool_description, tool_schema))
+
+    return strands_tools
+
+
+class GatewayToolCatalog:
+    """Gateway URL単位のツールカタログ（stale-while-revalidate）
+
+    TTL内はキャッシュをそのまま返し、TTL切れ後は古いカタログを返しつつ
+    バックグラウンドで再取得する。max_stale を超えた場合のみ同期的に再取得する。
+
+    - GATEWAY_TOOLS_CACHE_TTL (秒, 既定: 300)
+    - GATEWAY_TOOLS_CACHE_MAX_STALE (秒, 既定: 3600)
+    """
+
+    def __init__(self, provider: GatewayToolProvider,
+                 ttl: Optional[float] = None, max_stale: Optional[float] = None):
+        self.provider = provider
+        self.ttl = ttl if ttl is not None else float(os.environ.get("GATEWAY_TOOLS_CACHE_TTL", 300))
+        self.max_stale = max_stale if max_stale is not None else float(
+            os.environ.get("GATEWAY_TOOLS_CACHE_MAX_STALE", 3600))
+        self._tools_list: Optional[List[Dict[str, Any]]] = None
+        self._strands_tools: Optional[list] = None
+        self._fetched_at: float = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def _refresh(self):
+        """tools/list を取得してラッパーを再構築"""
+        logger.info("Fetching tools from Gateway...")
+        tools_response = await self.provider.list_tools()
+        # プロンプトキャッシュが効くよう、ツール定義の順序をターン間で固定する
+        tools_list = sorted(tools_response.get('result', {}).get('tools', []), key=lambda t: t['name'])
+        logger.info(f"Found {len(tools_list)} tools: {[t['name'] for t in tools_list]}")
+
+        # カタログが変わっていなければクロージャを再構築しない
+        if tools_list != self._tools_list or self._strands_tools is None:
+            self._strands_tools = build_gateway_tools(self.provider, tools_list)
+            self._tools_list = tools_list
+        self._fetched_at = time.monotonic()
+
+    async def _refresh_locked(self, force: bool = False):
+        async with self._get_lock():
+            # 待機中に他のコルーチンが更新済みなら何もしない
+            if not force and self._strands_tools is not None and self.age() <= self.ttl:
+                return
+            await self._refresh()
+
+    async def _background_refresh(self):
+        try:
+            await self._refresh_locked()
+        except Exception as e:
+            logger.warning(f"Background tools/list refresh failed: {e}")
+
+    def age(self) -> float:
+        """キャッシュの経過秒数"""
+        return time.monotonic() - self._fetched_at
+
+    async def get_tools(self) -> list:
+        """Strands Tool一覧を取得"""
+        if self._strands_tools is None or self.age() > self.ttl + self.max_stale:
+            await self._refresh_locked(force=self._strands_tools is not None)
+            return self._strands_tools
+
+        if self.age() > self.ttl and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+        return self._strands_tools
+
+    async def get_tool_definitions(self) -> List[Dict[str, Any]]:
+        """tools/list の生データを取得"""
+        await self.get_tools()
+        return self._tools_list
+
+    def invalidate(self):
+        """キャッシュを破棄（synchronize_gateway_targets実行後など）"""
+        self._tools_list = None
+        self._strands_tools = None
+        self._fetched_at = 0.0
+
+
+_catalogs: Dict[str, GatewayToolCatalog] = {}
+
+
+def get_tool_catalog(provider: GatewayToolProvider) -> GatewayToolCatalog:
+    """Gateway URLごとの共有カタログを取得"""
+    catalog = _catalogs.get(provider.gateway_url)
+    if catalog is None:
+        catalog = GatewayToolCatalog(provider)
+        _catalogs[provider.gateway_url] = catalog
+    return catalog
+
+
+def invalidate_tool_catalog(gateway_url: Optional[str] = None):
+    """カタログキャッシュを破棄（gateway_url省略時は全件）"""
+    targets = [_catalogs[gateway_url]] if gateway_url in _catalogs else (
+        list(_catalogs.values()) if gateway_url is None else [])
+    for catalog in targets:
+        catalog.invalidate()
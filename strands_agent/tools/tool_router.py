@@ -0,0 +1,202 @@
+"""メッセージの意図に応じてAgentに渡すツールを絞り込むローカルルーター"""
+import os
+import re
+import json
+import math
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from strands.hooks import BeforeToolCallEvent, HookProvider, HookRegistry
+
+from strands_agent.tools.result_cache import base_tool_name
+
+logger = logging.getLogger(__name__)
+
+# ツール名 → 追加キーワード（英語のツール説明に日本語の依頼をマッチさせる）
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    "list_clusters": ["eks", "kubernetes", "k8s", "クラスタ", "クラスター", "ノード", "pod"],
+    "describe_cluster": ["eks", "kubernetes", "k8s", "クラスタ", "クラスター", "バージョン"],
+    "list_nodegroups": ["eks", "ノードグループ", "ノード", "スケール"],
+    "search": ["検索", "調べて", "ググって", "ニュース", "最新", "新機能", "web"],
+    "notifySlack": ["slack", "通知", "チャネル", "チャンネル", "知らせて", "共有"],
+    "createTask": ["タスク", "作成", "追加", "todo", "期限", "担当"],
+    "createTasks": ["タスク", "一括", "まとめて", "複数"],
+    "listTasks": ["タスク", "一覧", "残タスク", "todo", "担当", "期限"],
+    "deleteTask": ["タスク", "削除", "消して"],
+    "deleteTasks": ["タスク", "削除", "一括", "消して"],
+    "read_wiki_structure": ["レビュー", "コード", "リポジトリ", "github", "構造", "ドキュメント"],
+    "read_wiki_contents": ["レビュー", "コード", "ファイル", "readme", "ドキュメント", "セキュリティ"],
+    "ask_question": ["レビュー", "コード", "質問", "セキュリティ", "品質", "ベストプラクティス"],
+    "call_aws": ["aws", "cli", "cloudfront", "s3", "lambda", "dynamodb", "apigateway", "api gateway",
+                 "cloudwatch", "ログ", "メトリクス", "ヘルスチェック", "状態", "インフラ", "エラー", "アプリ"],
+    "suggest_aws_commands": ["aws", "cli", "コマンド", "インフラ"],
+    "run_health_check": ["ヘルスチェック", "状態", "タスクアプリ", "インフラ", "正常", "稼働", "health"],
+}
+
+# 最高スコアに対してこの比率未満のグループは選ばない（偶然の部分一致を除外）
+MIN_RELATIVE_SCORE = 0.3
+
+_camel = re.compile(r"([a-z0-9])([A-Z])")
+_ascii_word = re.compile(r"[a-z0-9]+")
+_cjk_run = re.compile(r"[぀-ヿ㐀-鿿ｦ-ﾟ]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """英数字は単語単位、日本語は文字bigram（形態素解析なしで部分一致させる）"""
+    text = _camel.sub(r"\1 \2", text or "").lower()
+    tokens = _ascii_word.findall(text)
+    for run in _cjk_run.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def tool_group(tool_name: str) -> str:
+    """Gatewayターゲット名（target___tool の target）をグループとする"""
+    return tool_name.split("___")[0] if "___" in tool_name else tool_name
+
+
+class ToolRouter:
+    """ツール名・説明・キーワードの転置インデックスでツールグループをスコアリング
+
+    上位 top_k グループと常時有効なツールだけをAgentに渡す。どのグループにも
+    マッチしない場合は前ターンのグループ、それもなければ全ツールを渡す。
+
+    - TOOL_ROUTER_ENABLED (既定: true)
+    - TOOL_ROUTER_TOP_K (既定: 2)
+    - TOOL_ROUTER_ALWAYS (カンマ区切りのツール名, 既定: notifySlack)
+    - TOOL_ROUTER_KEYWORDS (JSON, 例: {"call_aws": ["請求"]})
+    """
+
+    def __init__(self, top_k: Optional[int] = None, always: Optional[Iterable[str]] = None,
+                 keywords: Optional[Dict[str, List[str]]] = None, enabled: Optional[bool] = None):
+        self.top_k = top_k or int(os.environ.get("TOOL_ROUTER_TOP_K", 2))
+        self.always = set(always) if always is not None else {
+            name.strip() for name in os.environ.get("TOOL_ROUTER_ALWAYS", "notifySlack").split(",") if name.strip()
+        }
+        self.keywords = {k: list(v) for k, v in DEFAULT_KEYWORDS.items()}
+        for name, words in json.loads(os.environ.get("TOOL_ROUTER_KEYWORDS", "{}")).items():
+            self.keywords.setdefault(name, []).extend(words)
+        for name, words in (keywords or {}).items():
+            self.keywords.setdefault(name, []).extend(words)
+        self.enabled = enabled if enabled is not None else (
+            os.environ.get("TOOL_ROUTER_ENABLED", "true").lower() == "true")
+
+        self._tools: Optional[list] = None
+        self._groups: Dict[str, list] = {}
+        # token -> そのトークンを含むグループ
+        self._index: Dict[str, Set[str]] = {}
+        # 選択したグループの組み合わせ → ツールリスト（同じ選択なら同じオブジェクトを返す）
+        self._subsets: Dict[FrozenSet[str], list] = {}
+
+    def _build(self, tools: list):
+        """ツール一覧から転置インデックスを作成"""
+        groups: Dict[str, list] = defaultdict(list)
+        index: Dict[str, Set[str]] = defaultdict(set)
+        for agent_tool in tools:
+            name = agent_tool.tool_name
+            group = tool_group(name)
+            groups[group].append(agent_tool)
+            text = " ".join([
+                name.replace("___", " ").replace("_", " "),
+                agent_tool.tool_spec.get("description", ""),
+                " ".join(self.keywords.get(base_tool_name(name), [])),
+            ])
+            for token in tokenize(text):
+                index[token].add(group)
+        self._tools = tools
+        self._groups = dict(groups)
+        self._index = dict(index)
+        self._subsets = {}
+
+    def score(self, message: str, tools: list) -> Dict[str, float]:
+        """グループごとのスコア（一致したトークンのIDFの合計、ツール数の多いグループが有利にならないよう出現回数は数えない）"""
+        if tools is not self._tools:
+            self._build(tools)
+        scores: Dict[str, float] = defaultdict(float)
+        group_count = len(self._groups)
+        for token in set(tokenize(message)):
+            postings = self._index.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + group_count / len(postings))
+            for group in postings:
+                scores[group] += idf
+        return dict(scores)
+
+    def select(self, message: str, tools: list, sticky: Iterable[str] = ()) -> Tuple[list, FrozenSet[str]]:
+        """メッセージに関連するツールと選択したグループを返す（ツールの並び順は元の順序を保つ）
+
+        選択なし（全ツール）の場合、グループは空集合
+        """
+        if not self.enabled or not message:
+            return tools, frozenset()
+        scores = self.score(message, tools)
+        top = max(scores.values(), default=0)
+        ranked = sorted(
+            (g for g, s in scores.items() if s > 0 and s >= top * MIN_RELATIVE_SCORE),
+            key=lambda g: (-scores[g], g)
+        )
+        # マッチしなければ前ターンのグループを引き継ぐ（「それも確認して」のような続きの依頼向け）
+        groups = frozenset(ranked[:self.top_k]) or frozenset(g for g in sticky if g in self._groups)
+        if not groups:
+            return tools, frozenset()
+
+        subset = self._subsets.get(groups)
+        if subset is None:
+            subset = [
+                t for t in tools
+                if tool_group(t.tool_name) in groups
+                or t.tool_name in self.always or base_tool_name(t.tool_name) in self.always
+            ]
+            self._subsets[groups] = subset
+        logger.info(f"Tool router selected groups {sorted(groups)} ({len(subset)}/{len(tools)} tools)")
+        return subset, groups
+
+
+class ToolFallbackHook(HookProvider):
+    """絞り込みで外したツールをモデルが呼んだ場合に、全ツールから補って実行する"""
+
+    def __init__(self, get_all_tools: Callable[[], Optional[list]],
+                 on_widen: Optional[Callable[[str], None]] = None):
+        self.get_all_tools = get_all_tools
+        self.on_widen = on_widen
+
+    def register_hooks(self, registry: HookRegistry, **kwargs):
+        registry.add_callback(BeforeToolCallEvent, self.before_tool_call)
+
+    def before_tool_call(self, event: BeforeToolCallEvent):
+        if event.selected_tool is not None:
+            return
+        name = event.tool_use["name"]
+        all_tools = self.get_all_tools() or []
+        # 完全一致がなければ接頭辞なしの名前で探す（一意な場合のみ）
+        found = [t for t in all_tools if t.tool_name == name]
+        if not found:
+            found = [t for t in all_tools if base_tool_name(t.tool_name) == base_tool_name(name)]
+        if len(found) != 1:
+            return
+
+        agent_tool = found[0]
+        logger.info(f"Widening tool set: {name} -> {agent_tool.tool_name}")
+        event.selected_tool = agent_tool
+        # 以降のモデル呼び出しでもツール定義が見えるよう、同じグループをまとめて登録
+        group = tool_group(agent_tool.tool_name)
+        for t in all_tools:
+            if tool_group(t.tool_name) == group and t.tool_name not in event.agent.tool_registry.registry:
+                event.agent.tool_registry.register_tool(t)
+        if self.on_widen:
+            self.on_widen(group)
+
+
+_tool_router: Optional[ToolRouter] = None
+
+
+def get_tool_router() -> ToolRouter:
+    """プロセス共有のツールルーターを取得"""
+    global _tool_router
+    if _tool_router is None:
+        _tool_router = ToolRouter()
+    return _tool_router
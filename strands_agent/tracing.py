@@ -0,0 +1,161 @@
+"""OpenTelemetry互換のトレーシング（Collectorなしのローカル出力 + ターン単位のウォーターフォール）
+
+Strands自体もグローバルのTracerProviderにモデル呼び出し・ツール呼び出しのスパン
+（gen_ai.usage.* のトークン数付き）を出力するため、ここで設定すると同じトレースに入る。
+
+環境変数:
+
+- TRACE_EXPORTER: none（既定）/ console / file（カンマ区切りで複数可）
+- TRACE_FILE: fileエクスポーターの出力先（既定: /tmp/agentcore-traces.jsonl、1行1スパンのJSON）
+- TRACE_WATERFALL: true でルートスパン終了時にレイテンシのウォーターフォールをログ出力
+"""
+import os
+import json
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+)
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "agentcore-task-bot"
+
+# ウォーターフォールに表示する属性の接頭辞
+WATERFALL_ATTRIBUTE_PREFIXES = ("gen_ai.usage.input_tokens", "gen_ai.usage.output_tokens",
+                                "gen_ai.usage.cache_", "gen_ai.tool.name", "tokens.", "payload.",
+                                "cache.", "rpc.", "slack.", "tool.", "memory.", "health.")
+
+tracer = trace.get_tracer("strands_agent")
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """スパンを1行1件のJSONでファイルに追記"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(json.dumps(json.loads(span.to_json()), ensure_ascii=False) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning(f"Failed to write spans to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+class WaterfallSpanProcessor(SpanProcessor):
+    """トレースごとにスパンを集め、ルートスパン終了時にウォーターフォールを出力"""
+
+    def __init__(self, max_traces: int = 200, width: int = 40):
+        self.max_traces = max_traces
+        self.width = width
+        self._lock = threading.Lock()
+        self._traces: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        self.last_waterfall: Optional[str] = None
+
+    def on_end(self, span: ReadableSpan):
+        trace_id = span.context.trace_id
+        with self._lock:
+            spans = self._traces.setdefault(trace_id, [])
+            spans.append(span)
+            if span.parent is not None and not span.parent.is_remote:
+                # 古いトレース（ルートが終わらなかったもの）を破棄
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+                return
+            del self._traces[trace_id]
+        if len(spans) < 2:
+            # 子スパンのないトレース（イベント受信のみなど）は出力しない
+            return
+        self.last_waterfall = self.render(spans)
+        logger.info(self.last_waterfall)
+
+    def render(self, spans: List[ReadableSpan]) -> str:
+        """開始時刻順に、オフセット・所要時間・階層・バーを並べる"""
+        root = next(s for s in reversed(spans) if s.parent is None or s.parent.is_remote)
+        start = min(s.start_time for s in spans)
+        total = max(max(s.end_time for s in spans) - start, 1)
+        parents: Dict[int, Optional[int]] = {
+            s.context.span_id: (s.parent.span_id if s.parent is not None else None) for s in spans
+        }
+
+        def depth(span_id: int) -> int:
+            level = 0
+            while parents.get(span_id) in parents:
+                span_id = parents[span_id]
+                level += 1
+            return level
+
+        lines = [f"Turn waterfall: {root.name} {total / 1e6:.0f}ms (trace={root.context.trace_id:032x})"]
+        for span in sorted(spans, key=lambda s: (s.start_time, s.end_time)):
+            offset = span.start_time - start
+            duration = span.end_time - span.start_time
+            bar_start = int(offset / total * self.width)
+            bar = " " * bar_start + "█" * max(1, int(duration / total * self.width))
+            attributes = " ".join(
+                f"{key}={value}" for key, value in (span.attributes or {}).items()
+                if key.startswith(WATERFALL_ATTRIBUTE_PREFIXES)
+            )
+            lines.append(
+                f"{offset / 1e6:>8.0f}ms {duration / 1e6:>8.0f}ms |{bar:<{self.width}}| "
+                f"{'  ' * depth(span.context.span_id)}{span.name} {attributes}".rstrip()
+            )
+        return "\n".join(lines)
+
+
+_configured = False
+
+
+def setup_tracing() -> bool:
+    """環境変数に従ってTracerProviderを設定（2回目以降は何もしない）
+
+    Returns:
+        トレーシングが有効ならTrue
+    """
+    global _configured
+    if _configured:
+        return True
+
+    exporters = [name.strip() for name in os.environ.get("TRACE_EXPORTER", "none").lower().split(",")]
+    waterfall = os.environ.get("TRACE_WATERFALL", "false").lower() == "true"
+    processors: List[SpanProcessor] = []
+    if "console" in exporters:
+        processors.append(BatchSpanProcessor(ConsoleSpanExporter()))
+    if "file" in exporters:
+        processors.append(BatchSpanProcessor(
+            JsonLinesSpanExporter(os.environ.get("TRACE_FILE", "/tmp/agentcore-traces.jsonl"))))
+    if waterfall:
+        processors.append(WaterfallSpanProcessor())
+    if not processors:
+        return False
+
+    # 既にSDKのTracerProviderが設定されていればそこに追加する
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        trace.set_tracer_provider(provider)
+    for processor in processors:
+        provider.add_span_processor(processor)
+    _configured = True
+    logger.info(f"Tracing enabled (exporters={exporters}, waterfall={waterfall})")
+    return True
+
+
+def shutdown_tracing():
+    """バッファ済みのスパンを出力して終了"""
+    provider = trace.get_tracer_provider()
+    if _configured and isinstance(provider, TracerProvider):
+        provider.shutdown()
@@ -27,13 +27,21 @@ function App() {
 
   const fetchTasks = async () => {
     try {
-      const response = await fetch(API_URL, {
-        headers: {
-          'x-api-key': API_KEY
-        }
-      });
-      const data = await response.json();
-      setTasks(data.tasks || []);
+      // next_tokenをたどって全ページを取得
+      let allTasks = [];
+      let nextToken = null;
+      do {
+        const url = nextToken ? `${API_URL}?next_token=${encodeURIComponent(nextToken)}` : API_URL;
+        const response = await fetch(url, {
+          headers: {
+            'x-api-key': API_KEY
+          }
+        });
+        const data = await response.json();
+        allTasks = allTasks.concat(data.tasks || []);
+        nextToken = data.next_token;
+      } while (nextToken);
+      setTasks(allTasks);
     } catch (error) {
       console.error('Error fetching tasks:', error);
     } finally {
@@ -0,0 +1,135 @@
+"""Agentプール（strands_agent.agent_pool）のテスト"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from strands_agent import agent_pool
+from strands_agent.agent_pool import AgentPool
+
+
+class FakeAgent:
+    """TaskBotAgentの代わり（aclose の呼び出しを記録する）"""
+
+    def __init__(self, actor_id: str, session_id: str):
+        self.actor_id = actor_id
+        self.session_id = session_id
+        self.closed = 0
+        self._agent = SimpleNamespace(messages=[])
+
+    async def aclose(self):
+        self.closed += 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(agent_pool, "TaskBotAgent", FakeAgent)
+    monkeypatch.setattr(agent_pool, "time", clock)
+    return clock
+
+
+async def use(pool, actor_id, thread_ts):
+    async with pool.lease(actor_id, thread_ts) as agent:
+        return agent
+
+
+async def settle(pool):
+    """バックグラウンドのクローズを待つ"""
+    if pool._closing:
+        await asyncio.gather(*pool._closing)
+
+
+def test_warm_agent_is_reused(clock):
+    async def scenario():
+        pool = AgentPool(max_agents=10, idle_ttl=60)
+        first = await use(pool, "u1", "t1")
+        assert await use(pool, "u1", "t1") is first
+        assert first.closed == 0
+
+    asyncio.run(scenario())
+
+
+def test_lru_eviction_closes_agent(clock):
+    async def scenario():
+        pool = AgentPool(max_agents=2, idle_ttl=60)
+        oldest = await use(pool, "u1", "t1")
+        await use(pool, "u1", "t2")
+        await use(pool, "u1", "t3")
+        await settle(pool)
+        assert oldest.closed == 1
+        assert pool.stats()["agents"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_idle_ttl_eviction_closes_agent(clock):
+    async def scenario():
+        pool = AgentPool(max_agents=10, idle_ttl=60)
+        idle = await use(pool, "u1", "t1")
+        clock.now += 61
+        fresh = await use(pool, "u1", "t1")
+        await settle(pool)
+        assert idle.closed == 1
+        assert fresh is not idle and fresh.closed == 0
+
+    asyncio.run(scenario())
+
+
+def test_byte_cap_eviction_closes_agent(clock, monkeypatch):
+    monkeypatch.setattr(agent_pool, "estimate_agent_bytes", lambda agent: 100)
+
+    async def scenario():
+        pool = AgentPool(max_agents=10, idle_ttl=60, max_bytes=150)
+        first = await use(pool, "u1", "t1")
+        await use(pool, "u1", "t2")
+        await settle(pool)
+        assert first.closed == 1
+
+    asyncio.run(scenario())
+
+
+def test_discard_closes_agent(clock):
+    async def scenario():
+        pool = AgentPool(max_agents=10, idle_ttl=60)
+        agent = await use(pool, "u1", "t1")
+        pool.discard("u1", "t1")
+        await settle(pool)
+        assert agent.closed == 1
+        assert pool.stats()["agents"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_agent_in_use_is_closed_on_release(clock):
+    async def scenario():
+        pool = AgentPool(max_agents=10, idle_ttl=60)
+        async with pool.lease("u1", "t1") as agent:
+            await pool.evict_thread("t1")
+            assert agent.closed == 0
+        await settle(pool)
+        assert agent.closed == 1
+
+    asyncio.run(scenario())
+
+
+def test_evict_thread_and_shutdown_close_idle_agents(clock):
+    async def scenario():
+        pool = AgentPool(max_agents=10, idle_ttl=60)
+        a = await use(pool, "u1", "t1")
+        b = await use(pool, "u2", "t1")
+        c = await use(pool, "u1", "t2")
+        await pool.evict_thread("t1")
+        assert (a.closed, b.closed, c.closed) == (1, 1, 0)
+        await pool.shutdown()
+        assert c.closed == 1
+
+    asyncio.run(scenario())
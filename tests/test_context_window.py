@@ -0,0 +1,159 @@
+"""会話コンテキスト管理（strands_agent.context_window）のテスト"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from strands.types.exceptions import ContextWindowOverflowException
+
+from strands_agent.context_window import RollingSummaryConversationManager, render_transcript, turn_starts
+
+
+def user(text):
+    return {"role": "user", "content": [{"text": text}]}
+
+
+def assistant(text):
+    return {"role": "assistant", "content": [{"text": text}]}
+
+
+def tool_use(name):
+    return {"role": "assistant", "content": [{"toolUse": {"toolUseId": name, "name": name, "input": {"q": 1}}}]}
+
+
+def tool_result(text):
+    return {"role": "user", "content": [{"toolResult": {"toolUseId": "t", "status": "success",
+                                                        "content": [{"text": text}]}}]}
+
+
+def turns(count, tool_output="ok"):
+    messages = []
+    for n in range(count):
+        messages += [user(f"依頼{n}"), tool_use(f"tool{n}"), tool_result(tool_output), assistant(f"回答{n}")]
+    return messages
+
+
+class FakeModel:
+    def __init__(self, summary="要約", cache=False):
+        self.summary = summary
+        self.cache = cache
+        self.prompts = []
+        self.on_stream = None
+
+    def get_config(self):
+        return {"cache_config": object()} if self.cache else {}
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None):
+        self.prompts.append(messages[0]["content"][0]["text"])
+        if self.on_stream:
+            self.on_stream()
+        yield {"contentBlockDelta": {"delta": {"text": self.summary}}}
+
+
+def make_agent(messages, model=None):
+    return SimpleNamespace(
+        messages=messages, model=model or FakeModel(), system_prompt=None,
+        tool_registry=SimpleNamespace(get_all_tool_specs=lambda: []),
+    )
+
+
+def manager(**kwargs):
+    kwargs.setdefault("keep_turns", 2)
+    kwargs.setdefault("fold_every", 1)
+    kwargs.setdefault("max_tokens", 100000)
+    kwargs.setdefault("tool_result_chars", 10)
+    kwargs.setdefault("summary_max_chars", 1000)
+    return RollingSummaryConversationManager("SYSTEM", **kwargs)
+
+
+def test_turn_starts_skip_tool_results():
+    assert turn_starts(turns(3)) == [0, 4, 8]
+
+
+def test_render_transcript_clips_tool_output():
+    text = render_transcript([tool_use("search"), tool_result("x" * 50)], tool_chars=5)
+    assert text.splitlines() == ['[ツール呼び出し search {"q":…]', "[ツール結果 success: xxxxx…]"]
+
+
+def test_apply_management_trims_only_earlier_turns():
+    agent = make_agent(turns(2, tool_output="y" * 30))
+    manager().apply_management(agent)
+    earlier, current = agent.messages[2], agent.messages[6]
+    assert "20 chars omitted" in earlier["content"][0]["toolResult"]["content"][0]["text"]
+    assert current["content"][0]["toolResult"]["content"][0]["text"] == "y" * 30
+
+
+def test_reduce_context_folds_oldest_turn():
+    agent = make_agent(turns(3))
+    m = manager()
+    m.reduce_context(agent)
+    assert turn_starts(agent.messages) == [0, 4]
+    assert m.removed_message_count == 4
+    assert "ユーザー: 依頼0" in m.summary
+
+
+def test_reduce_context_raises_when_only_current_turn_remains():
+    with pytest.raises(ContextWindowOverflowException):
+        manager().reduce_context(make_agent(turns(1)))
+
+
+def test_over_budget_model_call_folds_and_sets_summary_prompt():
+    agent = make_agent(turns(4), FakeModel(cache=True))
+    m = manager(max_tokens=60)
+    m._before_model_call(SimpleNamespace(agent=agent))
+
+    assert len(turn_starts(agent.messages)) < 4
+    assert m.removed_message_count > 0
+    text, cache_point, summary = agent.system_prompt
+    assert text == {"text": "SYSTEM"} and "cachePoint" in cache_point
+    assert "依頼0" in summary["text"]
+
+
+def test_under_budget_model_call_keeps_messages():
+    agent = make_agent(turns(2))
+    m = manager()
+    m._before_model_call(SimpleNamespace(agent=agent))
+    assert len(agent.messages) == 8
+    assert agent.system_prompt == [{"text": "SYSTEM"}]
+
+
+def test_compact_summarizes_older_turns():
+    agent = make_agent(turns(4), FakeModel(summary="タスクを4件作成"))
+    m = manager()
+    m.summary = "以前の要約"
+
+    assert asyncio.run(m.compact(agent)) is True
+    assert turn_starts(agent.messages) == [0, 4]
+    assert m.summary == "タスクを4件作成"
+    assert "以前の要約" in agent.model.prompts[0] and "依頼1" in agent.model.prompts[0]
+    # keep_turns + fold_every 以下なら何もしない
+    assert asyncio.run(m.compact(agent)) is False
+
+
+def test_compact_discards_summary_when_conversation_changed():
+    agent = make_agent(turns(4))
+    m = manager()
+    agent.model.on_stream = lambda: agent.messages.pop(0)
+
+    assert asyncio.run(m.compact(agent)) is False
+    assert m.summary == "" and m.removed_message_count == 0
+
+
+def test_summary_is_capped_from_the_oldest_side():
+    agent = make_agent(turns(3))
+    m = manager(summary_max_chars=10)
+    m.summary = "古い要約" * 10
+    m.reduce_context(agent)
+    assert len(m.summary) == 11 and m.summary.startswith("…")
+
+
+def test_state_round_trip_and_legacy_state():
+    m = manager()
+    m.summary = "要約"
+    m.removed_message_count = 8
+    restored = manager()
+    restored.restore_from_session(m.get_state())
+    assert (restored.summary, restored.removed_message_count) == ("要約", 8)
+
+    legacy = manager()
+    legacy.restore_from_session({"__name__": "SlidingWindowConversationManager", "removed_message_count": 3})
+    assert (legacy.summary, legacy.removed_message_count) == ("", 3)
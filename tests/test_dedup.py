@@ -0,0 +1,44 @@
+"""Slackイベントの重複排除（slack_bot.dedup）のテスト"""
+import asyncio
+from types import SimpleNamespace
+
+from slack_bot import dedup
+from slack_bot.dedup import EventDeduplicator, InMemoryDedupBackend, event_keys
+
+
+def test_event_keys_use_event_id_and_client_msg_id():
+    body = {"event_id": "Ev1"}
+    event = {"client_msg_id": "m1", "channel": "C1", "ts": "1.0"}
+    assert event_keys(body, event) == ["event:Ev1", "msg:m1"]
+
+
+def test_event_keys_fall_back_to_channel_and_ts():
+    assert event_keys(None, {"channel": "C1", "ts": "1.0"}) == ["ts:C1:1.0"]
+    assert event_keys({}, {"channel": "C1", "ts": "1.0"}) == ["ts:C1:1.0"]
+
+
+def test_retry_with_same_event_is_duplicate():
+    deduplicator = EventDeduplicator(InMemoryDedupBackend(ttl=60))
+    body = {"event_id": "Ev1"}
+    event = {"client_msg_id": "m1"}
+    assert asyncio.run(deduplicator.is_duplicate(body, event)) is False
+    assert asyncio.run(deduplicator.is_duplicate(body, event)) is True
+    # 同じメッセージが別のevent_id（app_mentionとmessage）で届いた場合も重複
+    assert asyncio.run(deduplicator.is_duplicate({"event_id": "Ev2"}, event)) is True
+    assert deduplicator.duplicates == 2
+
+
+def test_in_memory_backend_expires_and_bounds_entries(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(dedup, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    backend = InMemoryDedupBackend(ttl=10, max_entries=2)
+
+    assert asyncio.run(backend.claim("a")) is True
+    assert asyncio.run(backend.claim("a")) is False
+    now[0] = 11
+    assert asyncio.run(backend.claim("a")) is True
+
+    asyncio.run(backend.claim("b"))
+    asyncio.run(backend.claim("c"))
+    # 上限を超えた古いキーは忘れる
+    assert asyncio.run(backend.claim("a")) is True
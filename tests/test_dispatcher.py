@@ -0,0 +1,56 @@
+"""Agent実行ディスパッチャー（slack_bot.dispatcher）のテスト"""
+import asyncio
+
+import pytest
+
+from slack_bot.dispatcher import AgentDispatcher, DispatcherFull
+
+
+def test_same_thread_runs_in_order_and_shutdown_waits():
+    async def scenario():
+        dispatcher = AgentDispatcher(max_concurrency=4, max_pending=10)
+        order = []
+
+        def job(name, delay):
+            async def run():
+                await asyncio.sleep(delay)
+                order.append(name)
+            return run
+
+        dispatcher.submit("t1", job("first", 0.02))
+        dispatcher.submit("t1", job("second", 0))
+        dispatcher.submit("t2", job("other", 0))
+        await dispatcher.shutdown(timeout=1)
+        assert order == ["other", "first", "second"]
+        assert dispatcher.stats() == {"pending": 0, "threads": 0}
+
+    asyncio.run(scenario())
+
+
+def test_pending_limit():
+    async def scenario():
+        dispatcher = AgentDispatcher(max_concurrency=1, max_pending=1)
+        dispatcher.submit("t1", lambda: asyncio.sleep(0))
+        with pytest.raises(DispatcherFull):
+            dispatcher.submit("t2", lambda: asyncio.sleep(0))
+        await dispatcher.shutdown(timeout=1)
+
+    asyncio.run(scenario())
+
+
+def test_shutdown_cancels_stuck_threads_and_clears_pending():
+    async def scenario():
+        dispatcher = AgentDispatcher(max_concurrency=4, max_pending=10)
+        started = asyncio.Event()
+
+        async def stuck():
+            started.set()
+            await asyncio.sleep(60)
+
+        dispatcher.submit("t1", stuck)
+        dispatcher.submit("t1", stuck)
+        await started.wait()
+        await dispatcher.shutdown(timeout=0.01)
+        assert dispatcher.stats() == {"pending": 0, "threads": 0}
+
+    asyncio.run(scenario())
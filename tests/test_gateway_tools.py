@@ -0,0 +1,34 @@
+"""Gatewayツール呼び出し（strands_agent.tools.gateway_tools）のテスト"""
+import asyncio
+
+import httpx
+import pytest
+
+from strands_agent.tools.gateway_tools import GatewayToolProvider
+from strands_agent.tools.result_cache import ToolResultCache
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setenv("GATEWAY_URL", "https://gateway.example.com/mcp")
+    monkeypatch.setenv("GATEWAY_CLIENT_ID", "client")
+    monkeypatch.setenv("GATEWAY_CLIENT_SECRET", "secret")
+    monkeypatch.setenv("GATEWAY_TOKEN_ENDPOINT", "https://auth.example.com/token")
+    cache = ToolResultCache(ttls={"listTasks": 30}, deny=(), enabled=True)
+    return GatewayToolProvider(result_cache=cache)
+
+
+def test_batch_post_failure_returns_error_per_request(provider, monkeypatch):
+    async def fail(payload):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(provider, "_post", fail)
+    calls = [("tasks___listTasks", {}), ("tasks___createTask", {"title": "a"})]
+
+    results = asyncio.run(provider.call_tools(calls, batch=True))
+
+    assert len(results) == 2
+    assert len({result["id"] for result in results}) == 2
+    assert all(result["error"]["message"] == "connection refused" for result in results)
+    # エラーはキャッシュしない
+    assert provider.result_cache.get("tasks___listTasks", {}) is None
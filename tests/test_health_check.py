@@ -0,0 +1,126 @@
+"""宣言的ヘルスチェック（strands_agent.tools.health_check）のテスト"""
+import json
+
+import pytest
+
+from strands_agent.tools.health_check import (
+    ERROR, FAIL, OK, WARN, CheckResult, HealthCheck, HealthReport, Rule, default_checks, evaluate, is_shortcut,
+    lookup, parse_call_aws,
+)
+
+
+def text_response(text, is_error=False):
+    result = {"content": [{"type": "text", "text": text}]}
+    if is_error:
+        result["isError"] = True
+    return {"jsonrpc": "2.0", "id": 1, "result": result}
+
+
+def call_aws_response(output):
+    """AWS API MCPサーバーと同じく、CLIの出力をresponse.jsonに文字列で包む"""
+    return text_response(json.dumps({"response": {"json": json.dumps(output), "error": None}}))
+
+
+def test_lookup_paths():
+    output = {"Table": {"Indexes": [{"Status": "ACTIVE"}, {"Status": "CREATING"}]}}
+    assert lookup(output, "Table.Indexes.1.Status") == "CREATING"
+    assert lookup(output, "Table.Indexes.-1.Status") == "CREATING"
+    assert lookup(output, "Table.Indexes.5.Status") is None
+    assert lookup(output, "Table.Missing.Key") is None
+    assert lookup(output, "") is output
+
+
+@pytest.mark.parametrize("rule, output, passed", [
+    (Rule("Status", "eq", "Deployed"), {"Status": "Deployed"}, True),
+    (Rule("Status", "eq", "Deployed"), {"Status": "InProgress"}, False),
+    (Rule("Status", "ne", "Failed"), {"Status": "Active"}, True),
+    (Rule("Status", "in", ["Active", "Pending"]), {"Status": "Pending"}, True),
+    (Rule("", "lte", 0), 0, True),
+    (Rule("", "lte", 0), 3, False),
+    (Rule("", "lte", 0), None, False),
+    (Rule("Count", "gte", 1), {"Count": 2}, True),
+    (Rule("Count", "gte", 1), {"Count": "2"}, False),
+    (Rule("Id", "exists"), {"Id": ""}, True),
+    (Rule("Id", "exists"), {}, False),
+    (Rule("", "nonempty"), [], False),
+    (Rule("", "nonempty"), ["prod"], True),
+    (Rule("IndexStatus", "all_eq", "ACTIVE"), {"IndexStatus": ["ACTIVE", "ACTIVE"]}, True),
+    (Rule("IndexStatus", "all_eq", "ACTIVE"), {"IndexStatus": None}, True),
+    (Rule("IndexStatus", "all_eq", "ACTIVE"), {"IndexStatus": ["ACTIVE", "UPDATING"]}, False),
+])
+def test_rule_operators(rule, output, passed):
+    assert (rule.evaluate(output) is None) is passed
+
+
+def test_rule_issue_describes_actual_and_expected():
+    assert Rule("Status", "eq", "Deployed").evaluate({"Status": "InProgress"}) == \
+        'Status="InProgress" (expected eq "Deployed")'
+    assert Rule("", "nonempty").evaluate([]) == "output=[] (expected nonempty)"
+
+
+def test_parse_call_aws_unwraps_cli_output():
+    assert parse_call_aws(call_aws_response({"State": "Active"})) == (True, {"State": "Active"}, None)
+    assert parse_call_aws(text_response("plain text")) == (True, "plain text", None)
+    assert parse_call_aws(text_response(json.dumps({"response": {"json": "", "error": "AccessDenied"}}))) == \
+        (False, None, "AccessDenied")
+    assert parse_call_aws(text_response("boom", is_error=True)) == (False, None, "boom")
+    assert parse_call_aws({"error": {"code": -32603, "message": "timeout"}}) == (False, None, "timeout")
+
+
+LAMBDA_CHECK = HealthCheck(
+    name="lambda:f", resource="Lambda f", command="aws lambda get-function-configuration",
+    rules=[Rule("State", "eq", "Active"), Rule("Errors", "lte", 0, severity=WARN)],
+    facts={"state": "State", "missing": "Nope"},
+)
+
+
+def test_evaluate_ok_collects_facts():
+    result = evaluate(LAMBDA_CHECK, call_aws_response({"State": "Active", "Errors": 0}))
+    assert result == CheckResult("lambda:f", "Lambda f", OK, [], {"state": "Active"})
+
+
+def test_evaluate_uses_worst_rule_severity():
+    warn = evaluate(LAMBDA_CHECK, call_aws_response({"State": "Active", "Errors": 2}))
+    assert warn.status == WARN and len(warn.issues) == 1
+    fail = evaluate(LAMBDA_CHECK, call_aws_response({"State": "Failed", "Errors": 2}))
+    assert fail.status == FAIL and len(fail.issues) == 2
+
+
+def test_evaluate_command_error():
+    result = evaluate(LAMBDA_CHECK, {"error": {"message": "x" * 500}})
+    assert result.status == ERROR and len(result.issues[0]) == 300
+
+
+def test_report_status_and_text():
+    report = HealthReport([
+        CheckResult("a", "Lambda a", OK, facts={"stages": ["prod", "dev"]}),
+        CheckResult("b", "Lambda b", WARN, ["Errors=2 (expected lte 0)"]),
+    ], elapsed_ms=1234)
+    assert report.status == WARN
+    assert report.to_summary()["checks"][1] == {"name": "b", "resource": "Lambda b", "status": WARN,
+                                                "issues": ["Errors=2 (expected lte 0)"]}
+    lines = report.format_text().splitlines()
+    assert lines[0].endswith("WARN (2件, 1.2秒)")
+    assert lines[1].endswith("Lambda a（stages: prod, dev）")
+    assert HealthReport([], 0).status == OK
+
+
+def test_default_checks_follow_environment(monkeypatch):
+    monkeypatch.delenv("HEALTH_CHECK_CLOUDFRONT_ID", raising=False)
+    monkeypatch.delenv("HEALTH_CHECK_REST_API_ID", raising=False)
+    monkeypatch.setenv("HEALTH_CHECK_S3_BUCKET", "bucket")
+    monkeypatch.setenv("HEALTH_CHECK_LAMBDA_FUNCTIONS", "fn1, ")
+    names = [check.name for check in default_checks()]
+    assert names == ["s3", "apigateway", "lambda:fn1", "lambda-errors:fn1", "dynamodb"]
+
+
+def test_check_from_dict():
+    check = HealthCheck.from_dict({"name": "x", "command": "aws sts get-caller-identity",
+                                   "rules": [{"path": "Account", "op": "exists"}]})
+    assert check.resource == "x" and check.rules == [Rule("Account", "exists")]
+
+
+def test_is_shortcut(monkeypatch):
+    monkeypatch.delenv("HEALTH_CHECK_SHORTCUTS", raising=False)
+    assert is_shortcut(" HealthCheck ") and is_shortcut("ヘルスチェック")
+    assert not is_shortcut("ヘルスチェックして") and not is_shortcut(None)
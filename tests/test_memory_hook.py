@@ -0,0 +1,163 @@
+"""ライトビハインドのセッションマネージャー（strands_agent.hooks.memory_hook）のテスト"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bedrock_agentcore.memory.integrations.strands.config import AgentCoreMemoryConfig
+from bedrock_agentcore.memory.integrations.strands.session_manager import (
+    AgentCoreMemorySessionManager, BufferedMessage,
+)
+from strands.session.repository_session_manager import RepositorySessionManager
+from strands.types.session import SessionAgent
+
+from strands_agent.hooks import memory_hook
+from strands_agent.hooks.memory_hook import (
+    TracedMemorySessionManager, WriteBehindMemorySessionManager, create_memory_session_manager,
+)
+from strands_agent.hooks.memory_writer import MemoryWriter
+
+
+class FakeMemoryClient:
+    """bedrock-agentcoreのデータプレーンクライアントの代わり"""
+
+    def __init__(self):
+        self.events = []
+        self.fail = 0
+
+    def create_event(self, **kwargs):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("throttled")
+        self.events.append(kwargs)
+        return {"eventId": str(len(self.events))}
+
+
+class RecordingWriter(MemoryWriter):
+    """予約を記録するだけのライター（書き込みはテストから同期的に行う）"""
+
+    def __init__(self):
+        super().__init__(flush_interval=60, max_retries=0)
+        self.scheduled = []
+
+    def schedule(self, writer, immediate=False):
+        self.scheduled.append((writer.session_key, immediate))
+        with self._cond:
+            self._pending.add(writer)
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """セッションの読み込み（Memory API呼び出し）を行わずに初期化する"""
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+    def init(self, session_id, session_repository, **kwargs):
+        self.session_id = session_id
+
+    monkeypatch.setattr(RepositorySessionManager, "__init__", init)
+
+
+def make_manager(writer):
+    config = AgentCoreMemoryConfig(memory_id="mem", actor_id="U1", session_id="1700000000-0001", batch_size=20)
+    manager = WriteBehindMemorySessionManager(agentcore_memory_config=config, region_name="us-east-1",
+                                              writer=writer)
+    client = FakeMemoryClient()
+    manager.memory_client.gmdp_client = client
+    return manager, client
+
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def buffer_message(manager, text, seconds):
+    manager._message_buffer.append(BufferedMessage(
+        session_id=manager.config.session_id, messages=[(text, "user")], is_blob=False,
+        timestamp=T0 + timedelta(seconds=seconds), metadata=None,
+    ))
+
+
+def buffer_state(manager, agent_id, value, seconds):
+    updated_at = (T0 + timedelta(seconds=seconds)).isoformat()
+    state = SessionAgent(agent_id=agent_id, state={"v": value}, conversation_manager_state={},
+                         updated_at=updated_at)
+    manager._agent_state_buffer.append((manager.config.session_id, state))
+
+
+def test_library_internals_are_supported():
+    assert memory_hook.write_behind_supported() is True
+
+
+def test_library_flushes_are_handed_to_the_writer(offline):
+    writer = RecordingWriter()
+    manager, client = make_manager(writer)
+    buffer_message(manager, "hello", 0)
+
+    assert manager._flush_messages_only() == []
+    assert manager._flush_messages() == []
+    assert client.events == []
+    assert writer.scheduled == [(manager.session_key, True), (manager.session_key, True)]
+
+
+def test_write_pending_sends_messages_and_latest_agent_state(offline):
+    manager, client = make_manager(RecordingWriter())
+    buffer_message(manager, "first", 0)
+    buffer_message(manager, "second", 1)
+    buffer_state(manager, "default", 2, 3)
+    buffer_state(manager, "default", 1, 2)
+
+    assert manager.write_pending() is True
+    assert not manager.has_pending()
+    messages, state = client.events
+    assert [p["conversational"]["content"]["text"] for p in messages["payload"]] == ["first", "second"]
+    # エージェント状態はエージェントごとに最新の1件だけ書き込む
+    assert len(state["payload"]) == 1 and '"v": 2' in state["payload"][0]["blob"]
+
+
+def test_failed_write_keeps_events_in_order(offline):
+    manager, client = make_manager(RecordingWriter())
+    buffer_message(manager, "first", 0)
+    client.fail = 1
+
+    assert manager.write_pending() is False
+    # 失敗中に積まれたメッセージより前に、戻されたメッセージが来る
+    buffer_message(manager, "second", 1)
+    manager._message_buffer.sort(key=lambda buffered: buffered.timestamp)
+    assert manager.pending_message_count() == 2
+
+    assert manager.write_pending() is True
+    texts = [p["conversational"]["content"]["text"] for p in client.events[0]["payload"]]
+    assert texts == ["first", "second"]
+
+
+def test_close_writes_synchronously(offline):
+    writer = RecordingWriter()
+    manager, client = make_manager(writer)
+    buffer_message(manager, "bye", 0)
+    writer.schedule(manager)
+
+    manager.close()
+
+    assert len(client.events) == 1
+    assert writer.pending_count() == 0
+
+
+def test_read_flushes_pending_events_of_the_same_session(offline, monkeypatch):
+    writer = RecordingWriter()
+    manager, client = make_manager(writer)
+    buffer_message(manager, "unsaved", 0)
+    writer.schedule(manager)
+    monkeypatch.setattr(AgentCoreMemorySessionManager, "list_messages", lambda self, *args, **kwargs: [])
+
+    manager.list_messages(manager.config.session_id, "default")
+
+    assert len(client.events) == 1
+
+
+def test_falls_back_to_synchronous_writes_when_internals_change(offline, monkeypatch):
+    memory_hook.write_behind_supported.cache_clear()
+    monkeypatch.delattr(AgentCoreMemorySessionManager, "_flush_messages_only")
+    try:
+        manager = create_memory_session_manager("mem", "U1", "1700000000.0001")
+    finally:
+        memory_hook.write_behind_supported.cache_clear()
+    assert type(manager) is TracedMemorySessionManager
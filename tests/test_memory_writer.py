@@ -0,0 +1,123 @@
+"""ライトビハインドのMemoryライター（strands_agent.hooks.memory_writer）のテスト"""
+import threading
+import time
+
+import pytest
+
+from strands_agent.hooks.memory_writer import MemoryWriter
+
+
+class FakeWriter:
+    """セッションマネージャーの代わり（fail回だけ書き込みに失敗する）"""
+
+    def __init__(self, session_key, pending=1, fail=0, raises=False):
+        self.session_key = session_key
+        self.pending = pending
+        self.fail = fail
+        self.raises = raises
+        self.calls = 0
+        self.threads = set()
+
+    def write_pending(self) -> bool:
+        self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        if self.fail:
+            self.fail -= 1
+            if self.raises:
+                raise RuntimeError("throttled")
+            return False
+        self.pending = 0
+        return True
+
+    def has_pending(self) -> bool:
+        return self.pending > 0
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def writer():
+    writer = MemoryWriter(flush_interval=60, max_retries=2, backoff=0.01, backoff_max=0.02, concurrency=2)
+    yield writer
+    writer.shutdown(timeout=1)
+
+
+def test_immediate_schedule_writes_in_background(writer):
+    session = FakeWriter("s1")
+    writer.schedule(session, immediate=True)
+    wait_for(lambda: writer.pending_count() == 0)
+    assert session.calls == 1
+    assert all(name.startswith("memory-writer") for name in session.threads)
+
+
+def test_delayed_schedule_waits_for_interval():
+    writer = MemoryWriter(flush_interval=0.05, max_retries=0, backoff=0.01)
+    session = FakeWriter("s1")
+    writer.schedule(session)
+    assert session.calls == 0
+    wait_for(lambda: session.calls == 1)
+    writer.shutdown(timeout=1)
+
+
+@pytest.mark.parametrize("raises", [False, True])
+def test_failed_write_is_retried_with_backoff(writer, raises):
+    session = FakeWriter("s1", fail=2, raises=raises)
+    writer.schedule(session, immediate=True)
+    wait_for(lambda: writer.pending_count() == 0)
+    assert session.calls == 3
+
+
+def test_events_stay_buffered_after_max_retries(writer):
+    session = FakeWriter("s1", fail=10)
+    writer.schedule(session, immediate=True)
+    wait_for(lambda: session.calls == 3)
+    time.sleep(0.05)
+    # 再試行を打ち切ってもバッファは保持し、次の書き込み要求で再開する
+    assert session.calls == 3
+    assert writer.pending_count() == 1
+
+    session.fail = 0
+    writer.schedule(session, immediate=True)
+    wait_for(lambda: writer.pending_count() == 0)
+
+
+def test_flush_session_writes_only_that_session(writer):
+    first, second = FakeWriter("s1"), FakeWriter("s2")
+    writer.schedule(first)
+    writer.schedule(second)
+
+    assert writer.flush_session("s1") is True
+    assert (first.calls, second.calls) == (1, 0)
+    assert threading.current_thread().name in first.threads
+    assert writer.pending_count() == 1
+
+
+def test_shutdown_flushes_pending_sessions_with_retries():
+    writer = MemoryWriter(flush_interval=60, max_retries=3, backoff=0.001, backoff_max=0.001)
+    ok, flaky, broken = FakeWriter("s1"), FakeWriter("s2", fail=2), FakeWriter("s3", fail=100)
+    for session in (ok, flaky, broken):
+        writer.schedule(session)
+
+    writer.shutdown(timeout=1)
+
+    assert not ok.has_pending() and not flaky.has_pending()
+    assert flaky.calls == 3
+    # 上限を超えたセッションは諦めて停止する（ハングしない）
+    assert broken.has_pending() and broken.calls == 4
+
+
+def test_schedule_after_shutdown_is_left_for_close():
+    writer = MemoryWriter(flush_interval=0, max_retries=0)
+    writer.shutdown(timeout=1)
+    session = FakeWriter("s1")
+    writer.schedule(session, immediate=True)
+    time.sleep(0.02)
+    assert session.calls == 0
+    assert writer.flush(session) is True
+    assert writer.pending_count() == 0
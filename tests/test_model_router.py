@@ -0,0 +1,86 @@
+"""モデルルーター（strands_agent.model_router）のテスト"""
+from types import SimpleNamespace
+
+import pytest
+
+from strands_agent.model_router import FAST, LARGE, ModelEscalationHook, ModelRouter
+
+
+def router(**kwargs):
+    kwargs.setdefault("enabled", True)
+    kwargs.setdefault("fast_max_chars", 40)
+    kwargs.setdefault("prompt_cache", False)
+    router = ModelRouter(**kwargs)
+    # BedrockModelを作らないよう、段階ごとのモデルを差し替える
+    router._models = {FAST: SimpleNamespace(tier=FAST), LARGE: SimpleNamespace(tier=LARGE)}
+    return router
+
+
+@pytest.mark.parametrize("message, groups, expected", [
+    ("タスク一覧を見せて", ["tasks"], (FAST, "1 tool group")),
+    ("こんにちは", [], (FAST, "no tools")),
+    ("EKSクラスタのヘルスチェックをして", ["eks"], (LARGE, "keyword ヘルスチェック")),
+    ("Please REVIEW this", ["tasks"], (LARGE, "keyword review")),
+    ("あ" * 41, ["tasks"], (LARGE, "41 chars")),
+    ("タスクを作ってSlackに通知", ["tasks", "slack"], (LARGE, "2 tool groups")),
+    ("タスクを追加して、それから一覧を出して", ["tasks"], (LARGE, "multi-step request")),
+    (None, [], (FAST, "no tools")),
+])
+def test_classify(message, groups, expected):
+    assert router().classify(message, groups) == expected
+
+
+def test_classify_uses_large_model_when_disabled_or_not_routed():
+    assert router(enabled=False).classify("こんにちは", []) == (LARGE, "router disabled")
+    assert router().classify("こんにちは", [], tools_routed=False) == (LARGE, "tools not routed")
+
+
+def test_complex_keywords_from_environment(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTER_COMPLEX_KEYWORDS", "見積もり, ")
+    assert router().classify("工数の見積もり", ["tasks"]) == (LARGE, "keyword 見積もり")
+
+
+def test_escalate_switches_fast_agent_once():
+    r = router()
+    agent = SimpleNamespace(model=r.model(FAST))
+    assert r.tier_of(agent.model) == FAST
+    assert r.escalate(agent) is True
+    assert agent.model is r.model(LARGE)
+    assert r.tier_of(agent.model) == LARGE
+    assert r.escalate(agent) is False
+
+
+def test_record_and_stats(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTER_STATS_INTERVAL", "0")
+    r = router()
+    for latency in (100, 300, 200):
+        r.record(FAST, latency, {"input": 10, "output": 5}, escalated=False)
+    r.record(FAST, 1000, {"input": 10, "output": 5, "cache_read": 7}, escalated=True)
+    r.record(LARGE, 50, {}, escalated=False)
+
+    stats = r.stats()
+    assert stats[FAST] == {"turns": 4, "escalated": 1, "input": 40, "output": 20, "cache_read": 7,
+                           "p50_ms": 300, "p90_ms": 1000}
+    assert stats[LARGE]["turns"] == 1 and stats[LARGE]["p50_ms"] == 50
+
+
+def tool_event(agent, status, name="tasks___createTask"):
+    return SimpleNamespace(agent=agent, tool_use={"name": name}, result={"status": status})
+
+
+def test_escalation_hook_escalates_on_tool_error():
+    r = router()
+    reasons = []
+    hook = ModelEscalationHook(r, on_escalate=reasons.append)
+    agent = SimpleNamespace(model=r.model(FAST))
+
+    hook.after_tool_call(tool_event(agent, "success"))
+    assert agent.model is r.model(FAST) and reasons == []
+
+    hook.after_tool_call(tool_event(agent, "error"))
+    assert agent.model is r.model(LARGE)
+    assert reasons == ["tool error tasks___createTask"]
+
+    # すでに大きいモデルなら何もしない
+    hook.after_tool_call(tool_event(agent, "error"))
+    assert reasons == ["tool error tasks___createTask"]
@@ -0,0 +1,102 @@
+"""Slack送信（slack_bot.outbound）のテスト"""
+import asyncio
+
+import httpx
+import pytest
+
+from slack_bot.outbound import (
+    EMPTY_MESSAGE_PLACEHOLDER, SLACK_API_URL, SlackApiError, SlackOutbound, split_message,
+)
+
+
+def test_short_text_is_single_chunk():
+    assert split_message("hello", 10) == ["hello"]
+    assert split_message("", 10) == [""]
+
+
+def test_split_prefers_newlines():
+    text = "line one\nline two\nline three"
+    assert split_message(text, 18) == ["line one\nline two", "line three"]
+
+
+def test_split_hard_cuts_long_lines():
+    assert split_message("a" * 25, 10) == ["a" * 10, "a" * 10, "a" * 5]
+
+
+def test_split_drops_separator_newlines_and_respects_limit():
+    text = "\n".join(f"item {n}" for n in range(50))
+    chunks = split_message(text, 40)
+    assert all(0 < len(chunk) <= 40 for chunk in chunks)
+    assert "\n".join(chunks) == text
+
+
+class FakeOutbound(SlackOutbound):
+    def __init__(self, fail_on=None):
+        super().__init__(token="xoxb-test")
+        self.chunk_chars = 10
+        self.posted = []
+        self.fail_on = fail_on
+
+    async def post_message(self, channel, thread_ts, text):
+        if len(self.posted) == self.fail_on:
+            raise SlackApiError("chat.postMessage", {"ok": False, "error": "internal_error"})
+        self.posted.append(text)
+        return {"ok": True, "ts": str(len(self.posted))}
+
+
+def test_finish_leaves_only_failed_chunks_undelivered():
+    outbound = FakeOutbound(fail_on=1)
+    messenger = outbound.turn("C1", "1.0")
+    with pytest.raises(SlackApiError):
+        asyncio.run(messenger.finish("a" * 10 + "\n" + "b" * 10 + "\n" + "c" * 10))
+    assert outbound.posted == ["a" * 10]
+    assert messenger.undelivered == ["b" * 10, "c" * 10]
+
+
+def test_finish_posts_placeholder_for_empty_text():
+    outbound = FakeOutbound()
+    outbound.chunk_chars = 100
+    messenger = outbound.turn("C1", "1.0")
+    asyncio.run(messenger.finish("  "))
+    assert outbound.posted == [EMPTY_MESSAGE_PLACEHOLDER]
+    assert messenger.undelivered == []
+
+
+def mock_outbound(handler, max_retries=2):
+    outbound = SlackOutbound(token="xoxb-test")
+    outbound.max_retries = max_retries
+    outbound._client = httpx.AsyncClient(base_url=SLACK_API_URL, transport=httpx.MockTransport(handler))
+    return outbound
+
+
+def test_persistent_rate_limit_raises_slack_api_error():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    outbound = mock_outbound(handler, max_retries=2)
+    with pytest.raises(SlackApiError) as raised:
+        asyncio.run(outbound.post_message("C1", "1.0", "hi"))
+    assert raised.value.response == {"error": "ratelimited"}
+    assert len(calls) == 3
+
+
+def test_rate_limit_then_success():
+    responses = [httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200, json={"ok": True, "ts": "2"})]
+    outbound = mock_outbound(lambda request: responses.pop(0))
+    assert asyncio.run(outbound.post_message("C1", "1.0", "hi"))["ts"] == "2"
+
+
+def test_http_and_transport_errors_raise_slack_api_error():
+    outbound = mock_outbound(lambda request: httpx.Response(503))
+    with pytest.raises(SlackApiError) as raised:
+        asyncio.run(outbound.post_message("C1", "1.0", "hi"))
+    assert raised.value.response == {"error": "http_503"}
+
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    with pytest.raises(SlackApiError):
+        asyncio.run(mock_outbound(refuse).post_message("C1", "1.0", "hi"))
@@ -0,0 +1,90 @@
+"""ツール出力の縮約（strands_agent.tools.output_budget）のテスト"""
+import json
+
+from strands_agent.tools.output_budget import (
+    CHARS_PER_TOKEN, HeadTailReducer, JsonReducer, LogDedupReducer, OutputBudgetManager,
+)
+
+
+def manager(**kwargs):
+    kwargs.setdefault("default_budget", 100)
+    kwargs.setdefault("enabled", True)
+    return OutputBudgetManager(**kwargs)
+
+
+def test_output_within_budget_is_untouched():
+    text = json.dumps({"ResponseMetadata": {"RequestId": "x"}, "value": 1})
+    budget = manager()
+    assert budget.reduce("call_aws", text) is text
+    assert budget.stats()["tools"]["call_aws"]["reduced"] == 0
+
+
+def test_json_reducer_prunes_metadata_and_empty_values():
+    text = json.dumps({"ResponseMetadata": {"RequestId": "x"}, "Items": [], "Name": None, "Id": "a"})
+    assert JsonReducer()(text, 1000) == '{"Id":"a"}'
+
+
+def test_json_reducer_expands_nested_json_and_truncates_arrays():
+    inner = json.dumps({"Clusters": [f"cluster-{n}" for n in range(100)]})
+    text = json.dumps({"response": {"json": inner}})
+    reduced = json.loads(JsonReducer()(text, 200))
+    clusters = reduced["response"]["json"]["Clusters"]
+    assert clusters[-1].startswith("...") and "total 100" in clusters[-1]
+    assert len(clusters) < 100
+
+
+def test_log_dedup_collapses_lines_that_differ_only_in_numbers():
+    lines = [f"2024-01-01 ERROR request {n} failed" for n in range(30)]
+    reduced = LogDedupReducer(min_lines=20)("\n".join(lines), 100)
+    assert reduced.splitlines() == [lines[0], "    [... 29 similar lines]"]
+    # 短いログはそのまま
+    assert LogDedupReducer(min_lines=20)("\n".join(lines[:5]), 10) == "\n".join(lines[:5])
+
+
+def test_head_tail_keeps_both_ends():
+    reduced = HeadTailReducer(head_ratio=0.5)("a" * 50 + "b" * 50, 20)
+    assert reduced.startswith("a" * 10)
+    assert reduced.endswith("b" * 10)
+    assert "[80 chars omitted]" in reduced
+
+
+def test_reducer_chain_stops_once_within_budget():
+    calls = []
+
+    def first(text, budget):
+        calls.append("first")
+        return text[:budget]
+
+    def second(text, budget):
+        calls.append("second")
+        return ""
+
+    budget = manager(default_budget=10, reducers=[first, second])
+    assert budget.reduce("search", "x" * 100) == "x" * 10 * CHARS_PER_TOKEN
+    assert calls == ["first"]
+
+
+def test_failing_reducer_is_skipped():
+    def broken(text, budget):
+        raise ValueError("boom")
+
+    budget = manager(default_budget=10, reducers=[broken, HeadTailReducer()])
+    reduced = budget.reduce("search", "x" * 1000)
+    assert len(reduced) < 1000
+
+
+def test_per_tool_budget_and_stats():
+    budget = manager(budgets={"call_aws": 1000})
+    text = "x" * 1000
+    assert budget.reduce("aws___call_aws", text) == text
+    reduced = budget.reduce("search", text)
+    assert len(reduced) < len(text)
+
+    stats = budget.stats()
+    assert stats["tools"]["search"]["reduced"] == 1
+    assert stats["bytes_saved"] == len(text) - len(reduced.encode("utf-8"))
+
+
+def test_disabled_manager_returns_input():
+    text = "x" * 10000
+    assert manager(enabled=False).reduce("search", text) is text
@@ -0,0 +1,107 @@
+"""ツール結果キャッシュ（strands_agent.tools.result_cache）のテスト"""
+import pytest
+
+from strands_agent.tools import result_cache
+from strands_agent.tools.result_cache import ToolResultCache, canonical_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache, "time", clock)
+    return clock
+
+
+def ok(text="ok"):
+    return {"jsonrpc": "2.0", "result": {"content": [{"type": "text", "text": text}]}}
+
+
+def cache(**kwargs):
+    kwargs.setdefault("ttls", {"listTasks": 30, "search": 600})
+    kwargs.setdefault("deny", ())
+    kwargs.setdefault("enabled", True)
+    return ToolResultCache(**kwargs)
+
+
+def test_canonical_key_ignores_argument_order():
+    assert canonical_key("t", {"a": 1, "b": 2}) == canonical_key("t", {"b": 2, "a": 1})
+
+
+def test_hit_uses_base_tool_name_ttl(clock):
+    c = cache()
+    c.put("tasks___listTasks", {"status": "todo"}, ok())
+    assert c.get("tasks___listTasks", {"status": "todo"}) == ok()
+    assert c.get("tasks___listTasks", {"status": "done"}) is None
+    assert c.stats()["hits"] == 1 and c.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    c = cache()
+    c.put("listTasks", {}, ok())
+    clock.now += 31
+    assert c.get("listTasks", {}) is None
+    assert c.stats()["entries"] == 0
+
+
+def test_uncacheable_errors_and_denied_tools_are_not_stored(clock):
+    c = cache(deny={"search"})
+    c.put("createTask", {}, ok())
+    c.put("listTasks", {}, {"error": {"message": "boom"}})
+    c.put("listTasks", {"x": 1}, {"result": {"isError": True}})
+    c.put("tavily___search", {}, ok())
+    assert c.stats()["entries"] == 0
+
+
+def test_lru_eviction_by_entries_and_bytes(clock):
+    c = cache(max_entries=2)
+    c.put("listTasks", {"n": 1}, ok())
+    c.put("listTasks", {"n": 2}, ok())
+    c.get("listTasks", {"n": 1})
+    c.put("listTasks", {"n": 3}, ok())
+    assert c.get("listTasks", {"n": 2}) is None
+    assert c.get("listTasks", {"n": 1}) is not None
+
+    size = len(result_cache.json.dumps(ok("x" * 100), ensure_ascii=False).encode("utf-8"))
+    c = cache(max_bytes=size * 2)
+    for n in range(3):
+        c.put("listTasks", {"n": n}, ok("x" * 100))
+    assert c.stats()["entries"] == 2
+    assert c.stats()["bytes"] <= size * 2
+
+
+def test_write_invalidates_related_tools(clock):
+    c = cache()
+    c.put("tasks___listTasks", {}, ok())
+    c.put("search", {}, ok())
+    c.on_write("tasks___createTask")
+    assert c.get("tasks___listTasks", {}) is None
+    assert c.get("search", {}) is not None
+
+
+def test_put_skipped_when_invalidated_during_call(clock):
+    c = cache()
+    generation = c.generation("tasks___listTasks")
+    # listTasksの実行中にcreateTaskが完了した
+    c.on_write("tasks___createTask")
+    c.put("tasks___listTasks", {}, ok("stale"), generation)
+    assert c.get("tasks___listTasks", {}) is None
+
+    generation = c.generation("tasks___listTasks")
+    c.put("tasks___listTasks", {}, ok("fresh"), generation)
+    assert c.get("tasks___listTasks", {}) == ok("fresh")
+
+
+def test_invalidate_all_changes_every_generation(clock):
+    c = cache()
+    generation = c.generation("search")
+    c.invalidate()
+    c.put("search", {}, ok(), generation)
+    assert c.get("search", {}) is None
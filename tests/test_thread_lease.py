@@ -0,0 +1,225 @@
+"""スレッドのリース（slack_bot.thread_lease）のテスト"""
+import asyncio
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from slack_bot import thread_lease
+from slack_bot.thread_lease import DynamoDBLeaseBackend, InMemoryLeaseBackend, ThreadLeaseManager
+
+TABLE = "thread-leases-test"
+
+
+class FakeClock:
+    """time.time / time.monotonic を置き換える手動の時計"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(thread_lease, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def dynamodb_backend(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        client.create_table(
+            TableName=TABLE,
+            AttributeDefinitions=[{"AttributeName": "lease_key", "AttributeType": "S"}],
+            KeySchema=[{"AttributeName": "lease_key", "KeyType": "HASH"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield DynamoDBLeaseBackend(TABLE, client=client)
+
+
+@pytest.fixture(params=["memory", "dynamodb"])
+def backend(request, clock):
+    if request.param == "memory":
+        return InMemoryLeaseBackend()
+    return request.getfixturevalue("dynamodb_backend")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_acquire_returns_current_holder(backend):
+    lease = run(backend.acquire("t1", "a", "http://a", 30))
+    assert (lease.owner, lease.address) == ("a", "http://a")
+
+    other = run(backend.acquire("t1", "b", "http://b", 30))
+    assert (other.owner, other.address) == ("a", "http://a")
+
+
+def test_owner_reacquires_own_lease(backend, clock):
+    first = run(backend.acquire("t1", "a", "http://a", 30))
+    clock.advance(10)
+    second = run(backend.acquire("t1", "a", "http://a", 30))
+    assert second.owner == "a"
+    assert second.expires_at > first.expires_at
+
+
+def test_renew_extends_only_own_live_leases(backend, clock):
+    run(backend.acquire("t1", "a", "http://a", 30))
+    run(backend.acquire("t2", "b", "http://b", 30))
+
+    assert run(backend.renew(["t1", "t2", "missing"], "a", 30)) == {"t1"}
+
+    # 延長したリースは元の期限を過ぎても他のPodに取られない
+    clock.advance(20)
+    assert run(backend.renew(["t1"], "a", 30)) == {"t1"}
+    clock.advance(20)
+    assert run(backend.acquire("t1", "b", "http://b", 30)).owner == "a"
+
+
+def test_takeover_after_expiry(backend, clock):
+    run(backend.acquire("t1", "a", "http://a", 30))
+    clock.advance(31)
+
+    lease = run(backend.acquire("t1", "b", "http://b", 30))
+    assert (lease.owner, lease.address) == ("b", "http://b")
+    # 失効後は元の所有者は延長できない
+    assert run(backend.renew(["t1"], "a", 30)) == set()
+
+
+def test_release_only_by_owner(backend):
+    run(backend.acquire("t1", "a", "http://a", 30))
+
+    run(backend.release("t1", "b"))
+    assert run(backend.acquire("t1", "b", "http://b", 30)).owner == "a"
+
+    run(backend.release("t1", "a"))
+    assert run(backend.acquire("t1", "b", "http://b", 30)).owner == "b"
+
+
+def test_dynamodb_item_has_ttl_attribute(dynamodb_backend, clock):
+    run(dynamodb_backend.acquire("t1", "a", "http://a", 30))
+    item = dynamodb_backend._client.get_item(TableName=TABLE, Key={"lease_key": {"S": "t1"}})["Item"]
+    assert item["lease_owner"]["S"] == "a"
+    assert int(item["expires_ttl"]["N"]) > clock.now + 30
+
+
+def managers(clock, on_release=None, idle=60):
+    backend = InMemoryLeaseBackend()
+    a = ThreadLeaseManager(backend, owner="a", address="http://a", ttl=30, idle=idle, on_release=on_release)
+    b = ThreadLeaseManager(backend, owner="b", address="http://b", ttl=30, idle=idle)
+    return backend, a, b
+
+
+def test_manager_claim_and_forward_target(clock):
+    async def scenario():
+        _, a, b = managers(clock)
+        assert await a.claim("t1") is None
+        lease = await b.claim("t1")
+        assert (lease.owner, lease.address) == ("a", "http://a")
+        await a.shutdown()
+        await b.shutdown()
+
+    run(scenario())
+
+
+def test_manager_releases_idle_threads_after_hook(clock):
+    released = []
+
+    async def scenario():
+        backend, a, b = managers(clock, on_release=lambda key: _record(released, backend, key))
+        await a.claim("t1")
+        a.begin("t1")
+        await advance(clock, a, 120)
+        # 実行中は解放しない
+        assert released == []
+        assert (await b.claim("t1")).owner == "a"
+
+        a.end("t1")
+        await advance(clock, a, 70)
+        # フックはリースを持ったまま呼ばれ、その後に解放される
+        assert released == [("t1", "a")]
+        assert await b.claim("t1") is None
+        assert a.stats() == {"held": 0, "busy": 0}
+        await a.shutdown()
+        await b.shutdown()
+
+    run(scenario())
+
+
+async def advance(clock, manager, seconds, step=10):
+    """ハートビート間隔（ttl/3）ごとに時計を進める"""
+    for _ in range(int(seconds // step)):
+        clock.advance(step)
+        await manager.heartbeat()
+
+
+async def _record(released, backend, key):
+    lease = backend._leases.get(key)
+    released.append((key, lease.owner if lease else None))
+
+
+def test_manager_detects_lost_lease(clock):
+    released = []
+
+    async def scenario():
+        backend, a, b = managers(clock, on_release=lambda key: _record(released, backend, key))
+        await a.claim("t1")
+        # 更新が止まったまま期限切れになり、他のPodが取得
+        clock.advance(31)
+        assert await b.claim("t1") is None
+
+        await a.heartbeat()
+        assert a.stats()["held"] == 0
+        # ウォームな状態を破棄するためのフックが呼ばれる
+        assert released == [("t1", "b")]
+        assert (await a.claim("t1")).owner == "b"
+        await a.shutdown()
+        await b.shutdown()
+
+    run(scenario())
+
+
+def test_manager_reacquires_when_not_renewed_in_time(clock):
+    async def scenario():
+        backend, a, _ = managers(clock)
+        await a.claim("t1")
+        # 所有を確認できている期限を過ぎたらバックエンドで取得し直す
+        clock.advance(25)
+        acquired = []
+        original = backend.acquire
+
+        async def spy(*args):
+            acquired.append(args[0])
+            return await original(*args)
+
+        backend.acquire = spy
+        assert await a.claim("t1") is None
+        assert acquired == ["t1"]
+        await a.shutdown()
+
+    run(scenario())
+
+
+def test_manager_shutdown_releases_all(clock):
+    async def scenario():
+        backend, a, _ = managers(clock)
+        await a.claim("t1")
+        await a.claim("t2")
+        await a.shutdown()
+        assert backend._leases == {}
+
+    run(scenario())
@@ -0,0 +1,125 @@
+"""ツールルーター（strands_agent.tools.tool_router）のテスト"""
+from types import SimpleNamespace
+
+from strands_agent.tools.tool_router import ToolFallbackHook, ToolRouter, tokenize, tool_group
+
+
+def make_tool(name, description=""):
+    return SimpleNamespace(tool_name=name, tool_spec={"description": description})
+
+
+TOOLS = [
+    make_tool("tasks___createTask", "Create a task"),
+    make_tool("tasks___listTasks", "List tasks"),
+    make_tool("eks___list_clusters", "List EKS clusters"),
+    make_tool("eks___describe_cluster", "Describe an EKS cluster"),
+    make_tool("tavily___search", "Search the web"),
+    make_tool("slack___notifySlack", "Send a Slack notification"),
+]
+
+
+def router(**kwargs):
+    kwargs.setdefault("top_k", 2)
+    kwargs.setdefault("always", {"notifySlack"})
+    kwargs.setdefault("enabled", True)
+    return ToolRouter(**kwargs)
+
+
+def names(tools):
+    return [t.tool_name for t in tools]
+
+
+def test_tokenize_splits_camel_case_and_japanese_bigrams():
+    assert tokenize("listTasks") == ["list", "tasks"]
+    assert tokenize("タスク一覧") == ["タス", "スク", "ク一", "一覧"]
+    assert tokenize("EKSのクラスタ") == ["eks", "のク", "クラ", "ラス", "スタ"]
+
+
+def test_tool_group_is_target_prefix():
+    assert tool_group("tasks___listTasks") == "tasks"
+    assert tool_group("run_health_check") == "run_health_check"
+
+
+def test_score_prefers_matching_group():
+    scores = router().score("EKSクラスタの一覧を見せて", TOOLS)
+    assert max(scores, key=scores.get) == "eks"
+
+
+def test_select_keeps_order_and_always_tools():
+    selected, groups = router().select("残タスクを一覧で", TOOLS)
+    assert groups == frozenset({"tasks"})
+    assert names(selected) == ["tasks___createTask", "tasks___listTasks", "slack___notifySlack"]
+
+
+def test_select_returns_same_list_for_same_groups():
+    r = router()
+    first, _ = r.select("タスク一覧", TOOLS)
+    second, _ = r.select("タスクを追加", TOOLS)
+    assert first is second
+
+
+def test_select_falls_back_to_sticky_groups_then_all_tools():
+    r = router()
+    selected, groups = r.select("それもお願い", TOOLS, sticky={"eks", "unknown"})
+    assert groups == frozenset({"eks"})
+    assert "eks___list_clusters" in names(selected)
+
+    selected, groups = r.select("それもお願い", TOOLS)
+    assert groups == frozenset()
+    assert selected is TOOLS
+
+
+def test_select_disabled_returns_all_tools():
+    selected, groups = router(enabled=False).select("タスク一覧", TOOLS)
+    assert selected is TOOLS and groups == frozenset()
+
+
+def test_custom_keywords_route_to_tool():
+    selected, groups = router(keywords={"search": ["天気"]}).select("明日の天気", TOOLS)
+    assert groups == frozenset({"tavily"})
+
+
+class FakeRegistry:
+    def __init__(self, tools):
+        self.registry = {t.tool_name: t for t in tools}
+
+    def register_tool(self, tool):
+        self.registry[tool.tool_name] = tool
+
+
+def fallback_event(name, registered):
+    agent = SimpleNamespace(tool_registry=FakeRegistry(registered))
+    return SimpleNamespace(selected_tool=None, tool_use={"name": name}, agent=agent)
+
+
+def test_fallback_registers_whole_group_and_reports_widening():
+    widened = []
+    hook = ToolFallbackHook(lambda: TOOLS, on_widen=widened.append)
+    event = fallback_event("eks___describe_cluster", TOOLS[:2])
+
+    hook.before_tool_call(event)
+
+    assert event.selected_tool.tool_name == "eks___describe_cluster"
+    assert {"eks___list_clusters", "eks___describe_cluster"} <= set(event.agent.tool_registry.registry)
+    assert widened == ["eks"]
+
+
+def test_fallback_matches_unprefixed_name_only_when_unique():
+    hook = ToolFallbackHook(lambda: TOOLS)
+    event = fallback_event("search", [])
+    hook.before_tool_call(event)
+    assert event.selected_tool.tool_name == "tavily___search"
+
+    ambiguous = TOOLS + [make_tool("other___search")]
+    event = fallback_event("search", [])
+    ToolFallbackHook(lambda: ambiguous).before_tool_call(event)
+    assert event.selected_tool is None
+
+
+def test_fallback_ignores_tools_already_selected():
+    widened = []
+    hook = ToolFallbackHook(lambda: TOOLS, on_widen=widened.append)
+    event = fallback_event("tasks___listTasks", TOOLS)
+    event.selected_tool = TOOLS[1]
+    hook.before_tool_call(event)
+    assert widened == []